@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Region, Zone, Store, Family
+from .models import Region, Zone, Store, Family, ImportRun, DatasetCatalog
 
 @admin.register(Region)
 class RegionAdmin(admin.ModelAdmin):
@@ -21,4 +21,42 @@ class StoreAdmin(admin.ModelAdmin):
 class FamilyAdmin(admin.ModelAdmin):
     list_display = ("origen", "sector", "familia_std", "subfamilia_std", "is_active")
     list_filter = ("is_active", "origen", "sector")
-    search_fields = ("origen", "sector", "familia_std", "subfamilia_std")
\ No newline at end of file
+    search_fields = ("origen", "sector", "familia_std", "subfamilia_std")
+
+@admin.register(ImportRun)
+class ImportRunAdmin(admin.ModelAdmin):
+    list_display = (
+        "file_name", "sheet", "status", "commit", "write_mode", "backend", "rows_read", "rows_written",
+        "elapsed_seconds", "rows_per_sec", "peak_memory_mb", "started_at",
+    )
+    list_filter = ("status", "commit", "write_mode", "backend")
+    search_fields = ("file_name", "file_fingerprint")
+    date_hierarchy = "started_at"
+    readonly_fields = ("started_at", "updated_at", "finished_at", "summary", "error")
+    fieldsets = (
+        (None, {"fields": ("file_name", "file_fingerprint", "file_size", "sheet", "status", "error")}),
+        ("Opciones", {"fields": ("commit", "write_mode", "backend", "resumed_from", "last_committed_row")}),
+        ("Filas", {"fields": (
+            "rows_read", "rows_written", "stock_created", "stock_updated", "stock_skipped",
+            "sales_created", "sales_updated", "sales_skipped",
+        )}),
+        ("Rendimiento", {"fields": (
+            "header_seconds", "read_seconds", "parse_seconds", "lookup_seconds", "write_seconds",
+            "elapsed_seconds", "rows_per_sec", "peak_memory_bytes",
+        )}),
+        ("Detalle", {"fields": ("summary", "started_at", "updated_at", "finished_at"), "classes": ("collapse",)}),
+    )
+
+    @admin.display(description="Memoria pico (MB)", ordering="peak_memory_bytes")
+    def peak_memory_mb(self, obj):
+        if obj.peak_memory_bytes is None:
+            return None
+        return round(obj.peak_memory_bytes / 2**20, 1)
+
+
+@admin.register(DatasetCatalog)
+class DatasetCatalogAdmin(admin.ModelAdmin):
+    list_display = ("kind", "store", "year", "min_date", "max_date", "rows", "updated_at")
+    list_filter = ("kind", "year", "store__region")
+    search_fields = ("store__code", "store__name")
+    list_select_related = ("store",)
@@ -0,0 +1,21 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.services import response_cache, season_cube
+
+
+class Command(BaseCommand):
+    help = (
+        "Arma el cubo de temporada (ventas y stock por sucursal, familia y día en .npy) desde "
+        "SalesRecord/StockRecord y lo publica en SEASON_CUBE_DIR. Los workers toman la versión nueva "
+        "sin reiniciar. El loader lo publica solo si SEASON_CUBE_ENABLED está activo."
+    )
+
+    def handle(self, *args, **opts):
+        t0 = time.perf_counter()
+        version = season_cube.build_cube()
+        response_cache.bump_version()
+        self.stdout.write(self.style.SUCCESS(
+            f"Cubo publicado: versión {version} en {season_cube.cube_dir()} ({time.perf_counter() - t0:.2f}s)"
+        ))
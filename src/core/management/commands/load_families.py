@@ -2,6 +2,8 @@ import json, sys
 from django.core.management.base import BaseCommand, CommandError
 from django.db import transaction
 from core.models import Family
+from core.services import response_cache
+from core.services.navidad_chunks import bulk_batch_size
 
 class Command(BaseCommand):
     help = "Carga/actualiza familias desde JSON con campos: origen, sector, familia_std, subfamilia_std."
@@ -23,9 +25,17 @@ class Command(BaseCommand):
             raise CommandError("El JSON debe ser una lista.")
 
         required = {"origen", "sector", "familia_std", "subfamilia_std"}
-        seen = set()
+        seen = {}  # clave -> None, en orden de aparición
         created = updated = deactivated = 0
 
+        # Tabla actual completa (una query): clave -> (id, is_active)
+        existing = {
+            (origen, sector, familia, subfamilia): (pk, is_active)
+            for pk, origen, sector, familia, subfamilia, is_active in Family.objects.values_list(
+                "id", "origen", "sector", "familia_std", "subfamilia_std", "is_active"
+            ).order_by()
+        }
+
         for i, row in enumerate(data, 1):
             if not required.issubset(row):
                 faltan = required - set(row)
@@ -33,23 +43,31 @@ class Command(BaseCommand):
 
             key = (row["origen"].strip(), row["sector"].strip(),
                    row["familia_std"].strip(), row["subfamilia_std"].strip())
-            seen.add(key)
+            # Mismos contadores que update_or_create fila por fila: una clave que ya
+            # existe (o que creó una fila anterior del JSON) cuenta como actualizada.
+            if key in existing or key in seen:
+                updated += 1
+            else:
+                created += 1
+            seen[key] = None
+
+        new = [
+            Family(origen=k[0], sector=k[1], familia_std=k[2], subfamilia_std=k[3], is_active=True)
+            for k in seen if k not in existing
+        ]
+        Family.objects.bulk_create(new, batch_size=bulk_batch_size(Family))
 
-            obj, is_new = Family.objects.update_or_create(
-                origen=key[0], sector=key[1], familia_std=key[2], subfamilia_std=key[3],
-                defaults={"is_active": True},
-            )
-            created += int(is_new)
-            updated += int(not is_new)
+        # Las que vienen en el archivo quedan activas (update_or_create con is_active=True).
+        reactivate = [existing[k][0] for k in seen if k in existing and not existing[k][1]]
+        if reactivate:
+            Family.objects.filter(pk__in=reactivate).update(is_active=True)
 
         if opts["deactivate_missing"]:
-            for obj in Family.objects.filter(is_active=True):
-                k = (obj.origen, obj.sector, obj.familia_std, obj.subfamilia_std)
-                if k not in seen:
-                    obj.is_active = False
-                    obj.save(update_fields=["is_active"])
-                    deactivated += 1
+            missing = [pk for k, (pk, is_active) in existing.items() if is_active and k not in seen]
+            if missing:
+                deactivated = Family.objects.filter(pk__in=missing).update(is_active=False)
 
+        response_cache.bump_version()
         self.stdout.write(self.style.SUCCESS(
             f"OK: created={created}, updated={updated}, deactivated={deactivated}"
         ))
@@ -3,6 +3,9 @@ import sys
 from django.core.management.base import BaseCommand, CommandError
 from django.db import transaction
 from core.models import Region, Zone, Store
+from core.services import response_cache, season_cube
+from core.services.navidad_chunks import bulk_batch_size
+from core.services.rollups import refresh_rollups
 
 def str_to_bool(val):
     if isinstance(val, bool):
@@ -30,8 +33,17 @@ class Command(BaseCommand):
             help="Ancho de zero-padding para sucursal_id (ej. --pad 3 -> 035). 0 = sin padding."
         )
 
-    @transaction.atomic
     def handle(self, *args, **opts):
+        with transaction.atomic():
+            moved = self._load(opts)
+        # Con los datos ya commiteados (igual que el loader): el cubo guarda región/zona/CDR
+        # de cada sucursal. Las temporadas se copian de la versión publicada, sin leer hechos.
+        if moved and season_cube.publish([]):
+            response_cache.bump_version()
+            self.stdout.write("Cubo de temporada republicado con el maestro de sucursales actualizado.")
+
+    def _load(self, opts) -> bool:
+        """Carga el JSON en una transacción. Retorna si alguna sucursal cambió de área o de tipo."""
         path = opts.get("json_path")
         pad = opts.get("pad", 0)
 
@@ -48,15 +60,7 @@ class Command(BaseCommand):
         if not isinstance(data, list):
             raise CommandError("El JSON debe ser una lista de objetos.")
 
-        created_regions = 0
-        created_zones = 0
-        created_stores = 0
-        updated_stores = 0
-
-        # caches simples para evitar queries repetidas
-        region_cache = {}
-        zone_cache = {}
-
+        rows = []
         for i, row in enumerate(data, start=1):
             try:
                 region_name = str(row["region"]).strip()
@@ -70,53 +74,82 @@ class Command(BaseCommand):
 
             # padding opcional
             code = code_raw.zfill(pad) if pad and code_raw.isdigit() else code_raw
+            rows.append((region_name, zone_name, code, is_cdr))
 
-            # Region
-            region = region_cache.get(region_name)
-            if not region:
-                region, r_created = Region.objects.get_or_create(name=region_name)
-                if r_created:
-                    created_regions += 1
-                region_cache[region_name] = region
-
-            # Zone (por región)
-            zone_key = (region.id, zone_name)
-            zone = zone_cache.get(zone_key)
-            if not zone:
-                zone, z_created = Zone.objects.get_or_create(region=region, name=zone_name)
-                if z_created:
-                    created_zones += 1
-                zone_cache[zone_key] = zone
-
-            # Store
-            defaults = {
-                "name": f"{'CDR' if is_cdr else 'Sucursal'} {code}",
-                "region": region,
-                "zone": zone,
-                "is_distribution_center": is_cdr,
-            }
-            store, s_created = Store.objects.get_or_create(code=code, defaults=defaults)
-            if s_created:
-                created_stores += 1
-            else:
-                # actualizar si cambió algo relevante
-                changed = False
-                if store.region_id != region.id:
-                    store.region = region; changed = True
-                if store.zone_id != zone.id:
-                    store.zone = zone; changed = True
-                if store.is_distribution_center != is_cdr:
-                    store.is_distribution_center = is_cdr; changed = True
-                # si el nombre estaba vacío o genérico distinto, refrescamos
-                desired_name = defaults["name"]
-                if not store.name or store.name.startswith("Sucursal ") or store.name.startswith("CDR "):
-                    if store.name != desired_name:
-                        store.name = desired_name; changed = True
-                if changed:
-                    store.save(update_fields=["region", "zone", "is_distribution_center", "name"])
-                    updated_stores += 1
+        # Tablas actuales completas (una query cada una); lo que falta va en un
+        # bulk_create y se relee para tener los ids en cualquier backend.
+        regions = {r.name: r for r in Region.objects.order_by()}
+        new_regions = [Region(name=n) for n in dict.fromkeys(r[0] for r in rows) if n not in regions]
+        if new_regions:
+            Region.objects.bulk_create(new_regions)
+            regions = {r.name: r for r in Region.objects.order_by()}
+        created_regions = len(new_regions)
+
+        zones = {(z.region_id, z.name): z for z in Zone.objects.order_by()}
+        zone_keys = dict.fromkeys((regions[r[0]].id, r[1]) for r in rows)
+        new_zones = [Zone(region_id=rid, name=n) for rid, n in zone_keys if (rid, n) not in zones]
+        if new_zones:
+            Zone.objects.bulk_create(new_zones)
+            zones = {(z.region_id, z.name): z for z in Zone.objects.order_by()}
+        created_zones = len(new_zones)
+
+        # Diff de sucursales en memoria, fila por fila (mismos contadores que el
+        # get_or_create + save de antes: una sucursal puede contar varias veces
+        # si el JSON la repite con datos distintos).
+        stores = {s.code: s for s in Store.objects.order_by()}
+        to_create = {}
+        to_update = {}
+        updated_stores = 0
+        # Sucursales que cambiaron de zona/región o de tipo (CDR) -> zona anterior:
+        # sus rollups de área quedan con los totales viejos.
+        moved = {}
+
+        for region_name, zone_name, code, is_cdr in rows:
+            region = regions[region_name]
+            zone = zones[(region.id, zone_name)]
+            desired_name = f"{'CDR' if is_cdr else 'Sucursal'} {code}"
+
+            store = stores.get(code)
+            if store is None:
+                store = Store(code=code, name=desired_name, region=region, zone=zone, is_distribution_center=is_cdr)
+                stores[code] = to_create[code] = store
+                continue
+
+            # actualizar si cambió algo relevante
+            changed = False
+            if (store.region_id, store.zone_id, store.is_distribution_center) != (region.id, zone.id, is_cdr):
+                if code not in to_create:
+                    moved.setdefault(store.id, store.zone_id)
+            if store.region_id != region.id:
+                store.region = region; changed = True
+            if store.zone_id != zone.id:
+                store.zone = zone; changed = True
+            if store.is_distribution_center != is_cdr:
+                store.is_distribution_center = is_cdr; changed = True
+            # si el nombre estaba vacío o genérico distinto, refrescamos
+            if not store.name or store.name.startswith("Sucursal ") or store.name.startswith("CDR "):
+                if store.name != desired_name:
+                    store.name = desired_name; changed = True
+            if changed:
+                updated_stores += 1
+                if code not in to_create:
+                    to_update[code] = store
+
+        Store.objects.bulk_create(to_create.values(), batch_size=bulk_batch_size(Store))
+        Store.objects.bulk_update(
+            to_update.values(),
+            ["region", "zone", "is_distribution_center", "name"],
+            batch_size=bulk_batch_size(Store),
+        )
+        created_stores = len(to_create)
+
+        # Rollups de las zonas que ganaron o perdieron sucursales (y de sus regiones).
+        rollup_rows = refresh_rollups(set(moved), zones=set(moved.values())) if moved else 0
 
+        response_cache.bump_version()
         self.stdout.write(self.style.SUCCESS(
             f"OK: regiones creadas={created_regions}, zonas creadas={created_zones}, "
-            f"sucursales creadas={created_stores}, sucursales actualizadas={updated_stores}"
+            f"sucursales creadas={created_stores}, sucursales actualizadas={updated_stores}, "
+            f"cambios de área/CDR={len(moved)} (filas de rollup={rollup_rows})"
         ))
+        return bool(moved)
@@ -0,0 +1,27 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.models import DatasetCatalog
+from core.services import response_cache
+from core.services.dataset_catalog import available_years, refresh_catalog
+
+
+class Command(BaseCommand):
+    help = (
+        "Reconstruye el catálogo del dataset (años y primera/última fecha por tipo, sucursal y año) "
+        "desde SalesRecord/StockRecord. El loader lo mantiene solo; usarlo después de borrar o "
+        "cargar datos por otro lado."
+    )
+
+    def handle(self, *args, **opts):
+        t0 = time.perf_counter()
+        written = refresh_catalog()
+        response_cache.bump_version()
+        years = ", ".join(str(y) for y in available_years()) or "-"
+        self.stdout.write(self.style.SUCCESS(
+            f"Catálogo reconstruido: entradas={written} "
+            f"(ventas={DatasetCatalog.objects.filter(kind=DatasetCatalog.Kind.SALES).count()}, "
+            f"stock={DatasetCatalog.objects.filter(kind=DatasetCatalog.Kind.STOCK).count()}), "
+            f"años={years} en {time.perf_counter() - t0:.2f}s"
+        ))
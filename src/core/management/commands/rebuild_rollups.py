@@ -0,0 +1,27 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.models import DailyRollup
+from core.services import response_cache
+from core.services.rollups import refresh_rollups
+
+
+class Command(BaseCommand):
+    help = (
+        "Reconstruye los rollups diarios por zona/región/todas (sucursales y CDR) desde "
+        "SalesRecord/StockRecord. El loader los mantiene solo; usarlo después de borrar o cargar "
+        "datos por otro lado o de mover sucursales de zona."
+    )
+
+    def handle(self, *args, **opts):
+        t0 = time.perf_counter()
+        written = refresh_rollups()
+        response_cache.bump_version()
+        by_level = {
+            level: DailyRollup.objects.filter(level=level).count() for level in DailyRollup.Level.values
+        }
+        detail = ", ".join(f"{level}={n}" for level, n in by_level.items())
+        self.stdout.write(self.style.SUCCESS(
+            f"Rollups reconstruidos: filas={written} ({detail}) en {time.perf_counter() - t0:.2f}s"
+        ))
@@ -0,0 +1,22 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.services import response_cache
+from core.services.season_cumulative import refresh_cumulative
+
+
+class Command(BaseCommand):
+    help = (
+        "Reconstruye la tabla de ventas acumuladas de la temporada (por sucursal, familia y día "
+        "desde el 1/oct) desde SalesRecord. El loader la mantiene sola; usarlo después de borrar o "
+        "cargar ventas por otro lado."
+    )
+
+    def handle(self, *args, **opts):
+        t0 = time.perf_counter()
+        written = refresh_cumulative()
+        response_cache.bump_version()
+        self.stdout.write(self.style.SUCCESS(
+            f"Acumulados reconstruidos: filas={written} en {time.perf_counter() - t0:.2f}s"
+        ))
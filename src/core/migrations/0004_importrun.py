@@ -0,0 +1,55 @@
+# Generated by Django 5.2.8 on 2026-10-17 00:45
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_family_core_family_origen_3151b7_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('file_name', models.CharField(max_length=255)),
+                ('file_fingerprint', models.CharField(max_length=64)),
+                ('file_size', models.BigIntegerField(default=0)),
+                ('sheet', models.CharField(blank=True, default='', max_length=100)),
+                ('status', models.CharField(choices=[('running', 'En curso'), ('done', 'Terminada'), ('failed', 'Fallida')], default='running', max_length=10)),
+                ('commit', models.CharField(default='atomic', max_length=10)),
+                ('write_mode', models.CharField(blank=True, default='', max_length=10)),
+                ('backend', models.CharField(blank=True, default='', max_length=10)),
+                ('resumed_from', models.PositiveIntegerField(default=0)),
+                ('last_committed_row', models.PositiveIntegerField(default=0)),
+                ('rows_read', models.PositiveIntegerField(default=0)),
+                ('rows_written', models.PositiveIntegerField(default=0)),
+                ('stock_created', models.PositiveIntegerField(default=0)),
+                ('stock_updated', models.PositiveIntegerField(default=0)),
+                ('stock_skipped', models.PositiveIntegerField(default=0)),
+                ('sales_created', models.PositiveIntegerField(default=0)),
+                ('sales_updated', models.PositiveIntegerField(default=0)),
+                ('sales_skipped', models.PositiveIntegerField(default=0)),
+                ('header_seconds', models.FloatField(blank=True, null=True)),
+                ('read_seconds', models.FloatField(blank=True, null=True)),
+                ('parse_seconds', models.FloatField(blank=True, null=True)),
+                ('lookup_seconds', models.FloatField(blank=True, null=True)),
+                ('write_seconds', models.FloatField(blank=True, null=True)),
+                ('elapsed_seconds', models.FloatField(blank=True, null=True)),
+                ('rows_per_sec', models.FloatField(blank=True, null=True)),
+                ('peak_memory_bytes', models.BigIntegerField(blank=True, null=True)),
+                ('summary', models.JSONField(blank=True, null=True)),
+                ('error', models.TextField(blank=True, default='')),
+                ('started_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'ordering': ['-started_at'],
+                'indexes': [models.Index(fields=['file_fingerprint', 'sheet'], name='core_import_file_fi_a02dfb_idx')],
+            },
+        ),
+    ]
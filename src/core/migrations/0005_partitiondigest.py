@@ -0,0 +1,27 @@
+# Generated by Django 5.2.8 on 2026-10-17 00:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_importrun'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PartitionDigest',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('store_code', models.CharField(max_length=20)),
+                ('date', models.DateField()),
+                ('digest', models.CharField(max_length=32)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['date'], name='core_partit_date_a7e685_idx')],
+                'unique_together': {('store_code', 'date')},
+            },
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 5.2.8 on 2026-10-17 01:48
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Max, Min
+from django.db.models.functions import ExtractYear
+
+
+def build_catalog(apps, schema_editor):
+    """Carga inicial del catálogo con los datos que ya hay (igual que rebuild_catalog)."""
+    DatasetCatalog = apps.get_model("core", "DatasetCatalog")
+    for kind, model in (("sales", apps.get_model("sales", "SalesRecord")), ("stock", apps.get_model("stock", "StockRecord"))):
+        groups = (
+            model.objects
+            .annotate(year=ExtractYear("date"))
+            .values("store_id", "year")
+            .annotate(min_date=Min("date"), max_date=Max("date"), rows=Count("id"))
+            .order_by()
+        )
+        DatasetCatalog.objects.bulk_create(
+            [DatasetCatalog(kind=kind, **g) for g in groups], batch_size=500,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_partitiondigest'),
+        ('sales', '0002_salesrecord_sales_sales_store_i_4f43c4_idx_and_more'),
+        ('stock', '0002_stockrecord_stock_stock_store_i_1e8be2_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DatasetCatalog',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('sales', 'Ventas'), ('stock', 'Stock')], max_length=5)),
+                ('year', models.PositiveSmallIntegerField()),
+                ('min_date', models.DateField()),
+                ('max_date', models.DateField()),
+                ('rows', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('store', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='catalog', to='core.store')),
+            ],
+            options={
+                'ordering': ['kind', 'year', 'store__code'],
+                'indexes': [models.Index(fields=['kind', 'year'], name='core_datase_kind_ae1970_idx')],
+                'unique_together': {('kind', 'store', 'year')},
+            },
+        ),
+        migrations.RunPython(build_catalog, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,82 @@
+# Generated by Django 5.2.8 on 2026-10-17 01:52
+
+import django.db.models.deletion
+from collections import defaultdict
+
+from django.db import migrations, models
+from django.db.models import Sum
+
+
+def build_rollups(apps, schema_editor):
+    """Carga inicial con los datos que ya hay (igual que rebuild_rollups, los tres niveles desde los hechos)."""
+    DailyRollup = apps.get_model("core", "DailyRollup")
+    facts = (
+        (apps.get_model("sales", "SalesRecord"), "units_sold"),
+        (apps.get_model("stock", "StockRecord"), "stock_units"),
+    )
+    levels = {
+        "zone": ("store__region_id", "store__zone_id"),
+        "region": ("store__region_id",),
+        "all": (),
+    }
+    for level, area in levels.items():
+        cells = defaultdict(lambda: [0, 0])
+        for i, (model, field) in enumerate(facts):
+            groups = model.objects.values_list(
+                *area, "store__is_distribution_center", "family_id", "date",
+            ).annotate(total=Sum(field)).order_by()
+            for *key, total in groups:
+                cells[tuple(key)][i] = total
+        rows = []
+        for key, (sold, stock) in cells.items():
+            region_id, zone_id = (tuple(key[:len(area)]) + (None, None))[:2]
+            is_cdr, family_id, dt = key[len(area):]
+            rows.append(DailyRollup(
+                level=level, region_id=region_id, zone_id=zone_id,
+                area_key=f"{region_id or ''}:{zone_id or ''}", is_cdr=is_cdr,
+                family_id=family_id, date=dt, units_sold=sold, stock_units=stock,
+            ))
+        DailyRollup.objects.bulk_create(rows, batch_size=500)
+
+
+def create_locks(apps, schema_editor):
+    apps.get_model("core", "MaintenanceLock").objects.get_or_create(name="rollups")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_datasetcatalog'),
+        ('sales', '0002_salesrecord_sales_sales_store_i_4f43c4_idx_and_more'),
+        ('stock', '0002_stockrecord_stock_stock_store_i_1e8be2_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('level', models.CharField(choices=[('zone', 'Zona'), ('region', 'Región'), ('all', 'Todas')], max_length=6)),
+                ('area_key', models.CharField(default='', max_length=24)),
+                ('is_cdr', models.BooleanField(default=False)),
+                ('date', models.DateField()),
+                ('units_sold', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('stock_units', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('family', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.family')),
+                ('region', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.region')),
+                ('zone', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.zone')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['level', 'date'], name='core_dailyr_level_8f36a1_idx'), models.Index(fields=['level', 'region', 'date'], name='core_dailyr_level_6e3f44_idx'), models.Index(fields=['level', 'zone', 'date'], name='core_dailyr_level_ceeb16_idx')],
+                'constraints': [models.UniqueConstraint(fields=('level', 'area_key', 'is_cdr', 'family', 'date'), name='core_dailyrollup_unique_cell')],
+            },
+        ),
+        migrations.CreateModel(
+            name='MaintenanceLock',
+            fields=[
+                ('name', models.CharField(max_length=40, primary_key=True, serialize=False)),
+            ],
+        ),
+        migrations.RunPython(build_rollups, migrations.RunPython.noop),
+        migrations.RunPython(create_locks, migrations.RunPython.noop),
+    ]
@@ -1,4 +1,5 @@
 from django.db import models
+from django.utils import timezone
 
 class Region(models.Model):
     name = models.CharField(max_length=100, unique=True)
@@ -56,4 +57,199 @@ class Family(models.Model):
         ordering = ["origen", "sector", "familia_std", "subfamilia_std"]
 
     def __str__(self):
-        return f"{self.origen} • {self.sector} • {self.familia_std} • {self.subfamilia_std}"
\ No newline at end of file
+        return f"{self.origen} • {self.sector} • {self.familia_std} • {self.subfamilia_std}"
+
+class ImportRun(models.Model):
+    """
+    Una ejecución del navidad loader (todas salvo dry_run). Queda como historial
+    de rendimiento: filas leídas/escritas, contadores, tiempos por fase, filas/s
+    y memoria pico. En modo commit="chunk" además guarda el checkpoint (última
+    fila de datos commiteada) para poder retomar el mismo archivo con
+    resume=True si la corrida se corta.
+    """
+
+    class Status(models.TextChoices):
+        RUNNING = "running", "En curso"
+        DONE = "done", "Terminada"
+        FAILED = "failed", "Fallida"
+
+    file_name = models.CharField(max_length=255)
+    file_fingerprint = models.CharField(max_length=64)  # sha256 del contenido
+    file_size = models.BigIntegerField(default=0)
+    sheet = models.CharField(max_length=100, blank=True, default="")
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.RUNNING)
+    # Opciones de la corrida (mismo default de commit que process_navidad_file).
+    commit = models.CharField(max_length=10, default="atomic")
+    write_mode = models.CharField(max_length=10, blank=True, default="")
+    backend = models.CharField(max_length=10, blank=True, default="")
+
+    # Filas de datos contadas desde la primera después del encabezado (1 = primera fila de datos).
+    resumed_from = models.PositiveIntegerField(default=0)  # checkpoint desde el que arrancó
+    last_committed_row = models.PositiveIntegerField(default=0)
+
+    # Contadores (los mismos del summary). rows_written = creados + actualizados.
+    rows_read = models.PositiveIntegerField(default=0)
+    rows_written = models.PositiveIntegerField(default=0)
+    stock_created = models.PositiveIntegerField(default=0)
+    stock_updated = models.PositiveIntegerField(default=0)
+    stock_skipped = models.PositiveIntegerField(default=0)
+    sales_created = models.PositiveIntegerField(default=0)
+    sales_updated = models.PositiveIntegerField(default=0)
+    sales_skipped = models.PositiveIntegerField(default=0)
+
+    # Tiempos por fase en segundos (ver process_navidad_file). En modo pipeline,
+    # read_seconds es la espera del escritor y parse_seconds el tiempo de parseo
+    # de los procesos worker (corre en paralelo a la escritura).
+    header_seconds = models.FloatField(null=True, blank=True)
+    read_seconds = models.FloatField(null=True, blank=True)
+    parse_seconds = models.FloatField(null=True, blank=True)
+    lookup_seconds = models.FloatField(null=True, blank=True)
+    write_seconds = models.FloatField(null=True, blank=True)
+    elapsed_seconds = models.FloatField(null=True, blank=True)
+    rows_per_sec = models.FloatField(null=True, blank=True)
+    peak_memory_bytes = models.BigIntegerField(null=True, blank=True)  # pico del proceso (ru_maxrss)
+
+    summary = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True, default="")
+    started_at = models.DateTimeField(default=timezone.now)  # no auto_now_add: en "atomic" se inserta al final
+    updated_at = models.DateTimeField(auto_now=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["file_fingerprint", "sheet"]),  # búsqueda del checkpoint
+        ]
+        ordering = ["-started_at"]
+
+    def __str__(self):
+        return f"{self.file_name} [{self.sheet or '-'}] {self.status} ({self.last_committed_row} filas)"
+
+
+class PartitionDigest(models.Model):
+    """
+    Hash del contenido de una partición (sucursal, día) tal como la escribió el
+    navidad loader. Con incremental=True, las particiones cuyo hash no cambió se
+    saltean sin buscar ni escribir nada. store_code es el código normalizado del
+    archivo (no una FK): la comparación se hace antes de resolver sucursales.
+    """
+    store_code = models.CharField(max_length=20)
+    date = models.DateField()
+    digest = models.CharField(max_length=32)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = (("store_code", "date"),)
+        indexes = [
+            models.Index(fields=["date"]),  # se cargan por día
+        ]
+
+    def __str__(self):
+        return f"{self.store_code} | {self.date} | {self.digest}"
+
+
+class DatasetCatalog(models.Model):
+    """
+    Metadatos del dataset para las vistas: por tipo (ventas/stock), sucursal y
+    año, la primera y la última fecha con datos y la cantidad de registros. Lo
+    mantiene el navidad loader para las sucursales/años que toca cada
+    importación (ver core.services.dataset_catalog) y se reconstruye con
+    `manage.py rebuild_catalog`. Años disponibles, último año con ventas y
+    última fecha por región/zona/sucursal salen de acá en vez de recorrer
+    SalesRecord/StockRecord.
+    """
+
+    class Kind(models.TextChoices):
+        SALES = "sales", "Ventas"
+        STOCK = "stock", "Stock"
+
+    kind = models.CharField(max_length=5, choices=Kind.choices)
+    store = models.ForeignKey(Store, on_delete=models.CASCADE, related_name="catalog")
+    year = models.PositiveSmallIntegerField()
+    min_date = models.DateField()
+    max_date = models.DateField()
+    rows = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = (("kind", "store", "year"),)
+        indexes = [
+            models.Index(fields=["kind", "year"]),
+        ]
+        ordering = ["kind", "year", "store__code"]
+
+    def __str__(self):
+        return f"{self.kind} | {self.store.code} | {self.year}: {self.min_date} - {self.max_date}"
+
+
+class DailyRollup(models.Model):
+    """
+    Ventas y stock diarios por familia ya sumados por área, para las curvas y
+    el estado de ventas sin recorrer SalesRecord/StockRecord. Tres niveles en
+    la misma tabla (sucursales y CDR siempre por separado, is_cdr):
+    - zone: por (región, zona) de la sucursal;
+    - region: por región;
+    - all: todas las sucursales.
+    region/zone son los de Store (los mismos que filtran las vistas con
+    store__region_id / store__zone_id). area_key ("región:zona", vacíos en
+    los niveles más gruesos) es la clave de área sin nulos para la restricción
+    única, así el refresco escribe con upsert. Lo mantiene el navidad loader
+    para las zonas y fechas que toca cada importación (ver core.services.rollups)
+    y se reconstruye con `manage.py rebuild_rollups`.
+    """
+
+    class Level(models.TextChoices):
+        ZONE = "zone", "Zona"
+        REGION = "region", "Región"
+        ALL = "all", "Todas"
+
+    level = models.CharField(max_length=6, choices=Level.choices)
+    region = models.ForeignKey(Region, on_delete=models.CASCADE, null=True, blank=True, related_name="+")
+    zone = models.ForeignKey(Zone, on_delete=models.CASCADE, null=True, blank=True, related_name="+")
+    area_key = models.CharField(max_length=24, default="")
+    is_cdr = models.BooleanField(default=False)
+    family = models.ForeignKey(Family, on_delete=models.CASCADE, related_name="+")
+    date = models.DateField()
+    units_sold = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    stock_units = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["level", "area_key", "is_cdr", "family", "date"], name="core_dailyrollup_unique_cell",
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["level", "date"]),
+            models.Index(fields=["level", "region", "date"]),
+            models.Index(fields=["level", "zone", "date"]),
+        ]
+
+    def __str__(self):
+        area = self.zone_id if self.level == self.Level.ZONE else self.region_id
+        return f"{self.level}:{area or '-'} | {'CDR' if self.is_cdr else 'sucursales'} | {self.family_id} | {self.date}"
+
+
+class MaintenanceLock(models.Model):
+    """
+    Filas de bloqueo (una por nombre) para serializar mantenimientos que leen y
+    reescriben datos derivados compartidos, como el refresco de rollups: el
+    que toma la fila con select_for_update espera a que el anterior commitee.
+    """
+    name = models.CharField(max_length=40, primary_key=True)
+
+    def __str__(self):
+        return self.name
+
+
+class DataVersion(models.Model):
+    """
+    Contador global de versión de los datos (una sola fila, pk=1). Lo suben
+    las importaciones y los comandos que cargan o rearman datos; el cache de
+    respuestas de los endpoints *_data lo usa en la clave, así que una versión
+    nueva invalida todo lo cacheado (ver core.services.response_cache).
+    """
+    version = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"v{self.version} ({self.updated_at:%Y-%m-%d %H:%M})"
@@ -0,0 +1,107 @@
+"""
+Catálogo del dataset (DatasetCatalog): una entrada por tipo (ventas/stock),
+sucursal y año con la primera/última fecha y la cantidad de registros.
+
+Las vistas lo usan para las preguntas que antes recorrían toda la tabla de
+hechos (annotate(ExtractYear) + values_list trae una fila por registro):
+- available_years(): años con ventas o stock;
+- latest_year(kind): último año con datos de ese tipo;
+- last_date(kind, start, end, **filtros): última fecha con datos en un rango
+  para un ámbito de sucursales. Los filtros son los mismos que usan las vistas
+  sobre los hechos (store__region_id, store__zone_id, store__code,
+  store__is_distribution_center): el catálogo tiene la FK a Store igual que
+  SalesRecord/StockRecord. Si `end` corta un año con datos posteriores, el
+  catálogo no alcanza y se consulta la tabla de hechos (acotada al rango).
+Son queries sobre una tabla de sucursales × años × 2, no sobre los hechos.
+
+Mantenimiento:
+- el navidad loader anota las sucursales y fechas de cada chunk que escribe
+  (navidad_footprint) y al final (dentro de su transacción) recalcula solo esas
+  sucursales en el rango de años del archivo (refresh_catalog);
+- `manage.py rebuild_catalog` lo recalcula entero (después de borrar datos a
+  mano, por el admin, etc.).
+"""
+from datetime import date
+
+from django.db import transaction
+from django.db.models import Count, Max, Min
+from django.db.models.functions import ExtractYear
+
+from core.models import DatasetCatalog
+from core.services.navidad_chunks import bulk_batch_size
+from sales.models import SalesRecord
+from stock.models import StockRecord
+
+SALES = DatasetCatalog.Kind.SALES
+STOCK = DatasetCatalog.Kind.STOCK
+FACT_MODELS = {SALES: SalesRecord, STOCK: StockRecord}
+
+
+def refresh_catalog(store_ids=None, years=None) -> int:
+    """
+    Recalcula las entradas de las sucursales store_ids en los años `years`
+    (mínimo a máximo) a partir de los hechos; None = todas / todos. Retorna la
+    cantidad de entradas escritas.
+    """
+    if store_ids is not None and not store_ids:
+        return 0
+    written = 0
+    with transaction.atomic():
+        for kind, model in FACT_MODELS.items():
+            facts = model.objects.all()
+            stale = DatasetCatalog.objects.filter(kind=kind)
+            if store_ids is not None:
+                facts = facts.filter(store_id__in=store_ids)
+                stale = stale.filter(store_id__in=store_ids)
+            if years:
+                lo, hi = min(years), max(years)
+                facts = facts.filter(date__range=(date(lo, 1, 1), date(hi, 12, 31)))
+                stale = stale.filter(year__range=(lo, hi))
+            groups = (
+                facts
+                .annotate(year=ExtractYear("date"))
+                .values("store_id", "year")
+                .annotate(min_date=Min("date"), max_date=Max("date"), rows=Count("id"))
+                .order_by()
+            )
+            entries = [
+                DatasetCatalog(
+                    kind=kind, store_id=g["store_id"], year=g["year"],
+                    min_date=g["min_date"], max_date=g["max_date"], rows=g["rows"],
+                )
+                for g in groups
+            ]
+            stale.delete()
+            DatasetCatalog.objects.bulk_create(entries, batch_size=bulk_batch_size(DatasetCatalog))
+            written += len(entries)
+    return written
+
+
+def available_years() -> list[int]:
+    """Años con datos de ventas o de stock, ordenados."""
+    return list(DatasetCatalog.objects.values_list("year", flat=True).distinct().order_by("year"))
+
+
+def latest_year(kind) -> int | None:
+    return DatasetCatalog.objects.filter(kind=kind).aggregate(y=Max("year"))["y"]
+
+
+def last_date(kind, start: date, end: date, **filters) -> date | None:
+    """
+    Última fecha con datos de `kind` en [start, end] para las sucursales que
+    cumplen filters (lookups sobre store, como en los hechos).
+    """
+    entries = DatasetCatalog.objects.filter(
+        kind=kind, year__range=(start.year, end.year), min_date__lte=end, **filters,
+    )
+    top = entries.aggregate(d=Max("max_date"))["d"]
+    if top is None or top < start:
+        return None
+    if top <= end:
+        return top
+    # Hay datos después de end: la última fecha dentro del rango sale de los hechos.
+    return (
+        FACT_MODELS[kind].objects
+        .filter(date__range=(start, end), **filters)
+        .aggregate(d=Max("date"))["d"]
+    )
@@ -0,0 +1,110 @@
+"""
+Tamaño de chunk del navidad loader y límites de parámetros por statement.
+
+Con adaptive=True el loader mide cada escritura de chunk (split incremental,
+lookup de existentes, armado de instancias, escritura y checkpoint) y ajusta el
+tamaño del chunk siguiente:
+- si la escritura tardó más que max_flush_seconds, achica a lo que entra en
+  esa latencia (con margen);
+- si hay target_rows_per_sec y ya se alcanza, mantiene el tamaño;
+- si no, crece (x GROWTH) sin pasarse de lo que proyecta la latencia máxima.
+  Si crecer empeora el throughput, vuelve al mejor tamaño medido y deja de crecer.
+En SQLite la latencia máxima por defecto es baja (chunks chicos = locks cortos);
+en PostgreSQL es más alta y los chunks pueden crecer bastante más.
+
+El tamaño de chunk no está atado a los límites de parámetros del backend: los
+bulk_create/bulk_update se parten con bulk_batch_size() y la búsqueda de
+existentes (navidad_keys) ya respeta el límite.
+
+El primer chunk usa chunk_size; los tamaños y tiempos de escritura de cada uno
+quedan en summary["chunk_sizes"/"flush_seconds"].
+"""
+from django.db import connection
+
+MIN_CHUNK_SIZE = 1_000
+MAX_CHUNK_SIZE = 200_000
+GROWTH = 1.5
+SHRINK_MARGIN = 0.8  # al achicar, apuntar a este % de la latencia máxima
+REGRESSION = 0.9  # throughput por debajo de este % del mejor = crecer empeoró
+
+DEFAULT_MAX_FLUSH_SECONDS = {"sqlite": 1.0, "postgresql": 10.0}
+FALLBACK_MAX_FLUSH_SECONDS = 5.0
+
+# Django no parte los bulk en PostgreSQL; con server-side binding (psycopg) el
+# protocolo admite hasta 65535 parámetros por statement.
+PARAM_LIMITS = {"postgresql": 65_535}
+
+
+def bulk_batch_size(model) -> int | None:
+    """
+    batch_size para bulk_create/bulk_update de model (cota: un parámetro por
+    columna y fila). None cuando Django ya parte por su cuenta (SQLite:
+    max_query_params) o el backend no tiene límite conocido.
+    """
+    if connection.features.max_query_params:
+        return None
+    limit = PARAM_LIMITS.get(connection.vendor)
+    return max(1, limit // len(model._meta.concrete_fields)) if limit else None
+
+
+def default_max_flush_seconds() -> float:
+    return DEFAULT_MAX_FLUSH_SECONDS.get(connection.vendor, FALLBACK_MAX_FLUSH_SECONDS)
+
+
+class ChunkSizer:
+    def __init__(
+        self,
+        initial: int,
+        *,
+        adaptive: bool = False,
+        max_flush_seconds: float | None = None,
+        target_rows_per_sec: float | None = None,
+        min_size: int = MIN_CHUNK_SIZE,
+        max_size: int = MAX_CHUNK_SIZE,
+    ):
+        self.adaptive = adaptive
+        self.max_flush_seconds = max_flush_seconds or default_max_flush_seconds()
+        self.target_rows_per_sec = target_rows_per_sec
+        self.min_size = min(min_size, initial)
+        self.max_size = max(max_size, initial)
+        self.size = initial
+
+        self.sizes: list[int] = []  # filas de cada chunk escrito
+        self.seconds: list[float] = []  # duración de cada escritura
+        self._best: tuple[float, int] | None = None  # (filas/s, tamaño)
+        self._growing = True
+
+    def record(self, rows: int, seconds: float):
+        """Registra una escritura y, en modo adaptativo, decide el tamaño siguiente."""
+        self.sizes.append(rows)
+        self.seconds.append(round(seconds, 4))
+        # El último chunk del archivo suele venir incompleto: no sirve para decidir.
+        if not self.adaptive or rows < self.size // 2 or seconds <= 0:
+            return
+
+        rate = rows / seconds
+        fits = rows * self.max_flush_seconds / seconds  # tamaño proyectado a la latencia máxima
+        if self._best is None or rate > self._best[0]:
+            self._best = (rate, rows)
+
+        if seconds > self.max_flush_seconds:
+            new = fits * SHRINK_MARGIN
+        elif self.target_rows_per_sec and rate >= self.target_rows_per_sec:
+            new = self.size
+        elif self._growing and rows > self._best[1] and rate < self._best[0] * REGRESSION:
+            new = self._best[1]
+            self._growing = False
+        elif self._growing:
+            new = min(self.size * GROWTH, fits * SHRINK_MARGIN)
+        else:
+            new = self.size
+        self.size = int(max(self.min_size, min(self.max_size, new)))
+
+    def stats(self) -> dict:
+        return {
+            "chunk_adaptive": self.adaptive,
+            "chunk_sizes": self.sizes,
+            "flush_seconds": self.seconds,
+            "max_flush_seconds": self.max_flush_seconds if self.adaptive else None,
+            "target_rows_per_sec": self.target_rows_per_sec,
+        }
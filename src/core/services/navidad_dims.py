@@ -0,0 +1,104 @@
+"""
+Índice de dimensiones del navidad loader.
+
+Se arma una sola vez al arrancar la importación (dos queries) y lo usan todos
+los chunks: código de sucursal -> (store_id, región, zona, es CDR) y origen ->
+family_id de la familia activa. Reemplaza los fetch de Store/Family por chunk y
+el acceso a store.region / store.zone por fila con strict_area. resolve()
+trabaja sobre los diccionarios del ParsedChunk: una búsqueda por valor distinto.
+
+Es una foto del maestro al inicio de la importación (que corre en una
+transacción): sucursales o familias creadas durante la corrida no se ven.
+"""
+from typing import NamedTuple
+
+import numpy as np
+
+from core.models import Family, Store
+from core.services.navidad_parse import ParsedChunk
+
+
+class StoreDim(NamedTuple):
+    id: int
+    region: str  # nombre sin espacios alrededor (como se compara con el archivo)
+    zone: str
+    is_cdr: bool
+
+
+class ResolvedChunk(NamedTuple):
+    """Resolución por fila de un ParsedChunk (arrays alineados con el chunk)."""
+    store_ids: np.ndarray  # int64, -1 si la sucursal no existe
+    family_ids: np.ndarray  # int64, -1 si no hay familia activa con ese origen
+    is_cdr: np.ndarray
+    area_ok: np.ndarray  # sucursal existente y, con strict_area, región/zona coinciden
+    ok: np.ndarray  # fila escribible: sucursal (y área, con strict_area) y familia resueltas
+
+
+class DimensionIndex:
+    def __init__(self, stores: dict[str, StoreDim], families: dict[str, int]):
+        self.stores = stores
+        self.families = families
+        self.store_hits = 0
+        self.store_misses = 0
+        self.family_hits = 0
+        self.family_misses = 0
+
+    @classmethod
+    def load(cls) -> "DimensionIndex":
+        stores = {
+            code: StoreDim(pk, (region or "").strip(), (zone or "").strip(), is_cdr)
+            for pk, code, region, zone, is_cdr in Store.objects.values_list(
+                "id", "code", "region__name", "zone__name", "is_distribution_center"
+            ).order_by()
+        }
+        # Si hay varias familias activas con el mismo origen gana la última según
+        # el ordering de Family (mismo criterio que el loader tuvo siempre).
+        families = {}
+        for origen, pk in Family.objects.filter(is_active=True).values_list("origen", "id"):
+            families[origen] = pk
+        return cls(stores, families)
+
+    def resolve(self, chunk: ParsedChunk, *, strict_area: bool, count: bool = False) -> ResolvedChunk:
+        """
+        Resuelve un chunk entero: una búsqueda por valor distinto del diccionario
+        del chunk y un take de NumPy por fila. count=True suma a los contadores
+        hits/misses (por fila, como se procesan: la familia solo se busca si la
+        sucursal y, con strict_area, el área resolvieron).
+        """
+        code_ids = chunk.ids["code"]
+        store_dims = [self.stores.get(c) for c in chunk.values["code"]]
+        store_ids = np.array([d.id if d else -1 for d in store_dims], dtype=np.int64)[code_ids]
+        is_cdr = np.array([bool(d and d.is_cdr) for d in store_dims], dtype=bool)[code_ids]
+        has_store = store_ids >= 0
+
+        area_ok = has_store
+        if strict_area:
+            # Índice esperado de región/zona (en el diccionario del chunk) para cada sucursal.
+            for name, attr in (("region", "region"), ("zona", "zone")):
+                pos = {v: i for i, v in enumerate(chunk.values[name])}
+                expected = np.array([pos.get(getattr(d, attr), -2) if d else -2 for d in store_dims], dtype=np.int64)
+                area_ok = area_ok & (expected[code_ids] == chunk.ids[name])
+
+        family_ids = np.array(
+            [self.families.get(sf, -1) for sf in chunk.values["subfam"]], dtype=np.int64
+        )[chunk.ids["subfam"]]
+        ok = area_ok & (family_ids >= 0)
+
+        if count:
+            n_store = int(has_store.sum())
+            self.store_hits += n_store
+            self.store_misses += len(chunk) - n_store
+            n_family = int(ok.sum())
+            self.family_hits += n_family
+            self.family_misses += int(area_ok.sum()) - n_family
+        return ResolvedChunk(store_ids, family_ids, is_cdr, area_ok, ok)
+
+    def stats(self) -> dict:
+        return {
+            "dim_stores": len(self.stores),
+            "dim_families": len(self.families),
+            "dim_store_hits": self.store_hits,
+            "dim_store_misses": self.store_misses,
+            "dim_family_hits": self.family_hits,
+            "dim_family_misses": self.family_misses,
+        }
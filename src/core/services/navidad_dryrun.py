@@ -0,0 +1,144 @@
+"""
+Validación sin escritura (dry_run=True) del navidad loader.
+
+Lee y parsea el archivo igual que una importación y resuelve cada chunk contra
+el índice de dimensiones en memoria, pero no escribe nada en la BD (ni
+registros, ni hashes de partición, ni ImportRun). El summary trae
+stock_valid/sales_valid (lo que se escribiría), las filas rechazadas por motivo
+y un informe compacto de códigos de sucursal, subfamilias y áreas sin match.
+Con csv_path (rejects_csv del loader), además vuelca las filas rechazadas a un
+CSV a medida que se procesa cada chunk (no se acumulan en memoria).
+
+Motivos (en el orden en que los evalúa el loader):
+- sucursal_inexistente: el código no está en el maestro de sucursales;
+- area_distinta (solo strict_area): región/zona del archivo no coinciden con las
+  de la sucursal;
+- subfamilia_sin_familia_activa: no hay familia activa con ese origen.
+Las filas sin fecha o sin subfamilia ya las descarta el parseo: se informan
+solo como cantidad (rows_unparsed).
+"""
+import csv
+from collections import Counter
+from pathlib import Path
+
+import numpy as np
+
+from core.services.navidad_dims import ResolvedChunk
+from core.services.navidad_parse import ParsedChunk
+
+UNKNOWN_STORE = "sucursal_inexistente"
+AREA_MISMATCH = "area_distinta"
+NO_ACTIVE_FAMILY = "subfamilia_sin_familia_activa"
+REASONS = (UNKNOWN_STORE, AREA_MISMATCH, NO_ACTIVE_FAMILY)
+
+REPORT_LIMIT = 100  # entradas por lista en el informe (las de más filas)
+
+CSV_HEADER = [
+    "fila", "motivo", "fecha", "sucursal", "subfamilia", "region", "zona",
+    "unidades_stock", "unidades_vendidas",
+]
+
+
+class RejectReport:
+    def __init__(self, csv_path: Path | None = None):
+        self.csv_path = Path(csv_path) if csv_path else None
+        self.by_reason = Counter()
+        self.codes = Counter()
+        self.subfams = Counter()
+        self.areas = Counter()
+        self.rows_unparsed = 0
+        self._file = None
+        self._writer = None
+
+    def open(self):
+        if self.csv_path is not None:
+            self.csv_path.parent.mkdir(parents=True, exist_ok=True)
+            # utf-8-sig y ";" para que Excel en español lo abra directo.
+            self._file = open(self.csv_path, "w", newline="", encoding="utf-8-sig")
+            self._writer = csv.writer(self._file, delimiter=";")
+            self._writer.writerow(CSV_HEADER)
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def add(self, chunk: ParsedChunk, res: ResolvedChunk, *, n_raw: int, first_row: int):
+        """
+        Registra los rechazos de un chunk. first_row es el número de fila del
+        archivo (1-based, como lo muestra Excel) de la primera fila cruda del chunk.
+        """
+        self.rows_unparsed += n_raw - len(chunk)
+        if res.ok.all():
+            return
+
+        has_store = res.store_ids >= 0
+        reason = np.full(len(chunk), -1, dtype=np.int8)  # índice en REASONS; -1 = aceptada
+        reason[~has_store] = 0
+        reason[has_store & ~res.area_ok] = 1
+        reason[res.area_ok & ~res.ok] = 2
+
+        rejected = np.flatnonzero(reason >= 0)
+        sub = chunk.take(rejected)
+        reasons = [REASONS[r] for r in reason[rejected].tolist()]
+        self.by_reason.update(reasons)
+
+        fields = ("date", "code", "subfam", "region", "zona", "stock_units", "units_sold")
+        rows = list(sub.rows(fields))
+        for why, (dt, code, subfam, region, zona, _, _) in zip(reasons, rows):
+            if why == UNKNOWN_STORE:
+                self.codes[code] += 1
+            elif why == AREA_MISMATCH:
+                self.areas[(code, region, zona)] += 1
+            else:
+                self.subfams[subfam] += 1
+
+        if self._writer is not None:
+            file_rows = (first_row + sub.positions).tolist()
+            self._writer.writerows(
+                (row_no, why, *row) for row_no, why, row in zip(file_rows, reasons, rows)
+            )
+
+    @property
+    def rejected_rows(self) -> int:
+        return sum(self.by_reason.values())
+
+    def stats(self) -> dict:
+        return {
+            "rejected_rows": self.rejected_rows,
+            "rejected_by_reason": {r: self.by_reason[r] for r in REASONS if self.by_reason[r]},
+            "rows_unparsed": self.rows_unparsed,
+            "unmatched_codes": [
+                {"code": code, "rows": n} for code, n in self.codes.most_common(REPORT_LIMIT)
+            ],
+            "unmatched_subfamilies": [
+                {"subfam": subfam, "rows": n} for subfam, n in self.subfams.most_common(REPORT_LIMIT)
+            ],
+            "area_mismatches": [
+                {"code": code, "region": region, "zona": zona, "rows": n}
+                for (code, region, zona), n in self.areas.most_common(REPORT_LIMIT)
+            ],
+            "unmatched_codes_distinct": len(self.codes),
+            "unmatched_subfamilies_distinct": len(self.subfams),
+            "rejects_csv": str(self.csv_path) if self.csv_path else None,
+        }
+
+    def print_report(self):
+        s = self.stats()
+        print(
+            f"[dry_run] filas rechazadas={s['rejected_rows']} {s['rejected_by_reason']} "
+            f"sin_fecha_o_subfamilia={s['rows_unparsed']}",
+            flush=True,
+        )
+        for item in s["unmatched_codes"][:20]:
+            print(f"[dry_run]   sucursal {item['code']!r}: {item['rows']} filas", flush=True)
+        for item in s["unmatched_subfamilies"][:20]:
+            print(f"[dry_run]   subfamilia {item['subfam']!r}: {item['rows']} filas", flush=True)
+        for item in s["area_mismatches"][:20]:
+            print(
+                f"[dry_run]   sucursal {item['code']!r} con región/zona "
+                f"{item['region']!r}/{item['zona']!r}: {item['rows']} filas",
+                flush=True,
+            )
+        if s["rejects_csv"]:
+            print(f"[dry_run] filas rechazadas en {s['rejects_csv']}", flush=True)
@@ -0,0 +1,38 @@
+"""
+Huella de una importación del navidad loader: sucursales y rango de fechas de
+los chunks que se escribieron. Al final de la corrida se recalcula solo lo
+derivado que toca esa huella: catálogo del dataset, rollups por área y
+acumulados de la temporada (summary["catalog_entries"/"rollup_rows"/
+"cumulative_rows"]).
+
+El rango va de la primera a la última fecha del archivo, sin huecos: en
+write_mode="replace" también se borran días del medio que no vinieron.
+"""
+from core.services.navidad_dims import DimensionIndex
+from core.services.navidad_parse import ParsedChunk
+
+
+class ImportFootprint:
+    def __init__(self, dims: DimensionIndex):
+        self.dims = dims
+        self.store_ids: set[int] = set()
+        self.start = None
+        self.end = None
+
+    def add(self, chunk: ParsedChunk):
+        # Por valor distinto del chunk: las sucursales que no resuelven no escriben nada.
+        for code in chunk.values["code"]:
+            store = self.dims.stores.get(code)
+            if store is not None:
+                self.store_ids.add(store.id)
+        dates = chunk.values["date"]
+        if dates:
+            lo, hi = min(dates), max(dates)
+            self.start = lo if self.start is None else min(self.start, lo)
+            self.end = hi if self.end is None else max(self.end, hi)
+
+    @property
+    def years(self) -> list[int]:
+        if self.start is None:
+            return []
+        return list(range(self.start.year, self.end.year + 1))
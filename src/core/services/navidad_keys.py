@@ -0,0 +1,92 @@
+"""
+Búsqueda exacta de registros existentes por clave (store_id, family_id, date).
+
+Filtrar con store_id__in × family_id__in × date__in trae el producto cartesiano
+del chunk: con muchas sucursales/familias y un archivo ralo (no toda sucursal
+tiene toda subfamilia) se leen muchas más filas de las que el chunk toca. Acá se
+consultan solo las tuplas del chunk:
+- PostgreSQL: JOIN contra unnest() de tres arrays (3 parámetros, sin importar
+  cuántas claves);
+- SQLite con JSON1: JOIN contra json_each() de un único parámetro JSON;
+- resto: (store_id, family_id, date) IN (VALUES ...), en tandas que respetan el
+  límite de parámetros del backend.
+Las filas devueltas son exactamente las claves del chunk que ya existen.
+"""
+import json
+
+from django.db import connection
+
+KEY_FIELDS = ("store", "family", "date")
+
+
+def _batches(keys: list[tuple], size: int):
+    for i in range(0, len(keys), size):
+        yield keys[i:i + size]
+
+
+def _key_queries(model, keys, select: str):
+    """Genera (sql, params) para `SELECT <select>` de las filas de model con esas claves."""
+    table = connection.ops.quote_name(model._meta.db_table)
+    cols = [connection.ops.quote_name(model._meta.get_field(f).column) for f in KEY_FIELDS]
+    keys = list(keys)
+
+    if connection.vendor == "postgresql":
+        join = " AND ".join(f"t.{c} = k.{c}" for c in cols)
+        yield (
+            f"SELECT {select} FROM {table} t "
+            f"JOIN unnest(%s::bigint[], %s::bigint[], %s::date[]) AS k({', '.join(cols)}) ON {join}",
+            [[k[0] for k in keys], [k[1] for k in keys], [k[2] for k in keys]],
+        )
+        return
+
+    if connection.vendor == "sqlite" and connection.features.supports_json_field:
+        # Un solo parámetro: las claves viajan como JSON y se desarman con json_each.
+        join = " AND ".join(f"t.{c} = k.{c}" for c in cols)
+        fields = ", ".join(f"json_extract(value, '$[{i}]') AS {c}" for i, c in enumerate(cols))
+        payload = json.dumps([[k[0], k[1], k[2].isoformat()] for k in keys])
+        yield (
+            f"SELECT {select} FROM (SELECT {fields} FROM json_each(%s)) k "
+            f"JOIN {table} t ON {join}",
+            [payload],
+        )
+        return
+
+    max_params = connection.features.max_query_params or 999
+    for batch in _batches(keys, max(1, max_params // len(KEY_FIELDS))):
+        values = ", ".join(["(%s, %s, %s)"] * len(batch))
+        params = []
+        for store_id, family_id, dt in batch:
+            params += [store_id, family_id, connection.ops.adapt_datefield_value(dt)]
+        yield (
+            f"SELECT {select} FROM {table} t WHERE ({', '.join(f't.{c}' for c in cols)}) IN (VALUES {values})",
+            params,
+        )
+
+
+def fetch_existing(model, keys) -> dict[tuple, object]:
+    """
+    {(store_id, family_id, date): instancia} de las claves que ya existen. Las
+    instancias traen solo pk y clave (alcanza para bulk_update de los valores).
+    """
+    found = {}
+    if not keys:
+        return found
+    # Solo pk + clave: el resto de las columnas queda diferido (el loader las pisa).
+    q = connection.ops.quote_name
+    columns = [model._meta.pk.column] + [model._meta.get_field(f).column for f in KEY_FIELDS]
+    select = ", ".join(f"t.{q(c)}" for c in columns)
+    for sql, params in _key_queries(model, keys, select):
+        for obj in model.objects.raw(sql, params):
+            found[(obj.store_id, obj.family_id, obj.date)] = obj
+    return found
+
+
+def count_existing(model, keys) -> int:
+    if not keys:
+        return 0
+    total = 0
+    with connection.cursor() as cursor:
+        for sql, params in _key_queries(model, keys, "COUNT(*)"):
+            cursor.execute(sql, params)
+            total += cursor.fetchone()[0]
+    return total
@@ -1,208 +1,303 @@
+import time
+from contextlib import nullcontext
 from pathlib import Path
-from datetime import date, datetime
-
-import pandas as pd
-from openpyxl import load_workbook
-from django.db import transaction
-
-from core.models import Store, Family
+from itertools import chain, islice
+
+import numpy as np
+from django.db import connection, transaction
+
+from core.services.navidad_parse import (  # noqa: F401 (re-export para scripts)
+    HEADER_SCAN_ROWS,
+    REQUIRED_COLS,
+    ParsedChunk,
+    _detect_header_row,
+    _header_from_rows,
+    parse_chunk,
+    partition_batches,
+    parse_date,
+    parse_date_column,
+    parse_number,
+    parse_number_column,
+    zfill_code,
+    zfill_code_column,
+)
+from core.services.navidad_chunks import ChunkSizer, bulk_batch_size
+from core.services.dataset_catalog import refresh_catalog
+from core.services.navidad_dims import DimensionIndex, ResolvedChunk
+from core.services.navidad_dryrun import RejectReport
+from core.services.navidad_footprint import ImportFootprint
+from core.services.navidad_keys import count_existing, fetch_existing
+from core.services.navidad_partitions import PartitionTracker
+from core.services.navidad_phases import QueryCounter, phase
+from core.services.navidad_pg import CopyStager, copy_supported, upsert_returning
+from core.services.navidad_pipeline import iter_pipelined
+from core.services.navidad_prefetch import PrefetchedSource
+from core.services.navidad_readers import open_row_source, open_xlsx
+from core.services.navidad_replace import RangeReplacer
+from core.services.navidad_runs import (
+    fail_run,
+    file_fingerprint,
+    finish_run,
+    peak_memory_bytes,
+    resume_point,
+    save_checkpoint,
+    start_run,
+)
+from core.services import response_cache, season_cube
+from core.services.rollups import refresh_rollups
+from core.services.season_cumulative import refresh_cumulative
 from sales.models import SalesRecord
 from stock.models import StockRecord
 
-REQUIRED_COLS = [
-    "Dia", "Region", "Zona", "Sucursal",
-    "SubFamilia", "Unidades Stock Final", "Unidades Vendidas",
-]
-
-
-def parse_date(val):
-    """
-    Normaliza fechas de Excel / strings / datetime a date.
-    """
-    if val is None:
-        return None
-
-    # Si ya viene como Timestamp/datetime/date -> devolvemos date
-    if isinstance(val, pd.Timestamp):
-        return val.date()
-    if isinstance(val, datetime):
-        return val.date()
-    if isinstance(val, date):
-        return val
-
-    s = str(val).strip()
-    if s == "":
-        return None
-
-    # Intento 1: parsear como string día/mes/año
-    try:
-        return pd.to_datetime(s, dayfirst=True, errors="raise").date()
-    except Exception:
-        pass
+# merge: busca existentes y separa bulk_create / bulk_update.
+# upsert: INSERT ... ON CONFLICT (store, family, date) DO UPDATE, sin lookup previo
+#   (fuera de PostgreSQL se cuentan las existentes para los contadores).
+WRITE_MODES = ("merge", "upsert", "replace")
 
-    # Intento 2: manejar números de fecha de Excel
-    try:
-        return pd.to_datetime(float(s), unit="D", origin="1899-12-30").date()
-    except Exception:
-        return None
+KEY_FIELDS = ["store", "family", "date"]
 
+# orm: flush_chunk por chunk (SQLite y fallback general).
+# copy: COPY a staging + merge set-based (solo PostgreSQL).
+# auto: copy en PostgreSQL, orm en el resto.
+BACKENDS = ("auto", "orm", "copy")
+COMMIT_MODES = ("atomic", "chunk")
 
-def parse_number(val):
-    """
-    Normaliza números con coma/punto/espacios a float o None.
+def _read_excel_header(path: Path, sheet: str | None) -> tuple[list[str], int]:
     """
-    if val is None or (isinstance(val, float) and pd.isna(val)):
-        return None
-    if isinstance(val, (int, float)):
-        return float(val)
-
-    s = str(val).strip().replace(" ", "")
-    if s == "":
-        return None
-
-    if "," in s and "." in s:
-        last_comma, last_dot = s.rfind(","), s.rfind(".")
-        if last_comma > last_dot:
-            s = s.replace(".", "").replace(",", ".")
-        else:
-            s = s.replace(",", "")
-    else:
-        if "," in s:
-            s = s.replace(".", "").replace(",", ".")
-
-    try:
-        return float(s)
-    except Exception:
-        return None
-
+    Lee solo la cabecera del Excel (primeras HEADER_SCAN_ROWS filas, en read_only) y retorna:
+    (nombres_canonicos, fila_datos_inicio)
 
-def zfill_code(raw, pad: int) -> str:
-    """
-    Normaliza el código de sucursal. Hoy ignora 'pad' a propósito
-    (no agrega ceros, solo limpia). Si querés realmente pad-left,
-    acá es donde tocarías.
+    process_navidad_file no la usa (detecta sobre el mismo iterador de datos);
+    queda para los scripts de diagnóstico.
     """
-    s = str(raw).strip()
-    try:
-        num = float(s)
-        if num.is_integer():
-            s = str(int(num))
-    except Exception:
-        pass
-
-    if s.isdigit():
-        s = s.lstrip("0") or "0"
-    return s
-
-
-def _detect_header_row(df_no_header: pd.DataFrame, max_scan: int = 30):
-    def norm(s):
-        s = "" if s is None else str(s)
-        return " ".join(s.replace("\n", " ").strip().lower().split())
-
-    required = [
-        "Dia", "Region", "Zona", "Sucursal",
-        "SubFamilia", "Unidades Stock Final", "Unidades Vendidas",
-    ]
-    aliases = {
-        "día": "Dia", "dia": "Dia", "fecha": "Dia",
-        "region": "Region", "región": "Region",
-        "zona": "Zona",
-        "sucursal": "Sucursal", "tienda": "Sucursal", "store": "Sucursal",
-        "subfamilia": "SubFamilia", "sub familia": "SubFamilia", "origen": "SubFamilia",
-        "unidades stock final": "Unidades Stock Final", "stock final unidades": "Unidades Stock Final",
-        "stock final": "Unidades Stock Final", "stock (unidades)": "Unidades Stock Final",
-        "unidades vendidas": "Unidades Vendidas", "ventas unidades": "Unidades Vendidas", "ventas": "Unidades Vendidas",
-    }
-
-    required_norm = [norm(x) for x in required]
-    aliases_norm = {k: v for k, v in aliases.items()}
-
-    best = (-1, -1, None)
-    nrows = min(len(df_no_header), max_scan)
-
-    for i in range(nrows):
-        row = list(df_no_header.iloc[i].values)
-        cols_map = []
-        matches = 0
-
-        for val in row:
-            key = norm(val)
-            canon = None
-            if key in aliases_norm:
-                canon = aliases_norm[key]
-            elif key in required_norm:
-                canon = required[required_norm.index(key)]
-
-            cols_map.append(canon)
-            if canon in required:
-                matches += 1
+    with open_xlsx(Path(path), sheet) as source:
+        head_rows = list(islice(source.rows, HEADER_SCAN_ROWS))
+    return _header_from_rows(head_rows)
+
+
+def _timed(iterable, summary: dict, key: str):
+    """Recorre iterable sumando a summary[key] el tiempo que tarda cada next()."""
+    it = iter(iterable)
+    while True:
+        t0 = time.perf_counter()
+        try:
+            item = next(it)
+        except StopIteration:
+            summary[key] += time.perf_counter() - t0
+            return
+        summary[key] += time.perf_counter() - t0
+        yield item
 
-        if matches > best[0]:
-            best = (matches, i, cols_map)
-        if matches == len(required):
-            break
 
-    if best[0] >= 5:
-        return best[1], best[2]
-    return None, None
+def _writable_masks(chunk: ParsedChunk, res: ResolvedChunk) -> tuple[np.ndarray, np.ndarray]:
+    """(filas con stock a escribir, filas con venta a escribir) de un chunk resuelto."""
+    has_stock = res.ok & ~np.isnan(chunk.stock_units)
+    has_sales = res.ok & (chunk.units_sold > 0) & ~res.is_cdr  # NaN > 0 es False
+    return has_stock, has_sales
 
 
-def _read_excel_header(path: Path, sheet: str | None) -> tuple[list[str], int]:
+def _upsert_records(model, objs: list, update_fields: list[str]) -> tuple[int, int]:
     """
-    Lee solo la cabecera del Excel (primeras ~100 filas) y retorna:
-    (nombres_canonicos, fila_datos_inicio)
+    INSERT ... ON CONFLICT (store, family, date) DO UPDATE. En PostgreSQL las
+    creadas salen del mismo INSERT (RETURNING xmax = 0, navidad_pg); en el
+    resto el upsert (bulk_create) no informa qué filas insertó y antes se
+    cuentan las claves que ya existen (búsqueda exacta, ver navidad_keys).
+    Retorna (creados, actualizados), por clave distinta.
     """
-    p = Path(path)
-    target = (sheet if sheet not in (None, "") else 0)
-
-    x = pd.read_excel(p, sheet_name=target, header=None, nrows=100)
-    if isinstance(x, dict):
-        raw = x[target] if isinstance(target, str) and target in x else next(iter(x.values()))
-    else:
-        raw = x
-
-    hdr_idx, cols_map = _detect_header_row(raw, max_scan=30)
-    if hdr_idx is None:
-        raise ValueError("No pude detectar la fila de encabezados. Verificá el archivo/hoja.")
-
-    header_row_values = list(raw.iloc[hdr_idx].values)
-    canon_cols: list[str] = []
-
-    for j, v in enumerate(header_row_values):
-        canon = cols_map[j]
-        if canon is None:
-            canon = str(v).strip() if v is not None else f"col_{j}"
-        canon_cols.append(canon)
+    if not objs:
+        return 0, 0
+
+    # Una misma clave no puede afectarse dos veces en un mismo INSERT ... ON CONFLICT:
+    # nos quedamos con la última aparición (igual que un bulk_update en orden).
+    deduped = {}
+    for obj in objs:
+        deduped[(obj.store_id, obj.family_id, obj.date)] = obj
+    rows = list(deduped.values())
+
+    if copy_supported():
+        created = upsert_returning(model, rows, update_fields)
+        return created, len(rows) - created
+
+    with phase("lookup"):
+        created = len(rows) - count_existing(model, deduped.keys())
+    model.objects.bulk_create(
+        rows,
+        update_conflicts=True,
+        unique_fields=KEY_FIELDS,
+        update_fields=update_fields,
+        batch_size=bulk_batch_size(model),
+    )
+    return created, len(rows) - created
+
+
+def process_navidad_file(path: Path, **options):
+    """
+    Loader masivo para archivo de Navidad (opciones en _process_navidad_file):
+    - Detecta encabezados automáticamente y lee en streaming (navidad_readers).
+    - Procesa en chunks y escribe según write_mode/backend (merge con
+      bulk_create / bulk_update, upsert, navidad_replace o COPY con navidad_pg).
+    - Cada corrida (salvo dry_run) queda en ImportRun, también si falla
+      (navidad_runs); los tiempos y queries por fase van al summary.
+    - Después del commit (salvo dry_run o publish_cube=False) publica el cubo de
+      temporada (season_cube) y sube la versión de los datos (response_cache);
+      en commit="chunk" también si falla (puede haber chunks commiteados).
+    """
+    publish_cube = options.pop("publish_cube", True)
+    ledger = {}
+    queries = QueryCounter()
+    t0 = time.perf_counter()
+    try:
+        with connection.execute_wrapper(queries):
+            if options.get("commit", "atomic") == "atomic":
+                with transaction.atomic():
+                    summary = _process_navidad_file(path, ledger=ledger, **options)
+            else:
+                summary = _process_navidad_file(path, ledger=ledger, **options)
+    except BaseException as e:
+        # Después del rollback: en "atomic" la corrida fallida se inserta recién acá.
+        if ledger.get("run") is not None:
+            _add_run_metrics(ledger["summary"], time.perf_counter() - t0, queries)
+            fail_run(ledger["run"], e, ledger["summary"])
+        if options.get("commit") == "chunk" and not options.get("dry_run"):
+            response_cache.bump_version()
+        raise
+    if not options.get("dry_run"):
+        with connection.execute_wrapper(queries), phase("publish"):
+            if publish_cube:
+                summary["cube_version"] = season_cube.publish(summary.get("seasons"))
+            # Después del cubo: una respuesta cacheada con la versión nueva ya lo ve actualizado.
+            summary["data_version"] = response_cache.bump_version()
+    _add_run_metrics(summary, time.perf_counter() - t0, queries)
+    if ledger.get("run") is not None:
+        finish_run(ledger["run"], summary)
+        print(
+            f"[navidad_loader] Corrida #{ledger['run'].pk}: {summary['rows']} filas en "
+            f"{summary['elapsed_seconds']:.1f}s ({summary['rows_per_sec']:.0f} filas/s)",
+            flush=True,
+        )
+    return summary
 
-    miss = [c for c in REQUIRED_COLS if c not in canon_cols]
-    if miss:
-        raise ValueError(f"Faltan columnas requeridas: {', '.join(miss)}")
 
-    # hdr_idx + 1 es donde empiezan los datos (fila siguiente a encabezados)
-    return canon_cols, hdr_idx + 1
+def _add_run_metrics(summary: dict, elapsed: float, queries: QueryCounter):
+    summary["queries"] = queries.stats()
+    summary["elapsed_seconds"] = elapsed
+    summary["rows_per_sec"] = summary["rows"] / elapsed if elapsed > 0 else None
+    summary["peak_memory_bytes"] = peak_memory_bytes()
 
 
-@transaction.atomic
-def process_navidad_file(
+def _process_navidad_file(
     path: Path,
     *,
     sheet: str | None,
     pad: int = 0,
     strict_area: bool = False,
     chunk_size: int = 10_000,
+    write_mode: str = "merge",
+    backend: str = "auto",
+    reader: str = "openpyxl",
+    workers: int = 0,
+    progress=None,
+    commit: str = "atomic",
+    resume: bool = False,
+    incremental: bool = False,
+    adaptive: bool = False,
+    max_flush_seconds: float | None = None,
+    target_rows_per_sec: float | None = None,
+    dry_run: bool = False,
+    rejects_csv: Path | str | None = None,
+    prefetched: PrefetchedSource | None = None,
+    ledger: dict | None = None,
 ):
     """
-    Loader masivo para archivo de Navidad:
-    - Detecta encabezados automáticamente.
-    - Lee con openpyxl para no cargar todo en memoria.
-    - Procesa en chunks y hace bulk_create / bulk_update.
+    Cuerpo de process_navidad_file; la transacción externa (commit="atomic") y el
+    cierre de la corrida en ImportRun los pone el wrapper. ledger, si viene, se
+    completa con "run" y "summary" apenas existen (para registrar también las
+    corridas que fallan).
+
+    Opciones (el detalle está en el módulo de cada una):
+    - write_mode: "merge", "upsert" o "replace" (navidad_replace).
+    - backend: "orm", "copy" o "auto" (navidad_pg).
+    - reader: "openpyxl" o "raw" (navidad_readers); workers > 0: navidad_pipeline.
+    - commit / resume: navidad_runs. incremental: navidad_partitions.
+    - adaptive / max_flush_seconds / target_rows_per_sec: navidad_chunks.
+    - dry_run / rejects_csv: navidad_dryrun. prefetched: navidad_prefetch.
+    - progress(filas_procesadas, filas_totales | None): en los mismos puntos en
+      que se imprime el avance y una vez al final.
     """
     p = Path(path)
     if not p.exists():
         raise FileNotFoundError(p)
-
-    canon_cols, data_start_row = _read_excel_header(p, sheet)
+    if write_mode not in WRITE_MODES:
+        raise ValueError(f"write_mode inválido: {write_mode!r} (opciones: {', '.join(WRITE_MODES)})")
+    if backend not in BACKENDS:
+        raise ValueError(f"backend inválido: {backend!r} (opciones: {', '.join(BACKENDS)})")
+    if backend == "copy" and not copy_supported():
+        raise ValueError("backend='copy' requiere PostgreSQL.")
+    if commit not in COMMIT_MODES:
+        raise ValueError(f"commit inválido: {commit!r} (opciones: {', '.join(COMMIT_MODES)})")
+    if dry_run and resume:
+        raise ValueError("dry_run=True no se combina con resume (no hay checkpoint que retomar).")
+    if rejects_csv is not None and not dry_run:
+        raise ValueError("rejects_csv requiere dry_run=True.")
+    if resume and commit != "chunk":
+        raise ValueError("resume=True requiere commit='chunk'.")
+    if write_mode == "replace" and commit != "atomic":
+        raise ValueError("write_mode='replace' requiere commit='atomic' (si no, se verían fechas a medio reemplazar).")
+    if write_mode == "replace" and incremental:
+        raise ValueError("write_mode='replace' no se combina con incremental (reemplaza todo el rango).")
+    # COPY mergea todo al final desde staging: no hay chunks que commitear por separado.
+    if commit == "chunk" and backend == "copy":
+        raise ValueError("commit='chunk' no está soportado con backend='copy'.")
+    use_copy = not dry_run and commit == "atomic" and (backend == "copy" or (backend == "auto" and copy_supported()))
+    if workers < 0:
+        raise ValueError("workers debe ser >= 0")
+    if chunk_size < 1:
+        raise ValueError("chunk_size debe ser >= 1")
+    if prefetched is not None and (resume or workers or adaptive):
+        raise ValueError("Un archivo ya parseado (prefetched) no admite resume, workers ni adaptive.")
+
+    if prefetched is not None:
+        # Leído y parseado en otro proceso (ver navidad_prefetch): acá solo se escribe.
+        source = prefetched
+        canon_cols, data_start_row = prefetched.canon_cols, prefetched.data_start_row
+        data_rows = iter(())
+        header_seconds = prefetched.header_seconds
+    else:
+        # Un único open del archivo (xlsx o csv/tsv): los encabezados se detectan sobre
+        # las primeras filas del mismo iterador que después recorre el bucle principal.
+        t_header = time.perf_counter()
+        source = open_row_source(p, sheet, reader=reader)
+        try:
+            head_rows = list(islice(source.rows, HEADER_SCAN_ROWS))
+            canon_cols, data_start_row = _header_from_rows(head_rows)
+        except Exception:
+            source.close()
+            raise
+        data_rows = chain(head_rows[data_start_row:], source.rows)
+        header_seconds = time.perf_counter() - t_header
+
+    # Corrida en ImportRun (todas salvo dry_run) y, en commit="chunk", checkpoint:
+    # filas de datos ya commiteadas por una corrida anterior.
+    run = None
+    resume_from = 0
+    if not dry_run:
+        fingerprint = file_fingerprint(p)
+        sheet_key = str(sheet or "")
+        previous = resume_point(fingerprint, sheet_key) if resume else None
+        if previous is not None:
+            resume_from = previous.last_committed_row
+            print(
+                f"[navidad_loader] Retomando '{p.name}' desde el checkpoint: "
+                f"{resume_from} filas ya commiteadas (corrida #{previous.pk})",
+                flush=True,
+            )
+        elif resume:
+            print(f"[navidad_loader] Sin corrida pendiente para '{p.name}'; se importa completo.", flush=True)
+        run = start_run(
+            p, fingerprint, sheet_key, resumed_from=resume_from,
+            commit=commit, write_mode=write_mode, backend="copy" if use_copy else "orm",
+        )
+        data_rows = islice(data_rows, resume_from, None)
 
     summary = {
         "stock_created": 0,
@@ -214,29 +309,50 @@ def process_navidad_file(
         "rows": 0,
         "detected_columns": canon_cols,
         "rows_raw": 0,
+        "backend": "copy" if use_copy else "orm",
+        "format": source.format,
+        "reader": source.meta.get("reader"),
+        "workers": workers,
+        "commit": commit,
+        "rows_skipped_checkpoint": resume_from,
+        "stock_deleted": 0,
+        "sales_deleted": 0,
+        "incremental": incremental,
+        "partitions_changed": 0,
+        "partitions_skipped": 0,
+        "rows_unchanged": 0,
+        "lookup_keys": 0,
+        "lookup_rows_fetched": 0,
+        "lookup_seconds": 0.0,
+        "chunks_written": 0,
+        "write_seconds": 0.0,
+        "dry_run": dry_run,
+        "header_seconds": header_seconds,
+        "read_seconds": 0.0,
+        "parse_seconds": 0.0,
+        "finish_seconds": 0.0,
     }
+    if ledger is not None:
+        ledger.update(run=run, summary=summary)
 
-    store_cache: dict[str, Store | None] = {}
-    family_cache: dict[tuple[str, str], Family | None] = {}
-
-    target_sheet = (sheet if sheet not in (None, "") else None)
-    wb = load_workbook(p, read_only=True, data_only=True)
-
-    if target_sheet is None:
-        ws = wb.active
-    elif isinstance(target_sheet, int):
-        ws = wb.worksheets[target_sheet]
-    else:
-        ws = wb[target_sheet]
+    # Maestro de sucursales/familias en memoria (dos queries para toda la corrida).
+    with phase("dims"):
+        dims = DimensionIndex.load()
+    partitions = PartitionTracker(dims, incremental=incremental, strict_area=strict_area)
 
     col_indices = {col_name: idx for idx, col_name in enumerate(canon_cols)}
 
-    try:
-        total_rows = max(0, ws.max_row - data_start_row)
-    except Exception:
-        total_rows = None
+    total_rows = (
+        max(0, source.total_rows - data_start_row - resume_from) if source.total_rows is not None else None
+    )
 
     report_every = max(1, min(1000, chunk_size))
+    sizer = ChunkSizer(
+        chunk_size,
+        adaptive=adaptive,
+        max_flush_seconds=max_flush_seconds,
+        target_rows_per_sec=target_rows_per_sec,
+    )
 
     if total_rows:
         print(f"[navidad_loader] Procesando '{p.name}' hoja='{sheet}' filas_aprox={total_rows}", flush=True)
@@ -244,240 +360,347 @@ def process_navidad_file(
         print(f"[navidad_loader] Procesando '{p.name}' hoja='{sheet}' (filas totales desconocidas)", flush=True)
 
     row_count = 0
-    chunk: list[dict] = []
 
-    def flush_chunk(chunk_rows: list[dict]):
-        nonlocal summary
-        if not chunk_rows:
-            return
+    stager = None
+    if use_copy:
+        stager = CopyStager(strict_area=strict_area)
+        stager.open()
 
-        codes = set()
-        subfams = set()
-        dates = set()
-
-        for r in chunk_rows:
-            codes.add(r["code"])
-            subfams.add(r["subfam"])
-            dates.add(r["date"])
-
-        codes_list = list(codes)
-        subfams_list = list(subfams)
-        dates_list = list(dates)
-
-        # Pre-cargar Stores en cache
-        stores_qs = Store.objects.filter(code__in=codes_list)
-        for s in stores_qs:
-            store_cache[s.code] = s
-
-        # Pre-cargar Families activas en cache (por origen)
-        families_qs = Family.objects.filter(origen__in=subfams_list, is_active=True)
-        for f in families_qs:
-            family_cache[(f.origen, "is_active")] = f
-
-        store_ids = [
-            store_cache[c].id
-            for c in codes_list
-            if store_cache.get(c) is not None
-        ]
-        family_ids = [
-            family_cache.get((sf, "is_active")).id
-            for sf in subfams_list
-            if family_cache.get((sf, "is_active")) is not None
-        ]
+    replacer = RangeReplacer(_upsert_records) if write_mode == "replace" and not (use_copy or dry_run) else None
+    rejects = RejectReport(rejects_csv) if dry_run else None
+    footprint = ImportFootprint(dims) if not dry_run else None
 
-        existing_stock = {}
-        existing_sales = {}
+    def flush_chunk(chunk: ParsedChunk):
+        if not len(chunk):
+            return
 
-        if store_ids and family_ids and dates_list:
-            stock_qs = StockRecord.objects.filter(
-                store_id__in=store_ids,
-                family_id__in=family_ids,
-                date__in=dates_list,
+        # 1) Resolver sucursal/familia de todo el chunk (índice de dimensiones, por valor distinto).
+        res = dims.resolve(chunk, strict_area=strict_area, count=True)
+        stock_missing = np.isnan(chunk.stock_units)
+        has_stock, has_sales = _writable_masks(chunk, res)
+        summary["stock_skipped"] += len(chunk) - int(has_stock.sum())
+        summary["sales_skipped"] += len(chunk) - int(has_sales.sum())
+
+        dates = chunk.values["date"]
+
+        def keyed(mask, values):
+            """(claves (store_id, family_id, date), valores) de las filas de mask, en orden."""
+            idx = np.flatnonzero(mask)
+            keys = zip(
+                res.store_ids[idx].tolist(),
+                res.family_ids[idx].tolist(),
+                [dates[d] for d in chunk.ids["date"][idx].tolist()],
             )
-            for obj in stock_qs:
-                existing_stock[(obj.store_id, obj.family_id, obj.date)] = obj
+            return list(keys), values[idx].tolist()
 
-            sales_qs = SalesRecord.objects.filter(
-                store_id__in=store_ids,
-                family_id__in=family_ids,
-                date__in=dates_list,
-            )
-            for obj in sales_qs:
-                existing_sales[(obj.store_id, obj.family_id, obj.date)] = obj
+        stock_keys, stock_values = keyed(has_stock, chunk.stock_units)
+        sales_keys, sales_values = keyed(has_sales, chunk.units_sold)
 
+        # 2) Existentes: solo las claves exactas del chunk (ver navidad_keys).
+        #    En modo upsert/replace no hace falta saber qué existe: lo resuelve la BD.
+        existing_stock = {}
+        existing_sales = {}
+        lookup_keys = lookup_seconds = 0
+        if write_mode == "merge" and (stock_keys or sales_keys):
+            t0 = time.perf_counter()
+            with phase("lookup"):
+                existing_stock = fetch_existing(StockRecord, set(stock_keys))
+                existing_sales = fetch_existing(SalesRecord, set(sales_keys))
+            lookup_seconds = time.perf_counter() - t0
+            lookup_keys = len(set(stock_keys)) + len(set(sales_keys))
+            summary["lookup_keys"] += lookup_keys
+            summary["lookup_rows_fetched"] += len(existing_stock) + len(existing_sales)
+            summary["lookup_seconds"] += lookup_seconds
+
+        # 3) Instancias solo para lo que se escribe. Las existentes vienen de la BD
+        #    con la clave nada más y se actualizan en el lugar.
         to_create_stock: list[StockRecord] = []
         to_update_stock: list[StockRecord] = []
         to_create_sales: list[SalesRecord] = []
         to_update_sales: list[SalesRecord] = []
 
-        for r in chunk_rows:
-            store = store_cache.get(r["code"])
-            if store is None:
-                summary["stock_skipped"] += 1
-                summary["sales_skipped"] += 1
-                continue
-
-            if strict_area:
-                region_excel = r.get("region", "")
-                zona_excel = r.get("zona", "")
-                try:
-                    if (
-                        store.region.name.strip() != region_excel
-                        or store.zone.name.strip() != zona_excel
-                    ):
-                        summary["stock_skipped"] += 1
-                        summary["sales_skipped"] += 1
-                        continue
-                except Exception:
-                    summary["stock_skipped"] += 1
-                    summary["sales_skipped"] += 1
-                    continue
-
-            family = family_cache.get((r["subfam"], "is_active"))
-            if family is None:
-                summary["stock_skipped"] += 1
-                summary["sales_skipped"] += 1
-                continue
-
-            # STOCK
-            if r["stock_units"] is not None:
-                key = (store.id, family.id, r["date"])
-                existing = existing_stock.get(key)
-                if existing:
-                    existing.stock_units = r["stock_units"]
-                    existing.stock_value = None
-                    to_update_stock.append(existing)
-                else:
-                    to_create_stock.append(
-                        StockRecord(
-                            store=store,
-                            family=family,
-                            date=r["date"],
-                            stock_units=r["stock_units"],
-                            stock_value=None,
-                        )
-                    )
+        for key, value in zip(stock_keys, stock_values):
+            existing = existing_stock.get(key)
+            if existing:
+                existing.stock_units = value
+                existing.stock_value = None
+                to_update_stock.append(existing)
             else:
-                summary["stock_skipped"] += 1
-
-            # SALES
-            if (
-                r["units_sold"] is not None
-                and r["units_sold"] > 0
-                and not store.is_distribution_center
-            ):
-                key = (store.id, family.id, r["date"])
-                existing = existing_sales.get(key)
-                if existing:
-                    existing.units_sold = r["units_sold"]
-                    existing.revenue = None
-                    to_update_sales.append(existing)
-                else:
-                    to_create_sales.append(
-                        SalesRecord(
-                            store=store,
-                            family=family,
-                            date=r["date"],
-                            units_sold=r["units_sold"],
-                            revenue=None,
-                        )
+                to_create_stock.append(
+                    StockRecord(
+                        store_id=key[0],
+                        family_id=key[1],
+                        date=key[2],
+                        stock_units=value,
+                        stock_value=None,
                     )
+                )
+
+        for key, value in zip(sales_keys, sales_values):
+            existing = existing_sales.get(key)
+            if existing:
+                existing.units_sold = value
+                existing.revenue = None
+                to_update_sales.append(existing)
             else:
-                summary["sales_skipped"] += 1
+                to_create_sales.append(
+                    SalesRecord(
+                        store_id=key[0],
+                        family_id=key[1],
+                        date=key[2],
+                        units_sold=value,
+                        revenue=None,
+                    )
+                )
+
+        if replacer is not None:
+            # Particiones (store_id, date) de todas las filas resueltas, aunque no generen
+            # registros: una venta en 0 también reemplaza la venta vieja.
+            ok = np.flatnonzero(res.ok)
+            resolved_partitions = set(zip(
+                res.store_ids[ok].tolist(), [dates[d] for d in chunk.ids["date"][ok].tolist()]
+            ))
+            with transaction.atomic():
+                replacer.write(resolved_partitions, to_create_stock, to_create_sales, summary)
+            print(
+                f"[chunk_flush] replace particiones={len(resolved_partitions)} "
+                f"stock={len(to_create_stock)} | sales={len(to_create_sales)}",
+                flush=True,
+            )
+            return
+
+        if write_mode == "upsert":
+            with transaction.atomic():
+                created, updated = _upsert_records(
+                    StockRecord, to_create_stock, ["stock_units", "stock_value"]
+                )
+                summary["stock_created"] += created
+                summary["stock_updated"] += updated
+                created, updated = _upsert_records(
+                    SalesRecord, to_create_sales, ["units_sold", "revenue"]
+                )
+                summary["sales_created"] += created
+                summary["sales_updated"] += updated
+
+            print(
+                f"[chunk_flush] upsert stock={len(to_create_stock)} sin_valor={int(stock_missing.sum())} "
+                f"| sales={len(to_create_sales)}",
+                flush=True,
+            )
+            return
 
         # Transacción por chunk (anidada a la global)
         with transaction.atomic():
             if to_create_stock:
-                StockRecord.objects.bulk_create(to_create_stock)
+                StockRecord.objects.bulk_create(to_create_stock, batch_size=bulk_batch_size(StockRecord))
                 summary["stock_created"] += len(to_create_stock)
             if to_update_stock:
                 StockRecord.objects.bulk_update(
                     to_update_stock,
                     ["stock_units", "stock_value"],
+                    batch_size=bulk_batch_size(StockRecord),
                 )
                 summary["stock_updated"] += len(to_update_stock)
             if to_create_sales:
-                SalesRecord.objects.bulk_create(to_create_sales)
+                SalesRecord.objects.bulk_create(to_create_sales, batch_size=bulk_batch_size(SalesRecord))
                 summary["sales_created"] += len(to_create_sales)
             if to_update_sales:
                 SalesRecord.objects.bulk_update(
                     to_update_sales,
                     ["units_sold", "revenue"],
+                    batch_size=bulk_batch_size(SalesRecord),
                 )
                 summary["sales_updated"] += len(to_update_sales)
 
         # Debug del chunk
-        stock_none_count = sum(
-            1 for r in chunk_rows if r["stock_units"] is None
-        )
         print(
             f"[chunk_flush] stock: crear={len(to_create_stock)} actualizar={len(to_update_stock)} "
-            f"sin_valor={stock_none_count} | sales: crear={len(to_create_sales)} "
-            f"actualizar={len(to_update_sales)}",
+            f"sin_valor={int(stock_missing.sum())} | sales: crear={len(to_create_sales)} "
+            f"actualizar={len(to_update_sales)} | existentes: claves={lookup_keys} "
+            f"encontradas={len(existing_stock) + len(existing_sales)} en {lookup_seconds * 1000:.1f} ms",
             flush=True,
         )
 
-    # Bucle principal de filas Excel
-    for row_idx, row in enumerate(
-        ws.iter_rows(min_row=data_start_row + 1, values_only=True),
-        start=data_start_row + 1,
-    ):
-        row_count += 1
-
-        if row_count % report_every == 0:
-            if total_rows:
-                pct = (row_count / total_rows) * 100
-                print(
-                    f"[navidad_loader] Procesadas {row_count}/{total_rows} filas ({pct:.1f}%)",
-                    flush=True,
-                )
-            else:
-                print(
-                    f"[navidad_loader] Procesadas {row_count} filas...",
-                    flush=True,
-                )
+    write_chunk = stager.copy_chunk if stager else flush_chunk
+    committed_rows = resume_from
+
+    def write_batch(chunk: ParsedChunk, n_raw: int):
+        """
+        Escribe un chunk (sin las particiones que no cambiaron, si es incremental) y
+        guarda los hashes de partición; en commit="chunk" lo commitea junto con el checkpoint.
+        """
+        nonlocal committed_rows
+        t0 = time.perf_counter()
+        with phase("partitions"):
+            chunk, pending = partitions.split(chunk)
+        footprint.add(chunk)
+        with transaction.atomic() if commit == "chunk" else nullcontext():
+            with phase("write"):
+                write_chunk(chunk)
+            with phase("partitions"):
+                partitions.save(pending)
+            if commit == "chunk":
+                committed_rows += n_raw
+                with phase("checkpoint"):
+                    save_checkpoint(run, committed_rows)
+        elapsed = time.perf_counter() - t0
+        summary["chunks_written"] += 1
+        summary["write_seconds"] += elapsed
+        previous_size = sizer.size
+        sizer.record(n_raw, elapsed)
+        if sizer.size != previous_size:
+            print(f"[chunk_size] {n_raw} filas en {elapsed:.2f}s -> próximo chunk {sizer.size}", flush=True)
+
+    validated_rows = 0
+
+    def validate_batch(chunk: ParsedChunk, n_raw: int):
+        """dry_run: resuelve el chunk contra el índice y registra los rechazos, sin escribir."""
+        nonlocal validated_rows
+        res = dims.resolve(chunk, strict_area=strict_area, count=True)
+        has_stock, has_sales = _writable_masks(chunk, res)
+        summary["stock_skipped"] += len(chunk) - int(has_stock.sum())
+        summary["sales_skipped"] += len(chunk) - int(has_sales.sum())
+        summary["stock_valid"] += int(has_stock.sum())
+        summary["sales_valid"] += int(has_sales.sum())
+        # Número de fila del archivo (1-based) de la primera fila cruda del chunk.
+        rejects.add(chunk, res, n_raw=n_raw, first_row=data_start_row + validated_rows + 1)
+        validated_rows += n_raw
+
+    process_batch = validate_batch if dry_run else write_batch
+    if dry_run:
+        summary["stock_valid"] = 0
+        summary["sales_valid"] = 0
+        rejects.open()
+
+    def report_progress():
+        if progress is not None:
+            progress(row_count, total_rows)
+        if total_rows:
+            pct = (row_count / total_rows) * 100
+            print(
+                f"[navidad_loader] Procesadas {row_count}/{total_rows} filas ({pct:.1f}%)",
+                flush=True,
+            )
+        else:
+            print(
+                f"[navidad_loader] Procesadas {row_count} filas...",
+                flush=True,
+            )
 
-        summary["rows"] += 1
-        summary["rows_raw"] += 1
-
-        row_dict = {
-            col_name: row[col_idx] if col_idx < len(row) else None
-            for col_name, col_idx in col_indices.items()
-        }
-
-        dt = parse_date(row_dict["Dia"])
-        if not dt:
-            continue
-
-        code = zfill_code(row_dict["Sucursal"], pad)
-        subfam_excel = str(row_dict["SubFamilia"] or "").strip()
-        if not subfam_excel:
-            continue
-
-        stock_units = parse_number(row_dict.get("Unidades Stock Final"))
-        units_sold = parse_number(row_dict.get("Unidades Vendidas"))
-
-        chunk.append(
-            {
-                "date": dt,
-                "code": code,
-                "subfam": subfam_excel,
-                "stock_units": stock_units,
-                "units_sold": units_sold,
-                "region": str(row_dict.get("Region") or "").strip(),
-                "zona": str(row_dict.get("Zona") or "").strip(),
-            }
-        )
+    def counted_rows():
+        """Bucle principal de filas: cuenta y reporta progreso."""
+        nonlocal row_count
+        for row in data_rows:
+            row_count += 1
+
+            if row_count % report_every == 0:
+                report_progress()
 
-        if len(chunk) >= chunk_size:
-            flush_chunk(chunk)
-            chunk = []
+            summary["rows"] += 1
+            summary["rows_raw"] += 1
+            yield row
 
-    if chunk:
-        flush_chunk(chunk)
+    def raw_batches():
+        # Se acumulan filas crudas (sin partir particiones sucursal/día); el parseo se
+        # hace por columnas al cerrar el chunk.
+        return partition_batches(counted_rows(), lambda: sizer.size, col_indices)
 
-    wb.close()
+    try:
+        if prefetched is not None or workers:
+            if prefetched is not None:
+                parsed_batches = prefetched.batches()
+            else:
+                # Modo pipeline: el proceso lector reabre el archivo y salta título/encabezados
+                # (y las filas ya commiteadas si se retoma un checkpoint).
+                source.close()
+                parsed_batches = iter_pipelined(
+                    p, sheet, reader,
+                    skip=data_start_row + resume_from,
+                    chunk_size=sizer.size,
+                    parse_fn=parse_chunk,
+                    parse_args=(col_indices, pad),
+                    col_indices=col_indices,
+                    workers=workers,
+                    next_size=(lambda: sizer.size) if adaptive else None,
+                )
+            # read_seconds: lo que el escritor espera al lector (o lee del spool del
+            # prefetch); parse_seconds: lo que tardaron los workers en parsear (en
+            # paralelo a la escritura).
+            for n_raw, parsed, parse_seconds in _timed(parsed_batches, summary, "read_seconds"):
+                summary["parse_seconds"] += parse_seconds
+                prev_count = row_count
+                row_count += n_raw
+                summary["rows"] += n_raw
+                summary["rows_raw"] += n_raw
+                if row_count // report_every > prev_count // report_every:
+                    report_progress()
+                process_batch(parsed, n_raw)
+        else:
+            try:
+                for raw_chunk in _timed(raw_batches(), summary, "read_seconds"):
+                    t0 = time.perf_counter()
+                    parsed = parse_chunk(raw_chunk, col_indices, pad)
+                    summary["parse_seconds"] += time.perf_counter() - t0
+                    process_batch(parsed, len(raw_chunk))
+            finally:
+                source.close()
+    except BaseException:
+        if run is not None and commit == "chunk":
+            print(
+                f"[navidad_loader] Corrida #{run.pk} cortada; checkpoint en {committed_rows} filas "
+                "(usar resume=True / --resume para seguir)",
+                flush=True,
+            )
+        raise
+    finally:
+        if rejects is not None:
+            rejects.close()
+
+    t0 = time.perf_counter()
+    with phase("finish"):
+        if replacer is not None:
+            replacer.finish(summary)
+        if stager:
+            stager.merge(summary, replace=write_mode == "replace")
+            stager.close()
+    if footprint is not None:
+        # Derivados (catálogo de años/fechas, rollups por área, acumulados de la
+        # temporada) de las sucursales y fechas que tocó el archivo. Al retomar un
+        # checkpoint no se sabe qué tocó la parte ya commiteada: se recalculan enteros.
+        with phase("catalog"):
+            if resume_from:
+                summary["catalog_entries"] = refresh_catalog()
+            else:
+                summary["catalog_entries"] = refresh_catalog(footprint.store_ids, footprint.years)
+        with phase("rollups"):
+            if resume_from:
+                summary["rollup_rows"] = refresh_rollups()
+            else:
+                summary["rollup_rows"] = refresh_rollups(footprint.store_ids, footprint.start, footprint.end)
+        with phase("cumulative"):
+            if resume_from:
+                summary["cumulative_rows"] = refresh_cumulative()
+            else:
+                summary["cumulative_rows"] = refresh_cumulative(footprint.store_ids, footprint.start, footprint.end)
+        # Temporadas que el cubo vuelve a leer de los hechos al publicarse (None = todas).
+        summary["seasons"] = None if resume_from else footprint.years
+    summary["finish_seconds"] = time.perf_counter() - t0
+
+    summary.update(partitions.stats())
+    summary.update(dims.stats())
+    summary.update(sizer.stats())
+    if rejects is not None:
+        summary.update(rejects.stats())
+        rejects.print_report()
+    if incremental:
+        print(
+            f"[navidad_loader] Incremental: particiones sin cambios={summary['partitions_skipped']} "
+            f"cambiadas={summary['partitions_changed']} filas_salteadas={summary['rows_unchanged']}",
+            flush=True,
+        )
 
+    if progress is not None:
+        progress(row_count, total_rows)
     if total_rows:
         print(
             f"[navidad_loader] Procesado final: {row_count}/{total_rows} filas",
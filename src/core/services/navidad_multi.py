@@ -0,0 +1,210 @@
+"""
+Importación de varios archivos y/o hojas (run_import.py con varios archivos,
+globs o --all-sheets).
+
+- expand_targets() arma la lista de objetivos (archivo, hoja): globs
+  expandidos en orden y, con all_sheets, una entrada por worksheet.
+- Lectura y parseo en paralelo: cada objetivo se prefetchea completo en un pool
+  de `parse_workers` procesos (navidad_prefetch) a un spool en disco.
+- Escritura coordinada, en el orden de targets: cada objetivo se escribe con
+  process_navidad_file (misma transacción, ImportRun y contadores que un
+  archivo suelto). Si dos objetivos comparten claves (sucursal, familia,
+  fecha), gana el último, igual que importándolos uno después del otro:
+  - SQLite: un solo escritor, en este hilo, objetivo por objetivo (SQLite
+    admite un escritor a la vez y la transacción de otro hilo terminaría en
+    "database is locked"). El parseo de los siguientes sigue en paralelo.
+  - PostgreSQL: hasta `writers` hilos, cada uno con su conexión, escriben en
+    paralelo los objetivos que no se cruzan (PrefetchedSource.overlaps:
+    sucursales y fechas en común). Uno que se cruza con otro anterior espera
+    a que ese commitee; conviene repartir por región (un archivo o una hoja
+    por región) para que no haya esperas.
+- Un objetivo que falla no corta los demás: su resultado trae el error.
+- El cubo de temporada (season_cube) se publica una vez al final, no por
+  objetivo, y después se vuelve a subir la versión de los datos (response_cache).
+"""
+import multiprocessing
+import os
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from glob import glob
+from pathlib import Path
+from typing import NamedTuple
+
+from django.db import connection, connections
+
+from core.services import response_cache, season_cube
+from core.services.navidad_loader import process_navidad_file
+from core.services.navidad_prefetch import prefetch_target
+from core.services.navidad_readers import list_sheets
+
+MAX_PG_WRITERS = 4
+COUNTERS = (
+    "rows", "stock_created", "stock_updated", "stock_skipped",
+    "sales_created", "sales_updated", "sales_skipped",
+)
+
+
+class ImportTarget(NamedTuple):
+    path: Path
+    sheet: str | None
+
+    @property
+    def label(self) -> str:
+        return f"{self.path.name}[{self.sheet}]" if self.sheet is not None else self.path.name
+
+
+class TargetResult(NamedTuple):
+    target: ImportTarget
+    summary: dict | None
+    error: BaseException | None
+
+
+def expand_targets(patterns, *, sheet: str | None = None, all_sheets: bool = False) -> list[ImportTarget]:
+    """
+    Archivos o globs -> objetivos (archivo, hoja), sin repetir y en el orden en
+    que se pidieron. Un patrón sin coincidencias es un error (FileNotFoundError).
+    """
+    paths: list[Path] = []
+    for pattern in patterns:
+        matches = sorted(glob(str(pattern))) if any(c in str(pattern) for c in "*?[") else [pattern]
+        matches = [Path(m) for m in matches if Path(m).is_file()]
+        if not matches:
+            raise FileNotFoundError(pattern)
+        paths += [m for m in matches if m.resolve() not in {p.resolve() for p in paths}]
+
+    if not all_sheets:
+        return [ImportTarget(p, sheet) for p in paths]
+    return [ImportTarget(p, name) for p in paths for name in list_sheets(p)]
+
+
+def default_writers(n_targets: int) -> int:
+    if connection.vendor == "postgresql":
+        return max(1, min(n_targets, MAX_PG_WRITERS))
+    return 1
+
+
+def _target_csv(base, target: ImportTarget, index: int) -> Path:
+    """rejects_csv por objetivo: <base>_<n>_<archivo>[_<hoja>].csv."""
+    base = Path(base)
+    name = target.path.stem + (f"_{target.sheet}" if target.sheet is not None else "")
+    safe = "".join(c if c.isalnum() or c in "-_" else "_" for c in name)
+    return base.with_name(f"{base.stem}_{index + 1}_{safe}{base.suffix or '.csv'}")
+
+
+def _close_thread_connections(fn, *args):
+    """Corre fn en un hilo escritor y cierra las conexiones que abrió ese hilo."""
+    try:
+        return fn(*args)
+    finally:
+        connections.close_all()
+
+
+def import_targets(
+    targets,
+    *,
+    parse_workers: int | None = None,
+    writers: int | None = None,
+    reader: str = "openpyxl",
+    pad: int = 0,
+    chunk_size: int = 10_000,
+    **options,
+) -> list[TargetResult]:
+    """
+    Importa los objetivos (ver el docstring del módulo) y retorna un
+    TargetResult por objetivo, en el orden de targets. options son las de
+    process_navidad_file (write_mode, commit, strict_area, dry_run, ...);
+    rejects_csv se usa como base de un CSV por objetivo.
+    """
+    targets = list(targets)
+    if not targets:
+        raise ValueError("No hay archivos para importar.")
+    if options.get("resume") or options.get("adaptive") or options.get("workers"):
+        raise ValueError("La importación de varios archivos no admite resume, adaptive ni workers (usar parse_workers).")
+    writers = writers or default_writers(len(targets))
+    if writers > 1 and connection.vendor != "postgresql":
+        raise ValueError("Varios escritores en paralelo requieren PostgreSQL (SQLite admite un escritor a la vez).")
+    parse_workers = parse_workers or min(len(targets), os.cpu_count() or 1)
+    rejects_csv = options.pop("rejects_csv", None)
+
+    print(
+        f"[navidad_multi] {len(targets)} archivos/hojas: parseo en {parse_workers} procesos, "
+        f"{writers} escritor(es)",
+        flush=True,
+    )
+
+    written = [threading.Event() for _ in targets]
+
+    def prefetched_or_none(index: int):
+        try:
+            return futures[index].result()
+        except Exception:
+            return None
+
+    def write(index: int) -> TargetResult:
+        try:
+            return write_target(index)
+        finally:
+            written[index].set()
+
+    def write_target(index: int) -> TargetResult:
+        target = targets[index]
+        try:
+            prefetched = futures[index].result()
+        except Exception as e:
+            print(f"[navidad_multi] {target.label}: error al leer: {e}", flush=True)
+            return TargetResult(target, None, e)
+        # Los anteriores que comparten claves con este tienen que commitear antes
+        # (con un solo escritor ya terminaron). Los hilos toman los objetivos en
+        # orden, así que el anterior más viejo sin terminar siempre está corriendo.
+        for earlier in range(index):
+            other = prefetched_or_none(earlier)
+            if other is not None and other.overlaps(prefetched):
+                written[earlier].wait()
+        try:
+            extra = {"rejects_csv": _target_csv(rejects_csv, target, index)} if rejects_csv else {}
+            summary = process_navidad_file(
+                target.path, sheet=target.sheet, reader=reader, pad=pad, chunk_size=chunk_size,
+                prefetched=prefetched, publish_cube=False, **options, **extra,
+            )
+            return TargetResult(target, summary, None)
+        except Exception as e:
+            print(f"[navidad_multi] {target.label}: error al escribir: {e}", flush=True)
+            return TargetResult(target, None, e)
+        finally:
+            prefetched.discard()
+
+    results: dict[int, TargetResult] = {}
+    ctx = multiprocessing.get_context("spawn")
+    with tempfile.TemporaryDirectory(prefix="navidad_prefetch_") as spool_dir, \
+            ProcessPoolExecutor(max_workers=parse_workers, mp_context=ctx) as pool:
+        futures = [
+            pool.submit(
+                prefetch_target, target.path, target.sheet,
+                reader=reader, pad=pad, chunk_size=chunk_size, spool=Path(spool_dir) / f"{i}.spool",
+            )
+            for i, target in enumerate(targets)
+        ]
+        if writers == 1:
+            for i in range(len(targets)):
+                results[i] = write(i)
+        else:
+            with ThreadPoolExecutor(max_workers=writers, thread_name_prefix="navidad-writer") as writer_pool:
+                jobs = [writer_pool.submit(_close_thread_connections, write, i) for i in range(len(targets))]
+                for i, job in enumerate(jobs):
+                    results[i] = job.result()
+    done = [r.summary for r in results.values() if r.summary is not None]
+    if not options.get("dry_run") and done:
+        seasons = [s.get("seasons") for s in done]
+        season_cube.publish(None if None in seasons else sorted(set().union(*seasons)))
+        response_cache.bump_version()
+    return [results[i] for i in range(len(targets))]
+
+
+def combined_summary(results: list[TargetResult]) -> dict:
+    """Totales de los objetivos que terminaron bien + cantidad de fallidos."""
+    done = [r.summary for r in results if r.summary is not None]
+    total = {key: sum(s.get(key, 0) for s in done) for key in COUNTERS}
+    total["targets"] = len(results)
+    total["failed"] = len(results) - len(done)
+    return total
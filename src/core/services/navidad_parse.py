@@ -0,0 +1,420 @@
+"""
+Parseo de valores del archivo de Navidad (fechas, números, códigos de sucursal).
+
+No importa Django: lo usan tanto el loader como los procesos del pool del modo
+pipeline y del prefetch multi-archivo (que con el método spawn arrancan sin
+settings configurados). Incluye la detección de la fila de encabezados.
+"""
+from datetime import date, datetime
+from operator import itemgetter
+
+import numpy as np
+import pandas as pd
+
+
+REQUIRED_COLS = [
+    "Dia", "Region", "Zona", "Sucursal",
+    "SubFamilia", "Unidades Stock Final", "Unidades Vendidas",
+]
+
+# Filas iniciales que se miran para encontrar la fila de encabezados.
+HEADER_SCAN_ROWS = 30
+
+
+def _detect_header_row(head_rows: list[tuple], max_scan: int = HEADER_SCAN_ROWS):
+    """
+    Busca la fila de encabezados entre las primeras filas crudas (tuplas de valores,
+    tal como salen de iter_rows(values_only=True)). Retorna (índice, columnas_canónicas)
+    o (None, None).
+    """
+    def norm(s):
+        s = "" if s is None else str(s)
+        return " ".join(s.replace("\n", " ").strip().lower().split())
+
+    required = [
+        "Dia", "Region", "Zona", "Sucursal",
+        "SubFamilia", "Unidades Stock Final", "Unidades Vendidas",
+    ]
+    aliases = {
+        "día": "Dia", "dia": "Dia", "fecha": "Dia",
+        "region": "Region", "región": "Region",
+        "zona": "Zona",
+        "sucursal": "Sucursal", "tienda": "Sucursal", "store": "Sucursal",
+        "subfamilia": "SubFamilia", "sub familia": "SubFamilia", "origen": "SubFamilia",
+        "unidades stock final": "Unidades Stock Final", "stock final unidades": "Unidades Stock Final",
+        "stock final": "Unidades Stock Final", "stock (unidades)": "Unidades Stock Final",
+        "unidades vendidas": "Unidades Vendidas", "ventas unidades": "Unidades Vendidas", "ventas": "Unidades Vendidas",
+    }
+
+    required_norm = [norm(x) for x in required]
+    aliases_norm = {k: v for k, v in aliases.items()}
+
+    best = (-1, -1, None)
+    for i, row in enumerate(head_rows[:max_scan]):
+        cols_map = []
+        matches = 0
+
+        for val in row:
+            key = norm(val)
+            canon = None
+            if key in aliases_norm:
+                canon = aliases_norm[key]
+            elif key in required_norm:
+                canon = required[required_norm.index(key)]
+
+            cols_map.append(canon)
+            if canon in required:
+                matches += 1
+
+        if matches > best[0]:
+            best = (matches, i, cols_map)
+        if matches == len(required):
+            break
+
+    if best[0] >= 5:
+        return best[1], best[2]
+    return None, None
+
+
+def _header_from_rows(head_rows: list[tuple]) -> tuple[list[str], int]:
+    """
+    Detecta encabezados sobre las primeras filas y retorna:
+    (nombres_canonicos, fila_datos_inicio)
+    """
+    hdr_idx, cols_map = _detect_header_row(head_rows, max_scan=HEADER_SCAN_ROWS)
+    if hdr_idx is None:
+        raise ValueError("No pude detectar la fila de encabezados. Verificá el archivo/hoja.")
+
+    header_row_values = list(head_rows[hdr_idx])
+    canon_cols: list[str] = []
+
+    for j, v in enumerate(header_row_values):
+        canon = cols_map[j]
+        if canon is None:
+            canon = str(v).strip() if v is not None else f"col_{j}"
+        canon_cols.append(canon)
+
+    miss = [c for c in REQUIRED_COLS if c not in canon_cols]
+    if miss:
+        raise ValueError(f"Faltan columnas requeridas: {', '.join(miss)}")
+
+    # hdr_idx + 1 es donde empiezan los datos (fila siguiente a encabezados)
+    return canon_cols, hdr_idx + 1
+
+
+def parse_date(val):
+    """
+    Normaliza fechas de Excel / strings / datetime a date.
+    """
+    if val is None:
+        return None
+
+    # Si ya viene como Timestamp/datetime/date -> devolvemos date
+    if isinstance(val, pd.Timestamp):
+        return val.date()
+    if isinstance(val, datetime):
+        return val.date()
+    if isinstance(val, date):
+        return val
+
+    s = str(val).strip()
+    if s == "":
+        return None
+
+    # Intento 1: parsear como string día/mes/año
+    try:
+        return pd.to_datetime(s, dayfirst=True, errors="raise").date()
+    except Exception:
+        pass
+
+    # Intento 2: manejar números de fecha de Excel
+    try:
+        return pd.to_datetime(float(s), unit="D", origin="1899-12-30").date()
+    except Exception:
+        return None
+
+
+def parse_number(val):
+    """
+    Normaliza números con coma/punto/espacios a float o None.
+    """
+    if val is None or (isinstance(val, float) and pd.isna(val)):
+        return None
+    if isinstance(val, (int, float)):
+        return float(val)
+
+    s = str(val).strip().replace(" ", "")
+    if s == "":
+        return None
+
+    if "," in s and "." in s:
+        last_comma, last_dot = s.rfind(","), s.rfind(".")
+        if last_comma > last_dot:
+            s = s.replace(".", "").replace(",", ".")
+        else:
+            s = s.replace(",", "")
+    else:
+        if "," in s:
+            s = s.replace(".", "").replace(",", ".")
+
+    try:
+        return float(s)
+    except Exception:
+        return None
+
+
+def zfill_code(raw, pad: int) -> str:
+    """
+    Normaliza el código de sucursal. Hoy ignora 'pad' a propósito
+    (no agrega ceros, solo limpia). Si querés realmente pad-left,
+    acá es donde tocarías.
+    """
+    s = str(raw).strip()
+    try:
+        num = float(s)
+        if num.is_integer():
+            s = str(int(num))
+    except Exception:
+        pass
+
+    if s.isdigit():
+        s = s.lstrip("0") or "0"
+    return s
+
+
+# ---------------------------
+# Parseo columnar por chunk
+# ---------------------------
+# Las funciones escalares de arriba son la referencia. Las versiones *_column
+# trabajan sobre la columna completa de un chunk: factorizan los valores (un
+# pase de hash en pandas), llaman a la función escalar una sola vez por valor
+# distinto y reparten el resultado con un take de NumPy. En un chunk típico hay
+# unas pocas fechas, sucursales y subfamilias distintas para miles de filas.
+
+def _object_array(values) -> np.ndarray:
+    arr = np.empty(len(values), dtype=object)
+    arr[:] = list(values)
+    return arr
+
+
+def _map_distinct(values, fn) -> np.ndarray:
+    """
+    Aplica fn una vez por valor distinto. Distingue por tipo además de por valor
+    (1, 1.0, True y "1" no se mezclan), así el resultado es idéntico a aplicar fn
+    celda por celda.
+    """
+    values = _object_array(values) if not isinstance(values, np.ndarray) else values
+    n = len(values)
+    if n == 0:
+        return np.empty(0, dtype=object)
+
+    type_codes, _ = pd.factorize(np.fromiter(map(type, values), dtype=object, count=n))
+    value_codes, uniques = pd.factorize(values)  # None/NaN -> -1
+    keys = type_codes.astype(np.int64) * (len(uniques) + 1) + (value_codes + 1)
+    _, first_idx, inverse = np.unique(keys, return_index=True, return_inverse=True)
+
+    mapped = np.empty(len(first_idx), dtype=object)
+    mapped[:] = [fn(values[i]) for i in first_idx]
+    return mapped[inverse]
+
+
+def parse_date_column(values) -> np.ndarray:
+    """parse_date sobre una columna: mismas reglas (dayfirst, serial de Excel)."""
+    return _map_distinct(values, parse_date)
+
+
+def parse_number_column(values) -> np.ndarray:
+    """
+    parse_number sobre una columna. Las celdas numéricas (lo habitual en xlsx)
+    se convierten en bloque con NumPy; los textos con coma/punto pasan por
+    parse_number una vez por valor distinto.
+    """
+    values = _object_array(values) if not isinstance(values, np.ndarray) else values
+    out = np.empty(len(values), dtype=object)
+    if not len(values):
+        return out
+
+    is_num = np.fromiter(
+        (isinstance(v, (int, float)) for v in values), dtype=bool, count=len(values)
+    )
+    if is_num.any():
+        nums = values[is_num].astype(np.float64)
+        conv = nums.astype(object)
+        conv[np.isnan(nums)] = None
+        out[is_num] = conv
+    rest = ~is_num
+    if rest.any():
+        out[rest] = _map_distinct(values[rest], parse_number)
+    return out
+
+
+def zfill_code_column(values, pad: int) -> np.ndarray:
+    """zfill_code sobre una columna."""
+    return _map_distinct(values, lambda v: zfill_code(v, pad))
+
+
+def _take_column(raw_rows: list[tuple], idx: int) -> np.ndarray:
+    """Extrae la columna idx de filas crudas (las filas cortas aportan None)."""
+    if raw_rows and min(map(len, raw_rows)) > idx:
+        return np.fromiter(map(itemgetter(idx), raw_rows), dtype=object, count=len(raw_rows))
+    return _object_array([r[idx] if idx < len(r) else None for r in raw_rows])
+
+
+def _encode_distinct(values, fn) -> tuple[np.ndarray, list]:
+    """
+    Como _map_distinct pero devuelve la columna codificada por diccionario:
+    (índices int32 por fila, valores distintos ya normalizados). Dos crudos que
+    normalizan igual ("021" y 21.0) comparten índice. None queda como -1.
+    """
+    mapped = _map_distinct(values, fn)
+    ids, uniques = pd.factorize(mapped, use_na_sentinel=True)
+    return ids.astype(np.int32), list(uniques)
+
+
+def _float_column(values: np.ndarray) -> np.ndarray:
+    """Columna de parse_number_column (float | None) como float64, None -> NaN."""
+    out = np.full(len(values), np.nan)
+    present = np.fromiter((v is not None for v in values), dtype=bool, count=len(values))
+    out[present] = values[present].astype(np.float64)
+    return out
+
+
+def _decode_floats(values: np.ndarray) -> list:
+    return [None if v != v else v for v in values.tolist()]
+
+
+class ParsedChunk:
+    """
+    Chunk parseado en columnas (en vez de una lista de dicts por fila).
+
+    Fecha, sucursal, subfamilia, región y zona van codificadas por diccionario:
+    un array int32 por fila con el índice en la lista de valores distintos del
+    chunk (`values[name]`). Stock y unidades vendidas son float64 con NaN donde
+    la celda venía vacía (None en las filas). `positions` es la posición de cada
+    fila en el chunk crudo (las descartadas por el parseo dejan huecos).
+    """
+
+    ENCODED = ("date", "code", "subfam", "region", "zona")
+    FIELDS = ("date", "code", "subfam", "stock_units", "units_sold", "region", "zona")
+
+    __slots__ = ("ids", "values", "stock_units", "units_sold", "positions")
+
+    def __init__(
+        self, ids: dict, values: dict, stock_units: np.ndarray, units_sold: np.ndarray, positions: np.ndarray,
+    ):
+        self.ids = ids
+        self.values = values
+        self.stock_units = stock_units
+        self.units_sold = units_sold
+        self.positions = positions
+
+    @classmethod
+    def empty(cls) -> "ParsedChunk":
+        return cls(
+            {name: np.empty(0, dtype=np.int32) for name in cls.ENCODED},
+            {name: [] for name in cls.ENCODED},
+            np.empty(0), np.empty(0), np.empty(0, dtype=np.int32),
+        )
+
+    def __len__(self) -> int:
+        return len(self.stock_units)
+
+    def take(self, mask) -> "ParsedChunk":
+        """Subconjunto de filas (máscara booleana o índices); comparte los diccionarios."""
+        return ParsedChunk(
+            {name: ids[mask] for name, ids in self.ids.items()},
+            self.values,
+            self.stock_units[mask],
+            self.units_sold[mask],
+            self.positions[mask],
+        )
+
+    def column(self, name: str) -> list:
+        """Columna decodificada (valores Python, None donde corresponde)."""
+        if name == "stock_units":
+            return _decode_floats(self.stock_units)
+        if name == "units_sold":
+            return _decode_floats(self.units_sold)
+        values = self.values[name]
+        return [values[i] for i in self.ids[name].tolist()]
+
+    def rows(self, fields=FIELDS):
+        """Tuplas por fila con los campos pedidos (en ese orden)."""
+        return zip(*(self.column(f) for f in fields))
+
+    def to_dicts(self) -> list[dict]:
+        """El formato anterior (un dict por fila); para tests y diagnóstico."""
+        return [dict(zip(self.FIELDS, row)) for row in self.rows()]
+
+
+def parse_chunk(raw_rows: list[tuple], col_indices: dict[str, int], pad: int) -> ParsedChunk:
+    """
+    Parseo columnar de un chunk de filas crudas. Devuelve las mismas filas
+    normalizadas que el loop escalar (se descartan las que no tienen fecha o
+    subfamilia), en un ParsedChunk.
+    """
+    if not raw_rows:
+        return ParsedChunk.empty()
+
+    def col(name):
+        return _take_column(raw_rows, col_indices[name])
+
+    date_ids, dates = _encode_distinct(col("Dia"), parse_date)
+    subfam_ids, subfams = _encode_distinct(col("SubFamilia"), lambda v: str(v or "").strip())
+    # parse_date también puede dar un valor falso que no es None (no pasa con
+    # fechas reales, pero el loop escalar lo filtraba con `not dt`).
+    valid_date = np.array([bool(d) for d in dates] + [False], dtype=bool)
+    valid_subfam = np.array([sf != "" for sf in subfams] + [False], dtype=bool)
+    keep = valid_date[date_ids] & valid_subfam[subfam_ids]  # índice -1 cae en el False del final
+    if not keep.any():
+        return ParsedChunk.empty()
+    positions = np.arange(len(raw_rows), dtype=np.int32)
+    if not keep.all():
+        positions = positions[keep]
+        raw_rows = [r for r, k in zip(raw_rows, keep) if k]
+        date_ids = date_ids[keep]
+        subfam_ids = subfam_ids[keep]
+
+    code_ids, codes = _encode_distinct(col("Sucursal"), lambda v: zfill_code(v, pad))
+    region_ids, regions = _encode_distinct(col("Region"), lambda v: str(v or "").strip())
+    zona_ids, zonas = _encode_distinct(col("Zona"), lambda v: str(v or "").strip())
+
+    return ParsedChunk(
+        {"date": date_ids, "code": code_ids, "subfam": subfam_ids, "region": region_ids, "zona": zona_ids},
+        {"date": dates, "code": codes, "subfam": subfams, "region": regions, "zona": zonas},
+        _float_column(parse_number_column(col("Unidades Stock Final"))),
+        _float_column(parse_number_column(col("Unidades Vendidas"))),
+        positions,
+    )
+
+
+# Un chunk alineado puede pasarse de su tamaño hasta este factor para no partir
+# una partición; más allá se corta igual (archivo sin ordenar por sucursal/día).
+PARTITION_SLACK = 2
+
+
+def partition_batches(rows, size, col_indices: dict[str, int]):
+    """
+    Agrupa filas crudas en chunks de al menos `size` filas (int o callable que
+    se consulta al empezar cada chunk) sin partir una partición (sucursal, día):
+    al llegar al tamaño, el chunk se cierra recién en la primera fila de otra
+    partición. Así el hash de cada partición (navidad_partitions) es el mismo en
+    cada importación de un archivo ordenado por sucursal o por día.
+    """
+    code_idx, date_idx = col_indices["Sucursal"], col_indices["Dia"]
+
+    def key(row):
+        return (
+            row[code_idx] if code_idx < len(row) else None,
+            row[date_idx] if date_idx < len(row) else None,
+        )
+
+    next_size = size if callable(size) else (lambda: size)
+    batch, target = [], next_size()
+    for row in rows:
+        if len(batch) >= target and (len(batch) >= target * PARTITION_SLACK or key(row) != key(batch[-1])):
+            yield batch
+            batch, target = [], next_size()
+        batch.append(row)
+    if batch:
+        yield batch
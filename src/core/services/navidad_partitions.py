@@ -0,0 +1,155 @@
+"""
+Importación incremental por partición (sucursal, día) del navidad loader.
+
+El archivo diario es acumulado: casi todo es igual al de ayer. Por cada chunk se
+agrupan las filas parseadas por (código de sucursal, fecha), se calcula un hash
+del contenido de cada grupo y se compara con el guardado por importaciones
+anteriores (PartitionDigest). Con incremental=True los grupos que no cambiaron
+se descartan antes de cualquier lookup o escritura.
+
+Un hash guardado significa "estas filas exactas ya están escritas en la BD", por
+eso:
+- se guarda después de escribir, en la misma transacción que las filas;
+- solo se guarda si todas las filas del grupo resolvieron (sucursal, familia
+  activa y, con strict_area, región/zona). Si alguna quedó afuera se borra el
+  hash anterior: cuando se corrija el maestro, la partición se vuelve a procesar;
+- toda importación (incremental o no) mantiene los hashes, así una importación
+  completa deja todo consistente (útil si se tocaron datos por fuera del loader);
+- los chunks del loader no parten particiones (navidad_parse.partition_batches),
+  así el hash de una partición es el de todas sus filas si el archivo viene
+  ordenado por sucursal o por día. Si igual viene partida (archivo desordenado,
+  partición más grande que el margen del chunk) y una parte ya se escribió en
+  esta corrida, las siguientes no se saltean (respeta "la última fila gana").
+El resultado queda en summary["partitions_skipped"/"partitions_changed"].
+"""
+import hashlib
+
+import numpy as np
+import pandas as pd
+from django.db import connection
+from django.db.models import Q
+
+from core.models import PartitionDigest
+from core.services.navidad_chunks import PARAM_LIMITS, bulk_batch_size
+from core.services.navidad_dims import DimensionIndex
+from core.services.navidad_parse import ParsedChunk
+
+HASHED_FIELDS = ("subfam", "stock_units", "units_sold", "region", "zona")
+
+
+def _partition_digests(chunk: ParsedChunk, salt: bytes) -> tuple[np.ndarray, list[tuple], list[str]]:
+    """
+    Agrupa por (código, fecha) respetando el orden del archivo y hashea cada grupo.
+    Devuelve (grupo de cada fila, clave (código, fecha) de cada grupo, hash de cada grupo).
+    """
+    n_dates = len(chunk.values["date"])
+    group_of_row, group_keys = pd.factorize(chunk.ids["code"].astype(np.int64) * n_dates + chunk.ids["date"])
+
+    hashers = [hashlib.blake2b(salt, digest_size=16) for _ in range(len(group_keys))]
+    for g, row in zip(group_of_row.tolist(), chunk.rows(HASHED_FIELDS)):
+        hashers[g].update(repr(row).encode())
+
+    codes, dates = chunk.values["code"], chunk.values["date"]
+    keys = [(codes[k // n_dates], dates[k % n_dates]) for k in group_keys.tolist()]
+    return group_of_row, keys, [h.hexdigest() for h in hashers]
+
+
+class PartitionTracker:
+    def __init__(self, dims: DimensionIndex, *, incremental: bool, strict_area: bool):
+        # Maestros (solo para decidir si una partición quedó completa).
+        self.dims = dims
+        self.incremental = incremental
+        self.strict_area = strict_area
+        # Las opciones que cambian qué se escribe entran en el hash.
+        self.salt = f"strict_area={strict_area}".encode()
+
+        self._stored: dict[tuple, str] = {}
+        self._loaded_dates: set = set()
+        self._written: set[tuple] = set()
+        self._skipped: set[tuple] = set()
+        self.rows_unchanged = 0
+
+    # ---- lectura de hashes guardados ----
+    def _load_dates(self, dates):
+        missing = [d for d in dates if d not in self._loaded_dates]
+        if not missing:
+            return
+        for code, dt, digest in PartitionDigest.objects.filter(date__in=missing).values_list(
+            "store_code", "date", "digest"
+        ):
+            self._stored[(code, dt)] = digest
+        self._loaded_dates.update(missing)
+
+    def split(self, chunk: ParsedChunk) -> tuple[ParsedChunk, dict]:
+        """
+        Devuelve (filas a escribir, pendientes). Los pendientes se pasan a save()
+        después de escribir las filas.
+        """
+        if not len(chunk):
+            return chunk, {}
+        group_of_row, keys, digests = _partition_digests(chunk, self.salt)
+        # Grupos con alguna fila que no resuelve (no cuenta en los hits/misses del loader).
+        resolved = self.dims.resolve(chunk, strict_area=self.strict_area)
+        incomplete = set(group_of_row[~resolved.ok].tolist())
+
+        unchanged = set()
+        if self.incremental:
+            self._load_dates({dt for _, dt in keys})
+            unchanged = {
+                g for g, (key, digest) in enumerate(zip(keys, digests))
+                if key not in self._written and self._stored.get(key) == digest
+            }
+        if unchanged:
+            skip = np.isin(group_of_row, list(unchanged))
+            self._skipped.update(keys[g] for g in unchanged)
+            self.rows_unchanged += int(skip.sum())
+            chunk = chunk.take(~skip)
+
+        pending = {
+            keys[g]: (digests[g], g not in incomplete) for g in range(len(keys)) if g not in unchanged
+        }
+        return chunk, pending
+
+    # ---- escritura de hashes ----
+    def save(self, pending: dict):
+        if not pending:
+            return
+        clean, dirty = [], []
+        for key, (digest, complete) in pending.items():
+            self._written.add(key)
+            if complete:
+                clean.append(PartitionDigest(store_code=key[0], date=key[1], digest=digest))
+                self._stored[key] = digest
+            else:
+                dirty.append(key)
+                self._stored.pop(key, None)
+
+        if clean:
+            PartitionDigest.objects.bulk_create(
+                clean,
+                update_conflicts=True,
+                unique_fields=["store_code", "date"],
+                update_fields=["digest", "updated_at"],
+                batch_size=bulk_batch_size(PartitionDigest),
+            )
+        by_date: dict = {}
+        for code, dt in dirty:
+            by_date.setdefault(dt, []).append(code)
+        # Un DELETE por chunk (no uno por día), partido si se pasa del límite de parámetros.
+        max_params = connection.features.max_query_params or PARAM_LIMITS.get(connection.vendor)
+        cond, n_params = Q(), 0
+        for dt, codes in by_date.items():
+            if max_params and n_params and n_params + 1 + len(codes) > max_params:
+                PartitionDigest.objects.filter(cond).delete()
+                cond, n_params = Q(), 0
+            cond |= Q(date=dt, store_code__in=codes)
+            n_params += 1 + len(codes)
+        if n_params:
+            PartitionDigest.objects.filter(cond).delete()
+
+    def stats(self) -> dict:
+        return {
+            "partitions_changed": len(self._written),
+            "partitions_skipped": len(self._skipped - self._written),
+            "rows_unchanged": self.rows_unchanged,
+        }
@@ -0,0 +1,50 @@
+"""
+Queries del navidad loader por fase.
+
+process_navidad_file instala un QueryCounter como execute_wrapper de la
+conexión durante la importación; el código del loader marca en qué fase está
+con `with phase("lookup"): ...` (también funciones de módulo como
+_upsert_records, sin pasarles nada: la fase vive en un ContextVar, uno por
+hilo). El conteo queda en summary["queries"]:
+- setup: checkpoint/ImportRun al arrancar;
+- dims: carga del índice de dimensiones;
+- partitions: hashes de partición (incremental);
+- lookup: búsqueda de existentes (merge) y conteo previo al upsert (salvo en
+  PostgreSQL, que cuenta con RETURNING);
+- write: escritura de cada chunk (bulk_create/bulk_update/upsert/COPY/replace);
+- checkpoint: avance del checkpoint en commit="chunk";
+- finish: merge de COPY / cierre de replace;
+- catalog: actualización del catálogo del dataset (dataset_catalog);
+- rollups: actualización de los rollups por área (rollups);
+- cumulative: actualización de los acumulados de la temporada (season_cumulative);
+- publish: después del commit, cubo de temporada (season_cube) y versión de
+  los datos del cache de respuestas (response_cache).
+"""
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+PHASES = ("setup", "dims", "partitions", "lookup", "write", "checkpoint", "finish", "catalog", "rollups", "cumulative", "publish")
+
+_current = ContextVar("navidad_phase", default="setup")
+
+
+@contextmanager
+def phase(name: str):
+    token = _current.set(name)
+    try:
+        yield
+    finally:
+        _current.reset(token)
+
+
+class QueryCounter:
+    def __init__(self):
+        self.counts = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        self.counts[_current.get()] += 1
+        return execute(sql, params, many, context)
+
+    def stats(self) -> dict:
+        return {name: self.counts[name] for name in PHASES}
@@ -0,0 +1,147 @@
+"""
+Modo pipeline del navidad loader: lectura, parseo y escritura en paralelo.
+
+- Un proceso lector reabre el archivo (mismo reader que el loader), salta hasta
+  la primera fila de datos y arma chunks de filas crudas.
+- Los chunks se parsean (parse_chunk, sin Django) en un pool de `workers`
+  procesos que maneja el lector. Con workers=1 el lector parsea él mismo.
+- El proceso que llama (el del loader, dueño de la conexión y la transacción)
+  solo escribe: recibe los chunks ya parseados por una cola acotada, en el mismo
+  orden en que se leyeron, así los contadores del summary son idénticos al modo
+  secuencial.
+
+Lectura y escritura viven en procesos distintos a propósito: en un mismo proceso
+el hilo lector (iterparse/openpyxl) y la escritura (instancias de modelos y SQL
+del ORM) compiten por el GIL y el pipeline termina siendo más lento que el loop
+secuencial.
+
+Los procesos usan siempre el método spawn: es el único disponible en Windows y
+evita hacer fork con la conexión a la BD abierta.
+"""
+import multiprocessing
+import queue
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+from core.services.navidad_parse import partition_batches
+from core.services.navidad_readers import open_row_source
+
+_END = "__end__"
+_ERROR = "__error__"
+_PUT_TIMEOUT = 0.5
+_GET_TIMEOUT = 1.0
+
+
+def _put(out, item, stop) -> bool:
+    """put() que se rinde si el escritor pidió parar (cola llena y nadie consume)."""
+    while not stop.is_set():
+        try:
+            out.put(item, timeout=_PUT_TIMEOUT)
+            return True
+        except queue.Full:
+            continue
+    # Lo que quedó en el buffer de la cola no lo va a leer nadie: no esperar a
+    # volcarlo al salir (si no, el proceso queda colgado en el join de la cola).
+    out.cancel_join_thread()
+    return False
+
+
+def _read_batches(path, sheet, reader, skip: int, chunk_size, col_indices):
+    """
+    chunk_size es un Value compartido: el escritor lo puede cambiar entre chunks.
+    Los chunks no parten particiones (sucursal, día), como en el modo secuencial.
+    """
+    with open_row_source(path, sheet, reader=reader) as source:
+        yield from partition_batches(islice(source.rows, skip, None), lambda: chunk_size.value, col_indices)
+
+
+def _timed_parse(parse_fn, batch, *parse_args):
+    """Parsea un chunk y retorna (filas parseadas, segundos de parseo)."""
+    t0 = time.perf_counter()
+    parsed = parse_fn(batch, *parse_args)
+    return parsed, time.perf_counter() - t0
+
+
+def _producer(path, sheet, reader, skip, chunk_size, col_indices, parse_fn, parse_args, workers, out, stop):
+    """Proceso lector: lee, manda a parsear y encola (filas_crudas, filas_parseadas, segundos) en orden."""
+    try:
+        batches = _read_batches(path, sheet, reader, skip, chunk_size, col_indices)
+        if workers <= 1:
+            for batch in batches:
+                if not _put(out, (len(batch), *_timed_parse(parse_fn, batch, *parse_args)), stop):
+                    return
+        else:
+            pending: deque = deque()
+            ctx = multiprocessing.get_context("spawn")
+            pool = ProcessPoolExecutor(max_workers=workers, mp_context=ctx)
+            try:
+                for batch in batches:
+                    pending.append((len(batch), pool.submit(_timed_parse, parse_fn, batch, *parse_args)))
+                    # Acotar el trabajo en vuelo: no leer mucho más rápido de lo que se escribe.
+                    while len(pending) > workers * 2:
+                        n_raw, fut = pending.popleft()
+                        if not _put(out, (n_raw, *fut.result()), stop):
+                            return
+                while pending:
+                    n_raw, fut = pending.popleft()
+                    if not _put(out, (n_raw, *fut.result()), stop):
+                        return
+            finally:
+                pool.shutdown(wait=True, cancel_futures=True)
+        _put(out, _END, stop)
+    except BaseException as e:  # se re-lanza en el proceso escritor
+        try:
+            _put(out, (_ERROR, e), stop)
+        except Exception:
+            _put(out, (_ERROR, RuntimeError(repr(e))), stop)
+
+
+def iter_pipelined(path, sheet, reader: str, *, skip: int, chunk_size: int, col_indices: dict,
+                   parse_fn, parse_args: tuple, workers: int, next_size=None):
+    """
+    Generador para el escritor: devuelve (cantidad de filas crudas, filas parseadas,
+    segundos de parseo) por chunk, en orden de lectura. Lectura y parseo corren en otros procesos;
+    `skip` son las filas del principio del archivo que no son datos (título y
+    encabezados ya detectados por el loader). col_indices ubica sucursal y día
+    para no partir particiones entre chunks (partition_batches).
+
+    next_size, si viene, se llama después de que el escritor procesa cada chunk y
+    fija el tamaño de los próximos que arme el lector (chunk adaptativo). Los que
+    ya están en la cola o en el pool salen con el tamaño anterior.
+    """
+    ctx = multiprocessing.get_context("spawn")
+    out = ctx.Queue(maxsize=max(2, workers * 2))
+    stop = ctx.Event()
+    size = ctx.Value("q", chunk_size, lock=False)
+    proc = ctx.Process(
+        target=_producer,
+        args=(path, sheet, reader, skip, size, col_indices, parse_fn, parse_args, workers, out, stop),
+        name="navidad-reader",
+    )
+    proc.start()
+    try:
+        while True:
+            try:
+                item = out.get(timeout=_GET_TIMEOUT)
+            except queue.Empty:
+                if not proc.is_alive():
+                    raise RuntimeError(
+                        f"El proceso lector terminó sin avisar (exitcode={proc.exitcode})"
+                    ) from None
+                continue
+            if item == _END:
+                return
+            if item[0] == _ERROR:
+                raise item[1]
+            yield item
+            if next_size is not None:
+                size.value = next_size()
+    finally:
+        stop.set()
+        proc.join(timeout=10)
+        if proc.is_alive():
+            proc.terminate()
+            proc.join()
+        out.close()
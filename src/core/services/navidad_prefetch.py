@@ -0,0 +1,96 @@
+"""
+Prefetch de un (archivo, hoja) para la importación multi-archivo.
+
+Corre en un proceso del pool de navidad_multi: abre el archivo, detecta los
+encabezados y lo parsea completo por chunks a un spool en disco (un pickle por
+chunk), sin tocar la BD. Así varios archivos/hojas se leen y parsean en
+paralelo mientras el escritor va cargando los que ya terminaron; el spool
+mantiene la memoria acotada aunque el escritor quede atrás.
+
+No importa Django (los procesos del pool arrancan con spawn, sin settings).
+"""
+import pickle
+import time
+from itertools import chain, islice
+from pathlib import Path
+
+from core.services.navidad_parse import HEADER_SCAN_ROWS, _header_from_rows, parse_chunk, partition_batches
+from core.services.navidad_readers import open_row_source
+
+
+class PrefetchedSource:
+    """
+    Archivo ya leído y parseado. Para el loader cumple el papel del RowSource
+    (format, total_rows, meta, close) y batches() reemplaza la lectura: produce
+    (filas crudas, chunk parseado, segundos de parseo) como el modo pipeline.
+    codes/dates (sucursales y rango de fechas del archivo) alcanzan para saber
+    si dos objetivos pueden compartir claves (overlaps).
+    """
+
+    def __init__(
+        self, spool: Path, *, canon_cols, data_start_row, fmt, reader, rows, chunks, header_seconds,
+        codes=frozenset(), dates=None,
+    ):
+        self.spool = Path(spool)
+        self.canon_cols = canon_cols
+        self.data_start_row = data_start_row
+        self.format = fmt
+        self.meta = {"reader": reader}
+        self.rows = rows  # filas de datos (sin título ni encabezados)
+        self.total_rows = data_start_row + rows  # como RowSource: filas del archivo
+        self.chunks = chunks
+        self.header_seconds = header_seconds
+        self.codes = frozenset(codes)
+        self.dates = dates  # (primera, última) o None si no hay filas con fecha
+
+    def overlaps(self, other: "PrefetchedSource") -> bool:
+        """Si pueden tener claves (sucursal, familia, fecha) en común: sucursales compartidas y fechas que se cruzan."""
+        if self.dates is None or other.dates is None or not self.codes & other.codes:
+            return False
+        return self.dates[0] <= other.dates[1] and other.dates[0] <= self.dates[1]
+
+    def batches(self):
+        with open(self.spool, "rb") as f:
+            for _ in range(self.chunks):
+                yield pickle.load(f)
+
+    def close(self):
+        pass
+
+    def discard(self):
+        self.spool.unlink(missing_ok=True)
+
+
+def prefetch_target(path, sheet, *, reader: str, pad: int, chunk_size: int, spool: Path) -> PrefetchedSource:
+    t0 = time.perf_counter()
+    with open_row_source(Path(path), sheet, reader=reader) as source:
+        head_rows = list(islice(source.rows, HEADER_SCAN_ROWS))
+        canon_cols, data_start_row = _header_from_rows(head_rows)
+        header_seconds = time.perf_counter() - t0
+        col_indices = {col_name: idx for idx, col_name in enumerate(canon_cols)}
+        rows = chain(head_rows[data_start_row:], source.rows)
+
+        n_rows = n_chunks = 0
+        codes, dates = set(), set()
+        with open(spool, "wb") as f:
+            for batch in partition_batches(rows, chunk_size, col_indices):
+                t0 = time.perf_counter()
+                parsed = parse_chunk(batch, col_indices, pad)
+                codes.update(parsed.values["code"])
+                dates.update(d for d in parsed.values["date"] if d)
+                pickle.dump((len(batch), parsed, time.perf_counter() - t0), f, protocol=pickle.HIGHEST_PROTOCOL)
+                n_rows += len(batch)
+                n_chunks += 1
+
+    return PrefetchedSource(
+        spool,
+        canon_cols=canon_cols,
+        data_start_row=data_start_row,
+        fmt=source.format,
+        reader=source.meta.get("reader"),
+        rows=n_rows,
+        chunks=n_chunks,
+        header_seconds=header_seconds,
+        codes=codes,
+        dates=(min(dates), max(dates)) if dates else None,
+    )
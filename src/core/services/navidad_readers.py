@@ -0,0 +1,392 @@
+"""
+Lectores de filas crudas para el navidad loader.
+
+Cada lector devuelve un RowSource: un iterador de tuplas de valores (desde la
+primera fila del archivo, encabezados incluidos) más un total aproximado de filas.
+El loader detecta los encabezados sobre las primeras filas de ese mismo iterador.
+
+- xlsx (reader="openpyxl"): openpyxl en read_only.
+- xlsx (reader="raw"): lee el XML de la hoja directo del zip con iterparse, sin
+  objetos celda ni estilos de openpyxl. Si el workbook es raro (strict OOXML,
+  partes faltantes, hoja que no es worksheet) cae a openpyxl.
+- csv/tsv: csv.reader en streaming (memoria constante), con delimitador y
+  encoding detectados sobre una muestra del inicio del archivo.
+"""
+import codecs
+import csv
+import posixpath
+import re
+import zipfile
+from pathlib import Path
+from xml.etree.ElementTree import iterparse, parse
+
+from openpyxl import load_workbook
+from openpyxl.reader.strings import read_string_table
+from openpyxl.styles.numbers import BUILTIN_FORMATS, is_date_format, is_timedelta_format
+from openpyxl.utils.cell import column_index_from_string
+from openpyxl.utils.datetime import CALENDAR_MAC_1904, CALENDAR_WINDOWS_1900, from_excel, from_ISO8601
+
+ZIP_MAGIC = b"PK\x03\x04"
+SNIFF_BYTES = 64 * 1024
+CSV_DELIMITERS = ",;\t|"
+CSV_ENCODINGS = ("utf-8-sig", "cp1252", "latin-1")
+
+XLSX_READERS = ("openpyxl", "raw")
+
+SHEET_NS = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+REL_NS = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+PKG_REL_NS = "http://schemas.openxmlformats.org/package/2006/relationships"
+WORKSHEET_REL = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet"
+DIMENSION_RE = re.compile(rb'<(?:\w+:)?dimension\s+ref="([A-Z]+)(\d+)(?::([A-Z]+)(\d+))?"')
+
+
+class RowSource:
+    """Filas crudas de un archivo + metadatos. Cerrar siempre (libera el archivo)."""
+
+    def __init__(self, rows, *, fmt: str, total_rows: int | None = None, close=None, **meta):
+        self.rows = rows
+        self.format = fmt
+        self.total_rows = total_rows
+        self.meta = meta
+        self._close = close
+
+    def close(self):
+        if self._close is not None:
+            self._close()
+            self._close = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def detect_format(path: Path) -> str:
+    """xlsx si el archivo es un zip (OOXML); si no, texto delimitado. No confía en la extensión."""
+    with open(path, "rb") as f:
+        magic = f.read(len(ZIP_MAGIC))
+    return "xlsx" if magic == ZIP_MAGIC else "csv"
+
+
+def _open_sheet(wb, sheet: str | int | None):
+    target_sheet = (sheet if sheet not in (None, "") else None)
+    if target_sheet is None:
+        return wb.active
+    if isinstance(target_sheet, int):
+        return wb.worksheets[target_sheet]
+    return wb[target_sheet]
+
+
+def open_xlsx(path: Path, sheet: str | int | None = None) -> RowSource:
+    wb = load_workbook(path, read_only=True, data_only=True)
+    try:
+        ws = _open_sheet(wb, sheet)
+        try:
+            total_rows = ws.max_row
+        except Exception:
+            total_rows = None
+    except Exception:
+        wb.close()
+        raise
+    return RowSource(
+        ws.iter_rows(values_only=True), fmt="xlsx", total_rows=total_rows, close=wb.close, reader="openpyxl",
+    )
+
+
+class UnsupportedWorkbook(Exception):
+    """El lector raw no sabe leer este workbook; se usa openpyxl."""
+
+
+def _parse_xml(z: zipfile.ZipFile, name: str):
+    with z.open(name) as f:
+        return parse(f).getroot()
+
+
+def _sheet_part(z: zipfile.ZipFile, sheet: str | int | None) -> tuple[str, bool]:
+    """Resuelve la hoja pedida (None = activa) a su parte dentro del zip. Retorna (parte, date1904)."""
+    wb = _parse_xml(z, "xl/workbook.xml")
+    if wb.tag != f"{{{SHEET_NS}}}workbook":
+        raise UnsupportedWorkbook(f"namespace no soportado: {wb.tag}")
+
+    pr = wb.find(f"{{{SHEET_NS}}}workbookPr")
+    date1904 = pr is not None and pr.get("date1904") in ("1", "true")
+
+    sheets = [
+        (el.get("name"), el.get(f"{{{REL_NS}}}id"))
+        for el in wb.iterfind(f"{{{SHEET_NS}}}sheets/{{{SHEET_NS}}}sheet")
+    ]
+    target_sheet = (sheet if sheet not in (None, "") else None)
+    if target_sheet is None:
+        view = wb.find(f"{{{SHEET_NS}}}bookViews/{{{SHEET_NS}}}workbookView")
+        idx = int(view.get("activeTab", 0)) if view is not None else 0
+        name, rid = sheets[idx]
+    elif isinstance(target_sheet, int):
+        name, rid = sheets[target_sheet]
+    else:
+        matches = [rid for n, rid in sheets if n == target_sheet]
+        if not matches:
+            raise UnsupportedWorkbook(f"Worksheet {target_sheet} does not exist.")
+        rid = matches[0]
+
+    rels = _parse_xml(z, "xl/_rels/workbook.xml.rels")
+    for rel in rels.iterfind(f"{{{PKG_REL_NS}}}Relationship"):
+        if rel.get("Id") == rid:
+            if rel.get("Type") != WORKSHEET_REL:
+                raise UnsupportedWorkbook(f"la hoja no es un worksheet: {rel.get('Type')}")
+            target = rel.get("Target")
+            part = target.lstrip("/") if target.startswith("/") else posixpath.normpath(f"xl/{target}")
+            if part not in z.NameToInfo:
+                raise UnsupportedWorkbook(f"falta la parte {part}")
+            return part, date1904
+    raise UnsupportedWorkbook(f"relación {rid} no encontrada")
+
+
+def _date_styles(z: zipfile.ZipFile) -> tuple[set[int], set[int]]:
+    """Índices de cellXfs con formato fecha / duración (mismo criterio que openpyxl)."""
+    if "xl/styles.xml" not in z.NameToInfo:
+        return set(), set()
+    root = _parse_xml(z, "xl/styles.xml")
+    custom = {
+        int(el.get("numFmtId")): el.get("formatCode")
+        for el in root.iterfind(f"{{{SHEET_NS}}}numFmts/{{{SHEET_NS}}}numFmt")
+    }
+    dates, timedeltas = set(), set()
+    for idx, xf in enumerate(root.iterfind(f"{{{SHEET_NS}}}cellXfs/{{{SHEET_NS}}}xf")):
+        fmt_id = int(xf.get("numFmtId", 0))
+        fmt = custom.get(fmt_id) or BUILTIN_FORMATS.get(fmt_id)
+        if fmt is None:
+            continue
+        if is_date_format(fmt):
+            dates.add(idx)
+        if is_timedelta_format(fmt):
+            timedeltas.add(idx)
+    return dates, timedeltas
+
+
+def _sheet_dimension(z: zipfile.ZipFile, part: str) -> tuple[int | None, int | None]:
+    """(max_row, max_col) según <dimension>, leyendo solo el principio de la hoja."""
+    with z.open(part) as f:
+        head = f.read(4096)
+    m = DIMENSION_RE.search(head)
+    if not m or not m.group(3):
+        return None, None
+    return int(m.group(4)), column_index_from_string(m.group(3).decode())
+
+
+def _iter_raw_rows(src, shared: list[str], date_styles: set[int], td_styles: set[int],
+                   epoch, max_col: int | None):
+    """
+    Recorre <sheetData> con iterparse y produce tuplas de valores con los mismos
+    tipos que openpyxl (read_only, data_only, values_only). Las filas faltantes
+    salen como tuplas vacías para que los índices coincidan con el número de fila.
+    """
+    ns = f"{{{SHEET_NS}}}"
+    ROW, C, V, IS, T, R = ns + "row", ns + "c", ns + "v", ns + "is", ns + "t", ns + "r"
+    SHEET_DATA = ns + "sheetData"
+    col_cache: dict[str, int] = {}
+    digits = "0123456789"
+
+    sheet_data = None
+    expected = 1
+    for event, el in iterparse(src, events=("start", "end")):
+        if event == "start":
+            if sheet_data is None and el.tag == SHEET_DATA:
+                sheet_data = el
+            continue
+        if el.tag != ROW:
+            continue
+
+        r_attr = el.get("r")
+        row_idx = int(r_attr) if r_attr else expected
+        while expected < row_idx:
+            yield ()
+            expected += 1
+
+        values = []
+        col = 0
+        for c in el:
+            if c.tag != C:
+                continue
+            ref = c.get("r")
+            if ref:
+                letters = ref.rstrip(digits)
+                col = col_cache.get(letters)
+                if col is None:
+                    col = col_cache[letters] = column_index_from_string(letters)
+            else:
+                col += 1
+
+            t = c.get("t", "n")
+            if t == "inlineStr":
+                node = c.find(IS)
+                value = None
+                if node is not None:
+                    value = (node.findtext(T) or "") + "".join(
+                        run.findtext(T) or "" for run in node.iterfind(R)
+                    )
+            else:
+                value = c.findtext(V) or None
+                if value is not None:
+                    if t == "n":
+                        value = float(value) if ("." in value or "E" in value or "e" in value) else int(value)
+                        style = c.get("s")
+                        if style and int(style) in date_styles:
+                            try:
+                                value = from_excel(value, epoch, timedelta=int(style) in td_styles)
+                            except (OverflowError, ValueError):
+                                value = "#VALUE!"
+                    elif t == "s":
+                        value = shared[int(value)]
+                    elif t == "b":
+                        value = bool(int(value))
+                    elif t == "d":
+                        value = from_ISO8601(value)
+
+            if col > len(values):
+                if col - 1 > len(values):
+                    values.extend([None] * (col - 1 - len(values)))
+                values.append(value)
+            else:
+                values[col - 1] = value
+
+        if max_col is not None and len(values) < max_col:
+            values.extend([None] * (max_col - len(values)))
+        yield tuple(values)
+        expected = row_idx + 1
+        if sheet_data is not None:
+            sheet_data.clear()  # memoria constante: descarta las filas ya procesadas
+        else:
+            el.clear()
+
+
+def open_xlsx_raw(path: Path, sheet: str | int | None = None) -> RowSource:
+    """
+    Lector xlsx sin openpyxl por celda. Lanza UnsupportedWorkbook si el archivo
+    no tiene la estructura esperada (ver open_row_source para el fallback).
+    """
+    z = zipfile.ZipFile(path)
+    try:
+        part, date1904 = _sheet_part(z, sheet)
+        shared = []
+        if "xl/sharedStrings.xml" in z.NameToInfo:
+            with z.open("xl/sharedStrings.xml") as f:
+                shared = read_string_table(f)
+        date_styles, td_styles = _date_styles(z)
+        max_row, max_col = _sheet_dimension(z, part)
+        src = z.open(part)
+    except UnsupportedWorkbook:
+        z.close()
+        raise
+    except Exception as e:
+        z.close()
+        raise UnsupportedWorkbook(str(e)) from e
+
+    epoch = CALENDAR_MAC_1904 if date1904 else CALENDAR_WINDOWS_1900
+
+    def close():
+        src.close()
+        z.close()
+
+    rows = _iter_raw_rows(src, shared, date_styles, td_styles, epoch, max_col)
+    return RowSource(rows, fmt="xlsx", total_rows=max_row, close=close, reader="raw")
+
+
+def sniff_encoding(sample: bytes) -> str:
+    for enc in CSV_ENCODINGS:
+        try:
+            # final=False: la muestra puede cortar un caracter multibyte al final
+            codecs.getincrementaldecoder(enc)().decode(sample, final=False)
+            return enc
+        except UnicodeDecodeError:
+            continue
+    return "latin-1"
+
+
+def sniff_delimiter(text: str) -> str:
+    try:
+        return csv.Sniffer().sniff(text, delimiters=CSV_DELIMITERS).delimiter
+    except csv.Error:
+        # Sin patrón claro: el separador más frecuente de la muestra
+        counts = {d: text.count(d) for d in CSV_DELIMITERS}
+        best = max(counts, key=counts.get)
+        return best if counts[best] else ","
+
+
+def open_delimited(path: Path) -> RowSource:
+    with open(path, "rb") as f:
+        sample = f.read(SNIFF_BYTES)
+    encoding = sniff_encoding(sample)
+    text = sample.decode(encoding, errors="ignore")
+    lines = text.splitlines()
+    truncated = len(sample) == SNIFF_BYTES
+
+    # Solo líneas completas para el sniffer
+    complete = lines[:-1] if truncated and len(lines) > 1 else lines
+    delimiter = sniff_delimiter("\n".join(complete[:200]))
+
+    # Filas aproximadas = tamaño / largo medio de línea en la muestra
+    total_rows = len(lines)
+    if truncated and lines:
+        total_rows = int(Path(path).stat().st_size / (len(sample) / len(lines)))
+
+    f = open(path, "r", encoding=encoding, errors="replace", newline="")
+    rows = (tuple(r) for r in csv.reader(f, delimiter=delimiter))
+    return RowSource(
+        rows,
+        fmt="csv",
+        total_rows=total_rows,
+        close=f.close,
+        reader="csv",
+        delimiter=delimiter,
+        encoding=encoding,
+    )
+
+
+def list_sheets(path: Path) -> list[str | None]:
+    """
+    Hojas (worksheets, sin chartsheets) del xlsx en orden; [None] para csv/tsv
+    (una sola tabla). Lee solo workbook.xml y sus relaciones; si el workbook es
+    raro cae a openpyxl.
+    """
+    p = Path(path)
+    if detect_format(p) != "xlsx":
+        return [None]
+    try:
+        with zipfile.ZipFile(p) as z:
+            wb = _parse_xml(z, "xl/workbook.xml")
+            if wb.tag != f"{{{SHEET_NS}}}workbook":
+                raise UnsupportedWorkbook(f"namespace no soportado: {wb.tag}")
+            rels = {
+                rel.get("Id"): rel.get("Type")
+                for rel in _parse_xml(z, "xl/_rels/workbook.xml.rels").iterfind(f"{{{PKG_REL_NS}}}Relationship")
+            }
+            return [
+                el.get("name")
+                for el in wb.iterfind(f"{{{SHEET_NS}}}sheets/{{{SHEET_NS}}}sheet")
+                if rels.get(el.get(f"{{{REL_NS}}}id")) == WORKSHEET_REL
+            ]
+    except (UnsupportedWorkbook, KeyError):
+        wb = load_workbook(p, read_only=True)
+        try:
+            return [ws.title for ws in wb.worksheets]
+        finally:
+            wb.close()
+
+
+def open_row_source(path: Path, sheet: str | int | None = None, reader: str = "openpyxl") -> RowSource:
+    """
+    Abre el archivo con el lector que corresponda a su contenido. sheet y reader
+    solo aplican a xlsx; reader="raw" cae a openpyxl si el workbook no es soportado.
+    """
+    if reader not in XLSX_READERS:
+        raise ValueError(f"reader inválido: {reader!r} (opciones: {', '.join(XLSX_READERS)})")
+    p = Path(path)
+    if detect_format(p) != "xlsx":
+        return open_delimited(p)
+    if reader == "raw":
+        try:
+            return open_xlsx_raw(p, sheet)
+        except UnsupportedWorkbook as e:
+            print(f"[navidad_readers] lector raw no soportado ({e}); uso openpyxl", flush=True)
+    return open_xlsx(p, sheet)
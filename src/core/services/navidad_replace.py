@@ -0,0 +1,102 @@
+"""
+Estrategia write_mode="replace" del navidad loader (backend ORM).
+
+"Reemplazar todo para estas fechas": para el rango de fechas del archivo y las
+sucursales que aparecen en él, las filas de StockRecord/SalesRecord que había
+se borran y se insertan las del archivo, sin buscar claves existentes.
+
+El archivo se lee en streaming, así que el rango completo recién se conoce al
+final. Por eso:
+- la primera vez que aparece una partición (sucursal, día) se borra entera
+  (un DELETE por día y chunk, con todas las sucursales nuevas de ese día) y sus
+  filas se insertan con un INSERT plano;
+- si la partición sigue en un chunk posterior, esas filas van con ON CONFLICT
+  (pueden repetir claves ya insertadas en esta corrida);
+- al final, finish() borra las particiones del rango × sucursales que no
+  vinieron en el archivo (un DELETE por día), también sus hashes de partición
+  (PartitionDigest): si no, una importación incremental posterior con esas
+  particiones las vería "sin cambios" y no las volvería a cargar. Los hashes de
+  las particiones del archivo los reescribe el PartitionTracker del loader.
+El resultado es el mismo que borrar rango × sucursales al principio. Todo corre
+dentro de la transacción del loader: los lectores ven lo viejo hasta el commit.
+Por eso requiere commit="atomic" (con "chunk" se verían fechas a medio
+reemplazar) y no se combina con incremental (una partición salteada se borraría).
+"""
+from collections import defaultdict
+from datetime import timedelta
+
+from core.models import PartitionDigest, Store
+from core.services.navidad_chunks import bulk_batch_size
+from sales.models import SalesRecord
+from stock.models import StockRecord
+
+TARGETS = (
+    ("stock", StockRecord, ["stock_units", "stock_value"]),
+    ("sales", SalesRecord, ["units_sold", "revenue"]),
+)
+
+
+def _delete_partitions(partitions, summary: dict, *, digests: bool = False):
+    """
+    Borra las particiones (store_id, date) de ambas tablas: un DELETE por día.
+    digests=True también borra sus hashes (PartitionDigest, por código de sucursal).
+    """
+    by_date = defaultdict(set)
+    for store_id, dt in partitions:
+        by_date[dt].add(store_id)
+    codes = {}
+    if digests and by_date:
+        store_ids = {store_id for store_id, _ in partitions}
+        codes = dict(Store.objects.filter(pk__in=store_ids).values_list("id", "code"))
+    for dt, store_ids in sorted(by_date.items()):
+        for prefix, model, _ in TARGETS:
+            deleted, _ = model.objects.filter(date=dt, store_id__in=store_ids).delete()
+            summary[f"{prefix}_deleted"] += deleted
+        if codes:
+            PartitionDigest.objects.filter(date=dt, store_code__in=[codes[s] for s in store_ids]).delete()
+
+
+class RangeReplacer:
+    def __init__(self, upsert):
+        # upsert(model, objs, update_fields) -> (creados, actualizados); lo pasa el loader.
+        self.upsert = upsert
+        self.seen: set[tuple[int, object]] = set()
+
+    def write(self, partitions: set, stock_objs: list, sales_objs: list, summary: dict):
+        """
+        partitions: (store_id, date) de las filas resueltas del chunk (aunque no
+        generen registros: una venta en 0 también reemplaza la venta vieja).
+        """
+        fresh = partitions - self.seen
+        _delete_partitions(fresh, summary)
+        self.seen |= fresh
+
+        for (prefix, model, update_fields), objs in zip(TARGETS, (stock_objs, sales_objs)):
+            deduped = {}
+            for obj in objs:  # última aparición gana, igual que en merge/upsert
+                deduped[(obj.store_id, obj.family_id, obj.date)] = obj
+            new, cont = [], []
+            for obj in deduped.values():
+                (new if (obj.store_id, obj.date) in fresh else cont).append(obj)
+
+            if new:
+                model.objects.bulk_create(new, batch_size=bulk_batch_size(model))
+                summary[f"{prefix}_created"] += len(new)
+            if cont:
+                created, updated = self.upsert(model, cont, update_fields)
+                summary[f"{prefix}_created"] += created
+                summary[f"{prefix}_updated"] += updated
+
+    def finish(self, summary: dict):
+        """Borra lo que había en rango × sucursales del archivo y no vino en el archivo."""
+        if not self.seen:
+            return
+        stores = {store_id for store_id, _ in self.seen}
+        dates = [dt for _, dt in self.seen]
+        lo, hi = min(dates), max(dates)
+        missing = set()
+        dt = lo
+        while dt <= hi:
+            missing.update((store_id, dt) for store_id in stores if (store_id, dt) not in self.seen)
+            dt += timedelta(days=1)
+        _delete_partitions(missing, summary, digests=True)
@@ -0,0 +1,149 @@
+"""
+Registro de corridas (ImportRun) y checkpoints del navidad loader.
+
+Cada corrida queda en una fila de ImportRun con sus contadores, tiempos por
+fase, filas/s y memoria pico (historial de rendimiento entre versiones y a
+medida que crecen los datos).
+
+En modo commit="chunk", después de cada chunk el loader escribe el chunk y
+avanza last_committed_row en la misma transacción: si la corrida se corta, el
+checkpoint apunta exactamente a la última fila que quedó en la BD. Una nueva
+corrida del mismo archivo (mismo contenido y hoja) con resume=True arranca
+desde ahí; las filas salteadas quedan en summary["rows_skipped_checkpoint"].
+
+En commit="atomic" la fila se inserta recién al terminar, fuera de la
+transacción de la importación: si la importación falla y se hace rollback, la
+corrida fallida igual queda registrada.
+
+Tiempos por fase (en el summary y en la corrida): header_seconds (detección de
+encabezados), read_seconds (lectura de filas; en pipeline, espera al lector),
+parse_seconds, lookup_seconds (búsqueda de existentes), write_seconds (en el
+summary incluye el lookup; en la corrida, no), finish_seconds (merge de COPY /
+cierre de replace / derivados) y elapsed_seconds (total, con el commit).
+"""
+import hashlib
+import sys
+from pathlib import Path
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+from django.utils import timezone
+
+from core.models import ImportRun
+
+FINGERPRINT_BLOCK = 1024 * 1024
+
+
+def file_fingerprint(path: Path) -> str:
+    """sha256 del contenido: el mismo archivo renombrado o copiado se reconoce igual."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(FINGERPRINT_BLOCK), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def resume_point(fingerprint: str, sheet: str) -> ImportRun | None:
+    """
+    Última corrida del archivo/hoja si quedó sin terminar (fallida o cortada en
+    'running'). Si la última terminó bien no hay nada que retomar.
+    """
+    last = (
+        ImportRun.objects.filter(file_fingerprint=fingerprint, sheet=sheet, commit="chunk")
+        .order_by("-started_at", "-pk")
+        .first()
+    )
+    if last is None or last.status == ImportRun.Status.DONE:
+        return None
+    return last
+
+
+def peak_memory_bytes() -> int | None:
+    """Pico de memoria residente del proceso (None si la plataforma no lo informa)."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024  # Linux lo da en KB
+
+
+def start_run(
+    path: Path,
+    fingerprint: str,
+    sheet: str,
+    resumed_from: int = 0,
+    *,
+    commit: str = "chunk",
+    write_mode: str = "",
+    backend: str = "",
+) -> ImportRun:
+    """
+    En commit="chunk" la corrida se inserta ya (el checkpoint se actualiza chunk
+    a chunk); en "atomic" queda sin guardar hasta finish_run/fail_run.
+    """
+    run = ImportRun(
+        file_name=path.name,
+        file_fingerprint=fingerprint,
+        file_size=path.stat().st_size,
+        sheet=sheet,
+        commit=commit,
+        write_mode=write_mode,
+        backend=backend,
+        resumed_from=resumed_from,
+        last_committed_row=resumed_from,
+    )
+    if commit == "chunk":
+        run.save()
+    return run
+
+
+def save_checkpoint(run: ImportRun, last_committed_row: int):
+    """Se llama dentro de la transacción del chunk."""
+    run.last_committed_row = last_committed_row
+    ImportRun.objects.filter(pk=run.pk).update(last_committed_row=last_committed_row, updated_at=timezone.now())
+
+
+COUNTERS = (
+    "stock_created", "stock_updated", "stock_skipped",
+    "sales_created", "sales_updated", "sales_skipped",
+)
+PHASES = ("header_seconds", "read_seconds", "parse_seconds", "lookup_seconds")
+
+
+def _record_metrics(run: ImportRun, summary: dict):
+    """Copia contadores y tiempos del summary a las columnas de la corrida."""
+    for key in COUNTERS:
+        setattr(run, key, summary.get(key, 0))
+    run.rows_read = summary.get("rows", 0)
+    run.rows_written = sum(summary.get(k, 0) for k in COUNTERS if not k.endswith("_skipped"))
+    for key in PHASES:
+        setattr(run, key, summary.get(key))
+    # write_seconds del summary incluye el lookup de existentes; acá va solo la escritura
+    # (más el merge final de COPY / el cierre de replace).
+    if "write_seconds" in summary:
+        run.write_seconds = (
+            summary["write_seconds"] - summary.get("lookup_seconds", 0) + summary.get("finish_seconds", 0)
+        )
+    run.elapsed_seconds = summary.get("elapsed_seconds")
+    run.rows_per_sec = summary.get("rows_per_sec")
+    run.peak_memory_bytes = summary.get("peak_memory_bytes")
+    run.summary = summary
+
+
+def finish_run(run: ImportRun, summary: dict):
+    run.status = ImportRun.Status.DONE
+    if run.commit != "chunk":
+        run.last_committed_row = run.resumed_from + summary.get("rows", 0)
+    _record_metrics(run, summary)
+    run.finished_at = timezone.now()
+    run.save()
+
+
+def fail_run(run: ImportRun, error: BaseException, summary: dict):
+    run.status = ImportRun.Status.FAILED
+    run.error = f"{type(error).__name__}: {error}"
+    _record_metrics(run, summary)
+    run.finished_at = timezone.now()
+    run.save()
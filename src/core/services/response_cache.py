@@ -0,0 +1,159 @@
+"""
+Cache de respuestas de los endpoints *_data (curvas, ventas por zona, estado
+de ventas, overview).
+
+Las respuestas solo cambian cuando cambian los datos, así que la clave es:
+- la vista;
+- la versión global de los datos (DataVersion): la suben las importaciones
+  (navidad loader / navidad_multi, después del commit y del cubo de temporada)
+  y los comandos que cargan o rearman datos (bump_version). Una versión nueva
+  deja inalcanzable todo lo cacheado, sin borrar nada;
+- el ámbito de la consulta normalizado (request_scope): solo los parámetros
+  que usa la vista, sin vacíos y, con sucursal, sin región/zona (la vista las
+  toma de la sucursal, como _coherent_scope_from_request).
+Lo que se cambie por el admin o el shell no sube la versión: se ve después de
+la próxima importación o de un rebuild_*.
+
+Backend: el alias "responses" de CACHES (settings.RESPONSE_CACHE_BACKEND):
+locmem (por proceso), file (compartido por los workers) o db (tabla
+`createcachetable`). Se guarda el cuerpo JSON de las respuestas 200.
+
+Contadores: hits/misses por vista en memoria del proceso (un Counter con lock,
+sin tocar el backend: con db cada hit sería una escritura y con file el incr no
+es atómico), en stats() y en el endpoint core:response_cache_stats. Son los del
+worker que atiende el pedido (stats()["pid"]), desde que arrancó.
+Cada respuesta lleva X-Cache: hit|miss. settings.RESPONSE_CACHE_ENABLED en
+False (los tests lo apagan con override_settings, salvo los del cache) deja
+pasar todo directo a la vista.
+"""
+import hashlib
+import json
+import os
+import threading
+from collections import Counter
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import F
+from django.http import HttpResponse
+
+from core.models import DataVersion
+
+ALIAS = "responses"
+PREFIX = "data"
+HIT = "hit"
+MISS = "miss"
+
+_views: list[str] = []
+_counts: Counter = Counter()
+_counts_lock = threading.Lock()
+
+
+def enabled() -> bool:
+    return getattr(settings, "RESPONSE_CACHE_ENABLED", False)
+
+
+def _cache():
+    return caches[ALIAS]
+
+
+def current_version() -> int:
+    return DataVersion.objects.filter(pk=1).values_list("version", flat=True).first() or 0
+
+
+def bump_version() -> int:
+    """Sube la versión de los datos (invalida las respuestas cacheadas). Retorna la nueva."""
+    if not DataVersion.objects.filter(pk=1).update(version=F("version") + 1):
+        DataVersion.objects.get_or_create(pk=1, defaults={"version": 1})
+    return current_version()
+
+
+def request_scope(request, params: dict) -> dict:
+    """
+    Ámbito canónico de la consulta: los parámetros de params (nombre ->
+    default) con su valor o default, sin vacíos. Con store_code se descartan
+    region_id/zone_id: la vista los toma de la sucursal.
+    """
+    scope = {}
+    for name, default in params.items():
+        value = request.GET.get(name, default)
+        if value not in (None, ""):
+            scope[name] = str(value).strip()
+    if "store_code" in scope:
+        scope.pop("region_id", None)
+        scope.pop("zone_id", None)
+    return scope
+
+
+def cache_key(view: str, version: int, scope: dict) -> str:
+    digest = hashlib.md5(json.dumps(scope, sort_keys=True).encode()).hexdigest()
+    return f"{PREFIX}:{view}:v{version}:{digest}"
+
+
+def _count(view: str, outcome: str):
+    with _counts_lock:
+        _counts[(view, outcome)] += 1
+
+
+def reset_stats():
+    with _counts_lock:
+        _counts.clear()
+
+
+def cached_json(params: dict):
+    """
+    Decorador de un endpoint *_data: cachea el JSON de las respuestas 200 por
+    (vista, versión de datos, request_scope(request, params)).
+    """
+    def decorator(view):
+        name = view.__name__
+        _views.append(name)
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if not enabled() or request.method != "GET":
+                return view(request, *args, **kwargs)
+            key = cache_key(name, current_version(), request_scope(request, params))
+            body = _cache().get(key)
+            if body is not None:
+                _count(name, HIT)
+                response = HttpResponse(body, content_type="application/json")
+                response["X-Cache"] = HIT
+                return response
+            _count(name, MISS)
+            response = view(request, *args, **kwargs)
+            if response.status_code == 200:
+                _cache().set(key, response.content)
+            response["X-Cache"] = MISS
+            return response
+
+        return wrapper
+    return decorator
+
+
+def stats() -> dict:
+    """Hits/misses por vista y totales de este proceso, con la versión de datos vigente."""
+    with _counts_lock:
+        counts = dict(_counts)
+    views = {}
+    for name in _views:
+        hits = counts.get((name, HIT), 0)
+        misses = counts.get((name, MISS), 0)
+        views[name] = {
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": hits / (hits + misses) if hits + misses else None,
+        }
+    hits = sum(v["hits"] for v in views.values())
+    misses = sum(v["misses"] for v in views.values())
+    return {
+        "enabled": enabled(),
+        "backend": settings.CACHES[ALIAS]["BACKEND"],
+        "pid": os.getpid(),
+        "data_version": current_version(),
+        "hits": hits,
+        "misses": misses,
+        "hit_rate": hits / (hits + misses) if hits + misses else None,
+        "views": views,
+    }
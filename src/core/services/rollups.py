@@ -0,0 +1,176 @@
+"""
+Rollups diarios por área (DailyRollup): ventas y stock por familia y día,
+sumados por zona, por región y para todas las sucursales, con sucursales y
+CDR por separado.
+
+Mantenimiento (refresh_rollups), siempre por (zonas, rango de fechas):
+1. nivel zona: se vuelve a sumar desde SalesRecord/StockRecord, solo para las
+   zonas de las sucursales tocadas y el rango de fechas;
+2. nivel región: se rearma desde las filas de zona de las regiones afectadas;
+3. nivel all: se rearma desde las filas de región del rango.
+Cada nivel sale del anterior, así que solo el primero lee los hechos. Las filas
+se escriben con upsert sobre la clave única de DailyRollup y se borran las del
+ámbito que quedaron sin celda; el refresco completo va bajo un bloqueo de fila
+(MaintenanceLock "rollups"), así que dos importaciones concurrentes no dejan
+totales repetidos ni viejos. El navidad loader lo llama al final de cada
+importación con su huella (navidad_footprint) y `manage.py load_stores` con las
+sucursales que cambiaron de zona/región o de tipo (CDR), junto con sus zonas
+anteriores; `manage.py rebuild_rollups` rearma todo. Lo que se escriba por
+fuera (admin, shell) queda desactualizado hasta el rebuild.
+
+Lectura (rollup_for): dado el ámbito de una vista (los mismos filtros que
+aplica sobre los hechos: store__region_id, store__zone_id, store__code,
+family_id) devuelve el DailyRollup del nivel más grueso que lo responde, o
+None si hace falta la tabla de hechos (una sucursal puntual) o si los rollups
+están desactivados (settings.ROLLUPS_ENABLED; los tests de paridad lo usan
+para comparar contra el camino original).
+"""
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Sum
+
+from core.models import DailyRollup, MaintenanceLock, Store
+from core.services.navidad_chunks import bulk_batch_size
+from sales.models import SalesRecord
+from stock.models import StockRecord
+
+ZONE = DailyRollup.Level.ZONE
+REGION = DailyRollup.Level.REGION
+ALL = DailyRollup.Level.ALL
+KEY_FIELDS = ["level", "area_key", "is_cdr", "family", "date"]
+LOCK = "rollups"
+DELETE_BATCH = 500  # ids por DELETE ... WHERE pk IN (...)
+
+# Filtros de ámbito de las vistas -> campo del rollup.
+SCOPE_FIELDS = {
+    "store__region_id": "region_id",
+    "store__zone_id": "zone_id",
+    "family_id": "family_id",
+}
+
+
+def enabled() -> bool:
+    return getattr(settings, "ROLLUPS_ENABLED", True)
+
+
+def area_key(region_id, zone_id) -> str:
+    """Clave de área sin nulos de DailyRollup ("región:zona"; vacíos en región/all)."""
+    return f"{region_id or ''}:{zone_id or ''}"
+
+
+def _write(level, cells: dict, scope) -> int:
+    """
+    cells: (region_id, zone_id, is_cdr, family_id, date) -> [unidades vendidas, stock].
+    Upsert por la clave única (level, area_key, is_cdr, family, date) y después
+    borra las filas de scope (lo que se está rearmando) que ya no tienen celda.
+    """
+    rows = [
+        DailyRollup(
+            level=level, region_id=region_id, zone_id=zone_id, area_key=area_key(region_id, zone_id),
+            is_cdr=is_cdr, family_id=family_id, date=dt, units_sold=sold, stock_units=stock,
+        )
+        for (region_id, zone_id, is_cdr, family_id, dt), (sold, stock) in cells.items()
+    ]
+    DailyRollup.objects.bulk_create(
+        rows,
+        update_conflicts=True,
+        unique_fields=KEY_FIELDS,
+        update_fields=["units_sold", "stock_units"],
+        batch_size=bulk_batch_size(DailyRollup),
+    )
+    keys = {(row.area_key, row.is_cdr, row.family_id, row.date) for row in rows}
+    gone = [
+        pk for pk, *key in scope.values_list("pk", "area_key", "is_cdr", "family_id", "date").iterator()
+        if tuple(key) not in keys
+    ]
+    for i in range(0, len(gone), DELETE_BATCH):
+        DailyRollup.objects.filter(pk__in=gone[i:i + DELETE_BATCH]).delete()
+    return len(rows)
+
+
+def _from_facts(dates: dict, zones) -> dict:
+    """Celdas de nivel zona sumadas desde los hechos (una query por tabla)."""
+    cells = defaultdict(lambda: [0, 0])
+    for i, (model, field) in enumerate(((SalesRecord, "units_sold"), (StockRecord, "stock_units"))):
+        qs = model.objects.filter(**dates)
+        if zones is not None:
+            qs = qs.filter(store__zone_id__in=zones)
+        groups = qs.values_list(
+            "store__region_id", "store__zone_id", "store__is_distribution_center", "family_id", "date",
+        ).annotate(total=Sum(field)).order_by()
+        for *key, total in groups:
+            cells[tuple(key)][i] = total
+    return cells
+
+
+def refresh_rollups(store_ids=None, start=None, end=None, *, zones=()) -> int:
+    """
+    Rearma los rollups de las zonas de store_ids en [start, end]; None = todas
+    las zonas / todas las fechas. zones suma zonas que ya no tienen a esas
+    sucursales (las anteriores de una sucursal que se mudó). Retorna las filas
+    escritas (los tres niveles).
+    Toma el bloqueo "rollups" (MaintenanceLock) hasta el commit: dos refrescos
+    concurrentes (escritores de navidad_multi, imports de otros workers) van en
+    serie y el segundo ve las filas de zona del primero al sumar región y all.
+    """
+    if store_ids is not None and not store_ids:
+        return 0
+    dates = {"date__range": (start, end)} if start is not None else {}
+    with transaction.atomic():
+        MaintenanceLock.objects.select_for_update().get_or_create(name=LOCK)
+
+        # 1) Zona, desde los hechos.
+        moved_from, zones, regions = set(zones), None, None
+        scope = DailyRollup.objects.filter(level=ZONE, **dates)
+        if store_ids is not None:
+            zones = moved_from | set(Store.objects.filter(pk__in=store_ids).values_list("zone_id", flat=True))
+            scope = scope.filter(zone_id__in=zones)
+            # Regiones a rearmar: las que tenían filas de esas zonas y las que las van a tener.
+            regions = set(scope.values_list("region_id", flat=True).distinct())
+        cells = _from_facts(dates, zones)
+        written = _write(ZONE, cells, scope)
+
+        # 2) Región, desde las filas de zona.
+        zone_rows = DailyRollup.objects.filter(level=ZONE, **dates)
+        scope = DailyRollup.objects.filter(level=REGION, **dates)
+        if regions is not None:
+            regions |= {key[0] for key in cells}
+            zone_rows = zone_rows.filter(region_id__in=regions)
+            scope = scope.filter(region_id__in=regions)
+        groups = _sum_levels(zone_rows, "region_id", "is_cdr", "family_id", "date")
+        written += _write(REGION, {(r, None, cdr, f, dt): sums for (r, cdr, f, dt), sums in groups}, scope)
+
+        # 3) Todas las sucursales, desde las filas de región.
+        groups = _sum_levels(DailyRollup.objects.filter(level=REGION, **dates), "is_cdr", "family_id", "date")
+        written += _write(
+            ALL, {(None, None, cdr, f, dt): sums for (cdr, f, dt), sums in groups},
+            DailyRollup.objects.filter(level=ALL, **dates),
+        )
+    return written
+
+
+def _sum_levels(qs, *key_fields):
+    """(clave, [unidades vendidas, stock]) sumando filas de un nivel más fino por key_fields."""
+    groups = qs.values_list(*key_fields).annotate(sold=Sum("units_sold"), stock=Sum("stock_units")).order_by()
+    for *key, sold, stock in groups:
+        yield tuple(key), [sold, stock]
+
+
+def rollup_for(scope: dict, *, by_zone: bool = False):
+    """
+    DailyRollup del nivel más grueso que responde scope, ya filtrado por área y
+    familia (el llamador agrega fechas e is_cdr); None = usar los hechos.
+    by_zone=True fuerza el nivel zona (para agrupar por zona_id).
+    """
+    if not enabled() or any(key not in SCOPE_FIELDS for key in scope):
+        return None
+    if by_zone or scope.get("store__zone_id"):
+        level = ZONE
+    elif scope.get("store__region_id"):
+        level = REGION
+    else:
+        level = ALL
+    filters = {SCOPE_FIELDS[key]: value for key, value in scope.items() if value not in (None, "")}
+    return DailyRollup.objects.filter(level=level, **filters)
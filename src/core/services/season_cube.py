@@ -0,0 +1,424 @@
+"""
+Cubo de temporada en memoria compartida: ventas y stock diarios por
+temporada × sucursal × familia × día (1/oct..31/dic) en archivos .npy.
+
+Escritura (build_cube): después de cada importación commiteada se arma una
+versión nueva. Solo las temporadas de la importación (los años de su huella)
+se leen de SalesRecord/StockRecord; las demás se copian de la versión
+publicada (sin versión previa, o con `manage.py build_season_cube`, se leen
+todas). La versión nueva es:
+- un directorio <SEASON_CUBE_DIR>/<versión>/ con sales.npy, stock.npy y
+  meta.json (ejes: temporadas, sucursales con región/zona/código/CDR y
+  familias), escrito con otro nombre y renombrado al terminar;
+- después se reemplaza el archivo CURRENT con el nombre de la versión
+  (os.replace, atómico). Quedan la versión actual y la anterior (un worker
+  puede estar leyéndola); las más viejas se borran.
+El navidad loader lo publica al final de cada importación (navidad_multi una
+vez para todos los archivos); `manage.py build_season_cube` lo arma a mano. Los
+builds van en serie, también entre procesos (lock de archivo en
+SEASON_CUBE_DIR): cada uno parte de la versión que dejó el anterior, así que el
+último publicado incluye todo lo commiteado antes de empezar y CURRENT nunca
+vuelve a una versión más vieja. Los hechos de cada temporada se leen con un
+cursor (iterator) y se suman al cubo por lotes de FETCH_ROWS filas: la memoria
+no crece con el tamaño de la temporada.
+
+Si una publicación falla, la importación igual termina (los datos ya están
+commiteados): el error va al log (logger "core.services.season_cube") y sus
+temporadas quedan anotadas en el archivo DIRTY. El build siguiente las vuelve a
+leer de los hechos además de las suyas, y borra la marca al publicar.
+
+Lectura (current): cada proceso (worker de gunicorn) abre los .npy con
+np.load(mmap_mode="r"): los datos quedan una sola vez en el page cache para
+todos los workers. En cada consulta se mira CURRENT (un stat); si cambió, se
+mapea la versión nueva sin reiniciar. Las vistas piden cortes con los mismos
+filtros que usan sobre los hechos (store__region_id, store__zone_id,
+store__code, store__is_distribution_center, family_id) y se resuelven con sumas
+de NumPy; cada total se redondea a 2 decimales, como la suma exacta de la base.
+current() devuelve None si el cubo está desactivado
+(settings.SEASON_CUBE_ENABLED) o no hay versión publicada, y los métodos de
+SeasonCube devuelven None si no pueden resolver el filtro: la vista sigue con
+SQL.
+
+El eje de familias incluye las inactivas: desactivar una familia no borra sus
+hechos y los totales de las vistas (SQL) los siguen sumando.
+
+Las sucursales, su región/zona y las familias son las del momento del build:
+`manage.py load_stores` republica (sin leer hechos) si alguna sucursal cambió de
+área o de tipo; otros cambios del maestro se ven en la próxima importación o
+con el comando.
+"""
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+from contextlib import contextmanager
+from datetime import date
+from itertools import islice
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Windows: los builds se serializan solo dentro del proceso
+    fcntl = None
+
+import numpy as np
+from django.conf import settings
+
+from core.models import Family, Store
+from core.utils.periods import christmas_period
+from sales.models import SalesRecord
+from stock.models import StockRecord
+
+SALES = "sales"
+STOCK = "stock"
+FACTS = {SALES: (SalesRecord, "units_sold"), STOCK: (StockRecord, "stock_units")}
+SEASON_DAYS = 92  # 1/oct..31/dic
+CURRENT = "CURRENT"
+DIRTY = "DIRTY"
+LOCK_FILE = ".lock"
+KEEP_VERSIONS = 2
+FETCH_ROWS = 50_000  # filas de hechos por lote (cursor y np.add.at)
+
+# Columnas del eje de sucursales: mismos nombres que los filtros de las vistas.
+STORE_COLUMNS = ("store_id", "store__region_id", "store__zone_id", "store__code", "store__is_distribution_center")
+
+logger = logging.getLogger(__name__)
+
+_build_lock = threading.Lock()
+_map_lock = threading.Lock()
+_mapped = None
+
+
+def enabled() -> bool:
+    return getattr(settings, "SEASON_CUBE_ENABLED", False)
+
+
+def cube_dir() -> Path:
+    return Path(settings.SEASON_CUBE_DIR)
+
+
+def _day(dt: date) -> int:
+    return (dt - christmas_period(dt.year)[0]).days
+
+
+def _round2(values):
+    """Totales a 2 decimales (el mismo float que la suma Decimal de la base)."""
+    return np.rint(np.asarray(values) * 100) / 100
+
+
+def _positions(axis: np.ndarray, ids) -> tuple[np.ndarray, np.ndarray]:
+    """Posición de cada id en axis (ordenado) y máscara de los que están."""
+    ids = np.asarray(ids, dtype=np.int64)
+    pos = np.minimum(np.searchsorted(axis, ids), max(len(axis) - 1, 0))
+    found = axis[pos] == ids if len(axis) else np.zeros(len(ids), dtype=bool)
+    return pos, found
+
+
+# ---------------------------
+# Build
+# ---------------------------
+
+@contextmanager
+def _publish_lock(root: Path):
+    """
+    Los builds van en serie, también entre procesos (lock de archivo): cada uno
+    parte de la última versión publicada y CURRENT nunca vuelve a una anterior.
+    """
+    with _build_lock, open(root / LOCK_FILE, "ab") as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)  # se suelta al cerrar el archivo
+        yield
+
+
+def _published(root: Path):
+    """Versión apuntada por CURRENT (para copiar temporadas), o None."""
+    try:
+        version = (root / CURRENT).read_text(encoding="utf-8").strip()
+        return SeasonCube(root / version)
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def _dirty(root: Path):
+    """Temporadas de publicaciones fallidas (None = todas), o set() si no hay marca."""
+    try:
+        seasons = json.loads((root / DIRTY).read_text(encoding="utf-8"))
+    except FileNotFoundError:
+        return set()
+    except (OSError, ValueError):
+        return None
+    return None if seasons is None else set(seasons)
+
+
+def _mark_dirty(root: Path, seasons):
+    """Suma seasons (None = todas) a la marca DIRTY. Se llama con el lock tomado."""
+    dirty = _dirty(root)
+    merged = None if seasons is None or dirty is None else sorted(dirty | set(seasons))
+    tmp = root / f".{DIRTY}.{os.getpid()}.tmp"
+    tmp.write_text(json.dumps(merged), encoding="utf-8")
+    os.replace(tmp, root / DIRTY)
+
+
+def _add_facts(cube: np.ndarray, qs, start: date, store_axis, family_axis):
+    """Suma (store_id, family_id, date, valor) de qs a la temporada, por lotes de FETCH_ROWS."""
+    rows = qs.iterator(chunk_size=FETCH_ROWS)
+    while batch := list(islice(rows, FETCH_ROWS)):
+        store_ids, family_ids, dates, units = zip(*batch)
+        s_pos, s_found = _positions(store_axis, store_ids)
+        f_pos, f_found = _positions(family_axis, family_ids)
+        days = np.fromiter(((dt - start).days for dt in dates), dtype=np.int64, count=len(batch))
+        keep = s_found & f_found  # sucursales/familias creadas durante el build: próxima versión
+        np.add.at(cube, (s_pos[keep], f_pos[keep], days[keep]), np.asarray(units, dtype=np.float64)[keep])
+
+
+def _copy_season(target: np.ndarray, base: "SeasonCube", kind: str, season: int, store_axis, family_axis):
+    """Copia una temporada de base a target, llevándola a los ejes nuevos (sucursales/familias altas o bajas)."""
+    source = base.arrays[kind][base.seasons[season]]
+    base_stores, base_families = base.columns["store_id"], base.family_ids
+    if np.array_equal(base_stores, store_axis) and np.array_equal(base_families, family_axis):
+        target[:] = source
+        return
+    s_pos, s_found = _positions(store_axis, base_stores)
+    f_pos, f_found = _positions(family_axis, base_families)
+    target[np.ix_(s_pos[s_found], f_pos[f_found])] = source[np.ix_(s_found, f_found)]
+
+
+def build_cube(seasons=None) -> str:
+    """
+    Arma el cubo y lo publica como versión nueva. Retorna la versión.
+    seasons: temporadas (años) a leer de los hechos, más las de publicaciones
+    fallidas (DIRTY); el resto se copia de la versión publicada. None, o si no
+    hay versión publicada, lee todas.
+    """
+    root = cube_dir()
+    root.mkdir(parents=True, exist_ok=True)
+    with _publish_lock(root):
+        dirty = _dirty(root)
+        if seasons is not None:
+            seasons = None if dirty is None else set(seasons) | dirty
+        base = _published(root) if seasons is not None else None
+        stores = list(Store.objects.order_by("id").values_list(
+            "id", "region_id", "zone_id", "code", "is_distribution_center",
+        ))
+        family_axis = np.array(Family.objects.order_by("id").values_list("id", flat=True), dtype=np.int64)
+        store_axis = np.array([row[0] for row in stores], dtype=np.int64)
+        if base is None:
+            fresh = (
+                {dt.year for dt in SalesRecord.objects.dates("date", "year")}
+                | {dt.year for dt in StockRecord.objects.dates("date", "year")}
+            )
+            all_seasons = sorted(fresh)
+        else:
+            fresh = set(seasons)
+            all_seasons = sorted(set(base.seasons) | fresh)
+
+        version = f"{time.time_ns()}-{os.getpid()}"
+        tmp = root / f".{version}.tmp"
+        tmp.mkdir()
+        for kind, (model, field) in FACTS.items():
+            cube = np.lib.format.open_memmap(
+                tmp / f"{kind}.npy", mode="w+", dtype=np.float64,
+                shape=(len(all_seasons), len(store_axis), len(family_axis), SEASON_DAYS),
+            )
+            for i, season in enumerate(all_seasons):
+                if season not in fresh:
+                    _copy_season(cube[i], base, kind, season, store_axis, family_axis)
+                    continue
+                start, end = christmas_period(season)
+                qs = model.objects.filter(date__range=(start, end)).values_list(
+                    "store_id", "family_id", "date", field,
+                ).order_by()
+                _add_facts(cube[i], qs, start, store_axis, family_axis)
+            cube.flush()
+            del cube
+        del base  # suelta los mapeos antes de podar
+
+        meta = {
+            "version": version,
+            "seasons": all_seasons,
+            "families": family_axis.tolist(),
+            "stores": dict(zip(STORE_COLUMNS, (list(column) for column in zip(*stores))))
+            if stores else {name: [] for name in STORE_COLUMNS},
+        }
+        (tmp / "meta.json").write_text(json.dumps(meta), encoding="utf-8")
+        tmp.rename(root / version)
+        pointer = root / f".{CURRENT}.{version}.tmp"
+        pointer.write_text(version, encoding="utf-8")
+        os.replace(pointer, root / CURRENT)
+        (root / DIRTY).unlink(missing_ok=True)  # las temporadas marcadas se leyeron en este build
+        _prune(root, version)
+        return version
+
+
+def _prune(root: Path, current: str):
+    versions = sorted(p for p in root.iterdir() if p.is_dir() and not p.name.startswith("."))
+    for path in versions[:-KEEP_VERSIONS]:
+        if path.name != current:
+            shutil.rmtree(path, ignore_errors=True)  # en Windows falla si otro proceso lo tiene mapeado
+
+
+def publish(seasons=None) -> str | None:
+    """
+    build_cube(seasons) si el cubo está activado. Se llama con los datos ya
+    commiteados: un error no hace fallar la importación, va al log y deja las
+    temporadas marcadas (DIRTY) para el build siguiente.
+    """
+    if not enabled():
+        return None
+    try:
+        return build_cube(seasons)
+    except Exception:
+        logger.exception("No se pudo publicar el cubo de temporada (temporadas=%s)", seasons)
+    root = cube_dir()
+    try:
+        with _publish_lock(root):
+            _mark_dirty(root, seasons)
+    except OSError:
+        logger.exception("No se pudo marcar el cubo de temporada como desactualizado en %s", root)
+    return None
+
+
+# ---------------------------
+# Lectura
+# ---------------------------
+
+class SeasonCube:
+    """Una versión publicada del cubo, mapeada en memoria (solo lectura)."""
+
+    def __init__(self, path: Path, key=None):
+        meta = json.loads((path / "meta.json").read_text(encoding="utf-8"))
+        self.key = key
+        self.version = meta["version"]
+        self.seasons = {season: i for i, season in enumerate(meta["seasons"])}
+        self.family_ids = np.array(meta["families"], dtype=np.int64)
+        stores = meta["stores"]
+        self.columns = {
+            "store_id": np.array(stores["store_id"], dtype=np.int64),
+            "store__region_id": np.array(stores["store__region_id"], dtype=np.int64),
+            "store__zone_id": np.array(stores["store__zone_id"], dtype=np.int64),
+            "store__code": np.array(stores["store__code"], dtype=str),
+            "store__is_distribution_center": np.array(stores["store__is_distribution_center"], dtype=bool),
+        }
+        self.arrays = {kind: np.load(path / f"{kind}.npy", mmap_mode="r") for kind in FACTS}
+
+    def _masks(self, filters: dict):
+        stores = np.ones(len(self.columns["store_id"]), dtype=bool)
+        families = np.ones(len(self.family_ids), dtype=bool)
+        try:
+            for key, value in filters.items():
+                if key == "family_id":
+                    families &= self.family_ids == int(value)
+                elif key == "store__code":
+                    stores &= self.columns[key] == str(value)
+                elif key == "store__is_distribution_center":
+                    stores &= self.columns[key] == bool(value)
+                elif key in self.columns:
+                    stores &= self.columns[key] == int(value)
+                else:
+                    return None
+        except (TypeError, ValueError):
+            return None
+        return stores, families
+
+    def _block(self, kind: str, season: int, filters: dict):
+        """(celdas sucursal × familia × día del filtro o None, máscara de sucursales, máscara de familias)."""
+        masks = self._masks(filters)
+        if masks is None:
+            return None
+        stores, families = masks
+        i = self.seasons.get(season)
+        if i is None:  # temporada sin datos: los métodos devuelven ceros sin armar el bloque
+            return None, stores, families
+        block = self.arrays[kind][i]
+        # Sin filtro se suma directo sobre el mapeo (sin copiar la temporada entera).
+        if not stores.all():
+            block = block[stores]
+        if not families.all():
+            block = block[:, families]
+        return block, stores, families
+
+    def daily_totals(self, kind: str, season: int, filters: dict) -> list[float] | None:
+        """Total por día (1/oct..31/dic) del filtro."""
+        selected = self._block(kind, season, filters)
+        if selected is None:
+            return None
+        if selected[0] is None:
+            return [0.0] * SEASON_DAYS
+        return _round2(selected[0].sum(axis=(0, 1))).tolist()
+
+    def daily_by_store(self, kind: str, season: int, filters: dict) -> dict | None:
+        """{store_id: [total por día]} de las sucursales del filtro."""
+        selected = self._block(kind, season, filters)
+        if selected is None:
+            return None
+        block, stores, _ = selected
+        store_ids = self.columns["store_id"][stores].tolist()
+        if block is None:
+            return {store_id: [0.0] * SEASON_DAYS for store_id in store_ids}
+        per_store = _round2(block.sum(axis=1))
+        return dict(zip(store_ids, per_store.tolist()))
+
+    def totals(self, kind: str, start: date, end: date, filters: dict, group_by: tuple) -> dict | None:
+        """
+        Totales de start a end (misma temporada) por group_by: "family_id" y/o
+        columnas de sucursal (store_id, store__zone_id, ...). {clave: total}.
+        """
+        selected = self._block(kind, start.year, filters)
+        if selected is None:
+            return None
+        block, stores, families = selected
+        if block is None:
+            matrix = np.zeros((int(stores.sum()), int(families.sum())))
+        else:
+            matrix = block[:, :, max(_day(start), 0):_day(end) + 1].sum(axis=2)  # sucursal × familia
+        store_fields = [field for field in group_by if field != "family_id"]
+        if any(field not in self.columns for field in store_fields):
+            return None
+        if store_fields:
+            keys = list(zip(*(self.columns[field][stores].tolist() for field in store_fields)))
+            groups = sorted(set(keys))
+            index = {key: g for g, key in enumerate(groups)}
+            grouped = np.zeros((len(groups), matrix.shape[1]))
+            np.add.at(grouped, [index[key] for key in keys], matrix)
+        else:
+            groups = [()]
+            grouped = matrix.sum(axis=0, keepdims=True)
+        family_ids = self.family_ids[families].tolist()
+        if "family_id" not in group_by:
+            grouped = grouped.sum(axis=1, keepdims=True)
+            family_ids = [None]
+        grouped = _round2(grouped).tolist()
+        result = {}
+        for g, store_key in enumerate(groups):
+            parts = dict(zip(store_fields, store_key))
+            for f, family_id in enumerate(family_ids):
+                parts["family_id"] = family_id
+                result[tuple(parts[field] for field in group_by)] = grouped[g][f]
+        return result
+
+
+def current() -> SeasonCube | None:
+    """Versión publicada mapeada en este proceso (se remapea si cambió CURRENT); None si no hay."""
+    global _mapped
+    if not enabled():
+        return None
+    root = cube_dir()
+    try:
+        stat = os.stat(root / CURRENT)
+    except FileNotFoundError:
+        return None
+    key = (str(root), stat.st_ino, stat.st_mtime_ns)
+    mapped = _mapped
+    if mapped is not None and mapped.key == key:
+        return mapped
+    with _map_lock:
+        if _mapped is None or _mapped.key != key:
+            try:
+                version = (root / CURRENT).read_text(encoding="utf-8").strip()
+                _mapped = SeasonCube(root / version, key)
+            except (OSError, ValueError, KeyError) as e:
+                print(f"[season_cube] No se pudo abrir el cubo: {e}", flush=True)
+                return None
+        return _mapped
@@ -0,0 +1,185 @@
+"""
+Tabla de acumulados de la temporada (SalesSeasonCumulative): por sucursal,
+familia y día de temporada, las unidades vendidas desde el 1/oct.
+
+Horizonte: la tabla de cada temporada es densa desde el día 0 hasta el último
+día con ventas de esa temporada en todo el dataset (el "horizonte"). Una
+lectura con corte posterior usa el horizonte (después no hay ventas: el
+acumulado no cambia).
+
+Mantenimiento (refresh_cumulative), por temporada que toca el rango:
+- sucursales tocadas: se conservan los días anteriores al primer día tocado
+  y desde ahí se recalcula (acumulado del día anterior + ventas diarias de los
+  hechos) hasta el horizonte nuevo;
+- resto de las sucursales: si el horizonte crece se repite su último valor en
+  los días nuevos; si achica (replace que borra los últimos días), se recorta.
+Una importación diaria escribe solo los días nuevos. El navidad loader lo
+llama al final de cada importación con su huella (navidad_footprint);
+`manage.py rebuild_season_cumulative` rearma todo.
+
+Lectura: cumulative_at() (acumulado al día de corte, agrupado) y
+cumulative_series() (curva acumulada por día). Los filtros son los de las
+vistas sobre SalesRecord (store__region_id, store__zone_id, store__code,
+store__is_distribution_center, family_id). Devuelven None si la temporada no
+tiene acumulados (o si settings.SEASON_CUMULATIVE_ENABLED es False): la vista
+usa la tabla de hechos.
+"""
+from collections import defaultdict
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max, Sum
+
+from core.services.navidad_chunks import bulk_batch_size
+from core.utils.periods import christmas_period
+from sales.models import SalesRecord, SalesSeasonCumulative
+
+
+def enabled() -> bool:
+    return getattr(settings, "SEASON_CUMULATIVE_ENABLED", True)
+
+
+def season_day(dt: date) -> int:
+    return (dt - christmas_period(dt.year)[0]).days
+
+
+def _write(rows: list) -> int:
+    SalesSeasonCumulative.objects.bulk_create(rows, batch_size=bulk_batch_size(SalesSeasonCumulative))
+    return len(rows)
+
+
+def _refresh_season(season: int, store_ids, first_date: date | None) -> int:
+    start, end = christmas_period(season)
+    table = SalesSeasonCumulative.objects.filter(season=season)
+    last_sale = SalesRecord.objects.filter(date__range=(start, end)).aggregate(d=Max("date"))["d"]
+    if last_sale is None:
+        table.delete()
+        return 0
+    horizon = season_day(last_sale)
+    old_horizon = table.aggregate(d=Max("day"))["d"]
+
+    touched = table if store_ids is None else table.filter(store_id__in=store_ids)
+    others = table.none() if store_ids is None else table.exclude(store_id__in=store_ids)
+    # Desde el primer día tocado, pero sin dejar huecos si el horizonte viejo quedó antes.
+    first = season_day(first_date) if store_ids is not None else 0
+    first = min(first, old_horizon + 1 if old_horizon is not None else 0)
+
+    written = 0
+    # Horizonte nuevo: recortar todo lo que quedó después o extender el resto de las sucursales.
+    if old_horizon is not None and horizon < old_horizon:
+        table.filter(day__gt=horizon).delete()
+    elif old_horizon is not None and horizon > old_horizon:
+        written += _write([
+            SalesSeasonCumulative(store_id=store_id, family_id=family_id, season=season, day=day, units_sold=units)
+            for store_id, family_id, units in others.filter(day=old_horizon).values_list("store_id", "family_id", "units_sold")
+            for day in range(old_horizon + 1, horizon + 1)
+        ])
+
+    # Sucursales tocadas: acumulado del día anterior + ventas diarias desde `first`.
+    base = {}
+    if first > 0:
+        base = {
+            (store_id, family_id): units
+            for store_id, family_id, units in touched.filter(day=first - 1).values_list("store_id", "family_id", "units_sold")
+        }
+    touched.filter(day__gte=first).delete()
+
+    facts = SalesRecord.objects.filter(date__range=(start + timedelta(days=first), last_sale))
+    if store_ids is not None:
+        facts = facts.filter(store_id__in=store_ids)
+    daily = defaultdict(dict)
+    for store_id, family_id, dt, units in facts.values_list("store_id", "family_id", "date", "units_sold").order_by():
+        daily[(store_id, family_id)][season_day(dt)] = units
+
+    rows = []
+    for combo in base.keys() | daily.keys():
+        acc = base.get(combo, 0)
+        by_day = daily.get(combo, {})
+        for day in range(first, horizon + 1):
+            acc += by_day.get(day, 0)
+            rows.append(SalesSeasonCumulative(
+                store_id=combo[0], family_id=combo[1], season=season, day=day, units_sold=acc,
+            ))
+    return written + _write(rows)
+
+
+def refresh_cumulative(store_ids=None, start: date | None = None, end: date | None = None) -> int:
+    """
+    Recalcula los acumulados de las sucursales store_ids desde `start` en las
+    temporadas que se cruzan con [start, end]; None = todas / todo. Retorna
+    las filas escritas.
+    """
+    if store_ids is not None and not store_ids:
+        return 0
+    if start is None:
+        seasons = sorted({dt.year for dt in SalesRecord.objects.dates("date", "year")})
+        store_ids = None
+    else:
+        seasons = range(start.year, end.year + 1)
+    written = 0
+    with transaction.atomic():
+        for season in seasons:
+            s, e = christmas_period(season)
+            if start is not None and (end < s or start > e):
+                continue
+            written += _refresh_season(season, store_ids, max(start, s) if start is not None else None)
+    return written
+
+
+def _horizon(season: int) -> int | None:
+    if not enabled():
+        return None
+    return SalesSeasonCumulative.objects.filter(season=season).aggregate(d=Max("day"))["d"]
+
+
+def cumulative_at(cut: date, filters: dict, group_by: tuple) -> dict | None:
+    """
+    Unidades vendidas desde el 1/oct de la temporada de `cut` hasta `cut`
+    inclusive, sumadas por group_by: {clave (tupla de group_by): unidades}.
+    None si la temporada no tiene acumulados.
+    """
+    horizon = _horizon(cut.year)
+    if horizon is None:
+        return None
+    day = season_day(cut)
+    if day < 0:
+        return {}
+    rows = (
+        SalesSeasonCumulative.objects
+        .filter(season=cut.year, day=min(day, horizon), **filters)
+        .values_list(*group_by)
+        .annotate(units=Sum("units_sold"))
+        .order_by()
+    )
+    return {tuple(key): float(units or 0) for *key, units in rows}
+
+
+def cumulative_series(season: int, end: date, filters: dict, group_by: tuple = ()) -> dict | None:
+    """
+    Curva acumulada desde el 1/oct hasta `end` (un valor por día, sin huecos)
+    por group_by: {clave: [unidades]}. Solo aparecen las claves con filas en
+    la tabla. None si la temporada no tiene acumulados.
+    """
+    horizon = _horizon(season)
+    if horizon is None:
+        return None
+    last = season_day(end)
+    rows = (
+        SalesSeasonCumulative.objects
+        .filter(season=season, day__lte=min(last, horizon), **filters)
+        .values_list(*group_by, "day")
+        .annotate(units=Sum("units_sold"))
+        .order_by()
+    )
+    by_key = defaultdict(dict)
+    for *key, day, units in rows:
+        by_key[tuple(key)][day] = float(units or 0)
+    series = {}
+    for key, by_day in by_key.items():
+        values, acc = [], 0.0
+        for day in range(last + 1):
+            acc = by_day.get(day, acc)  # después del horizonte no hay ventas: se repite el último
+            values.append(acc)
+        series[key] = values
+    return series
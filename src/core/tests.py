@@ -1,3 +1,1495 @@
-from django.test import TestCase
+import contextlib
+import io
+import json
+import tempfile
+import threading
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from unittest import mock, skipIf
 
-# Create your tests here.
+import pandas as pd
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import Count, Max
+from django.test import SimpleTestCase, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from openpyxl import Workbook
+
+from core.models import DailyRollup, DatasetCatalog, Family, ImportRun, PartitionDigest, Region, Store, Zone
+from core.services import dataset_catalog, navidad_loader, navidad_prefetch, response_cache, rollups, season_cube
+from core.services.navidad_chunks import ChunkSizer, bulk_batch_size
+from core.services.navidad_keys import count_existing, fetch_existing
+from core.services.navidad_loader import process_navidad_file
+from core.services.navidad_multi import ImportTarget, combined_summary, expand_targets, import_targets
+from core.services.navidad_parse import (
+    parse_chunk,
+    parse_date,
+    parse_date_column,
+    parse_number,
+    parse_number_column,
+    zfill_code,
+    zfill_code_column,
+)
+from core.services.navidad_readers import open_row_source
+from sales.models import SalesRecord, SalesSeasonCumulative
+from stock.models import StockRecord
+
+HEADERS = [
+    "Día", "Región", "Zona", "Sucursal",
+    "SubFamilia", "Unidades Stock Final", "Unidades Vendidas",
+]
+
+# Claves del summary que son mediciones de tiempo (cambian entre corridas).
+TIMING_KEYS = (
+    "lookup_seconds", "write_seconds", "flush_seconds", "header_seconds", "read_seconds",
+    "parse_seconds", "finish_seconds", "elapsed_seconds", "rows_per_sec", "peak_memory_bytes",
+)
+
+
+class LoadDimensionCommandTests(TestCase):
+    def run_command(self, name, data, *args):
+        tmp = tempfile.NamedTemporaryFile("w", suffix=".json", delete=False, encoding="utf-8")
+        self.addCleanup(Path(tmp.name).unlink)
+        with tmp:
+            json.dump(data, tmp)
+        out = io.StringIO()
+        with CaptureQueriesContext(connection) as ctx:
+            call_command(name, tmp.name, *args, stdout=out)
+        return out.getvalue().strip(), len(ctx.captured_queries)
+
+    def stores_json(self, n, zone="Sur"):
+        rows = [{"region": "Patagonia", "zona": zone, "sucursal_id": str(i), "CDR": "FALSE"} for i in range(1, n + 1)]
+        rows.append({"region": "Cuyo", "zona": "Centro", "sucursal_id": "900", "CDR": "TRUE"})
+        return rows
+
+    def families_json(self, n):
+        return [
+            {"origen": f"O{i:03d}", "sector": "Navidad", "familia_std": "Arboles", "subfamilia_std": f"Sub {i}"}
+            for i in range(n)
+        ]
+
+    def reset(self):
+        Store.objects.all().delete()
+        Zone.objects.all().delete()
+        Region.objects.all().delete()
+        Family.objects.all().delete()
+
+    def test_load_stores_queries_do_not_grow_with_json(self):
+        queries = {}
+        for n in (3, 60):
+            self.reset()
+            out, queries[("create", n)] = self.run_command("load_stores", self.stores_json(n))
+            self.assertIn(f"regiones creadas=2, zonas creadas=2, sucursales creadas={n + 1}, sucursales actualizadas=0", out)
+            out, queries[("update", n)] = self.run_command("load_stores", self.stores_json(n, zone="Norte"))
+            self.assertIn(f"regiones creadas=0, zonas creadas=1, sucursales creadas=0, sucursales actualizadas={n}", out)
+        self.assertEqual(queries[("create", 3)], queries[("create", 60)])
+        self.assertEqual(queries[("update", 3)], queries[("update", 60)])
+
+    def test_load_stores_repeated_code_counts_per_row(self):
+        data = self.stores_json(2) + [{"region": "Cuyo", "zona": "Centro", "sucursal_id": "1", "CDR": "TRUE"}]
+        out, _ = self.run_command("load_stores", data)
+        self.assertIn("sucursales creadas=3, sucursales actualizadas=1", out)
+        store = Store.objects.get(code="1")
+        self.assertEqual((store.region.name, store.zone.name, store.name), ("Cuyo", "Centro", "CDR 1"))
+        self.assertTrue(store.is_distribution_center)
+
+    def test_load_families_queries_do_not_grow_with_json(self):
+        queries = {}
+        for n in (3, 80):
+            self.reset()
+            Family.objects.create(origen="OLD", sector="Navidad", familia_std="X", subfamilia_std="Y")
+            out, queries[n] = self.run_command("load_families", self.families_json(n), "--deactivate-missing")
+            self.assertIn(f"created={n}, updated=0, deactivated=1", out)
+        self.assertEqual(queries[3], queries[80])
+
+        data = self.families_json(10) + self.families_json(1)  # la repetida cuenta como actualizada
+        out, _ = self.run_command("load_families", data, "--deactivate-missing")
+        self.assertIn("created=0, updated=11, deactivated=70", out)
+        self.assertEqual(Family.objects.filter(is_active=True).count(), 10)
+
+        out, _ = self.run_command("load_families", self.families_json(20))
+        self.assertIn("created=0, updated=20, deactivated=0", out)
+        self.assertEqual(Family.objects.filter(is_active=True).count(), 20)  # reactivadas
+
+
+class NavidadLoaderTestMixin:
+    """Arma un maestro chico y workbooks de prueba en un directorio temporal."""
+
+    def setUp(self):
+        super().setUp()
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.tmp = Path(tmp.name)
+        # Cache de respuestas apagado salvo en ResponseCacheTests: las comparaciones
+        # entre caminos (rollups, cubo, acumulados) leerían la misma entrada.
+        no_cache = self.settings(RESPONSE_CACHE_ENABLED=False)
+        no_cache.enable()
+        self.addCleanup(no_cache.disable)
+
+        self.region = Region.objects.create(name="Patagonia")
+        self.zone = Zone.objects.create(region=self.region, name="Sur")
+        self.store = Store.objects.create(code="21", name="Sucursal 21", region=self.region, zone=self.zone)
+        self.cdr = Store.objects.create(
+            code="900", name="CDR 900", region=self.region, zone=self.zone, is_distribution_center=True,
+        )
+        self.family = Family.objects.create(origen="ARB", sector="Navidad", familia_std="Arboles", subfamilia_std="Arbol")
+
+    def write_xlsx(self, name, rows):
+        wb = Workbook()
+        ws = wb.active
+        ws.append(["Venta para Curvas"])
+        ws.append(HEADERS)
+        for row in rows:
+            ws.append(row)
+        path = self.tmp / name
+        wb.save(path)
+        return path
+
+    def write_delimited(self, name, rows, delimiter=";", encoding="cp1252", decimal=","):
+        def cell(v):
+            if isinstance(v, date):
+                return v.strftime("%d/%m/%Y")
+            if isinstance(v, float):
+                return str(v).replace(".", decimal)
+            return str(v)
+
+        lines = ["Venta para Curvas", delimiter.join(HEADERS)]
+        lines += [delimiter.join(cell(v) for v in row) for row in rows]
+        path = self.tmp / name
+        path.write_bytes(("\r\n".join(lines) + "\r\n").encode(encoding))
+        return path
+
+    def make_rows(self, days, start=date(2025, 10, 1), sold=3):
+        rows = []
+        for d in range(days):
+            dt = start + timedelta(days=d)
+            rows.append((dt, "Patagonia", "Sur", "021", "ARB", 10 + d, sold))
+            rows.append((dt, "Patagonia", "Sur", "900", "ARB", 100 + d, 0))
+            rows.append((dt, "Patagonia", "Sur", "999", "ARB", 1, 1))  # sucursal inexistente
+        return rows
+
+    def load(self, path, sheet=None, **kwargs):
+        with contextlib.redirect_stdout(io.StringIO()):
+            return process_navidad_file(path, sheet=sheet, **kwargs)
+
+
+class NavidadLoaderWriteModeTests(NavidadLoaderTestMixin, TestCase):
+    def db_state(self):
+        stock = sorted(StockRecord.objects.values_list("store__code", "family_id", "date", "stock_units"))
+        sales = sorted(SalesRecord.objects.values_list("store__code", "family_id", "date", "units_sold"))
+        return stock, sales
+
+    def test_upsert_matches_merge_on_reimport(self):
+        base = self.write_xlsx("base.xlsx", self.make_rows(3))
+        reimport = self.write_xlsx("reimport.xlsx", self.make_rows(4, sold=5))
+
+        results = {}
+        for mode in ("merge", "upsert"):
+            StockRecord.objects.all().delete()
+            SalesRecord.objects.all().delete()
+            self.load(base, write_mode=mode)
+            results[mode] = (self.load(reimport, write_mode=mode), self.db_state())
+
+        merge_summary, merge_state = results["merge"]
+        upsert_summary, upsert_state = results["upsert"]
+        self.assertEqual(merge_state, upsert_state)
+        for key in ("stock_created", "stock_updated", "stock_skipped",
+                    "sales_created", "sales_updated", "sales_skipped"):
+            self.assertEqual(merge_summary[key], upsert_summary[key], key)
+        self.assertEqual(upsert_summary["stock_created"], 2)
+        self.assertEqual(upsert_summary["stock_updated"], 6)
+        self.assertEqual(upsert_summary["sales_created"], 1)
+        self.assertEqual(upsert_summary["sales_updated"], 3)
+
+    def test_upsert_counts_repeated_keys_once(self):
+        rows = self.make_rows(2)
+        repeated = rows[:1] + [rows[0][:5] + (42, 9)] + rows[1:]  # 021 día 1 dos veces en el chunk
+        summary = self.load(self.write_xlsx("dup.xlsx", repeated), write_mode="upsert")
+        self.assertEqual((summary["stock_created"], summary["stock_updated"]), (4, 0))
+        self.assertEqual((summary["sales_created"], summary["sales_updated"]), (2, 0))
+        self.assertEqual(StockRecord.objects.get(store=self.store, date=date(2025, 10, 1)).stock_units, 42)
+
+    @skipIf(connection.vendor != "postgresql", "RETURNING (xmax = 0) solo en PostgreSQL")
+    def test_upsert_does_not_probe_existing_keys_on_postgresql(self):
+        path = self.write_xlsx("base.xlsx", self.make_rows(3))
+        self.load(path, write_mode="upsert")
+        summary = self.load(self.write_xlsx("more.xlsx", self.make_rows(4)), write_mode="upsert")
+        self.assertEqual(summary["queries"]["lookup"], 0)
+        self.assertEqual((summary["stock_created"], summary["stock_updated"]), (2, 6))
+
+    def test_pipelined_workers_match_sequential(self):
+        path = self.write_xlsx("base.xlsx", self.make_rows(5))
+        sequential = self.load(path, chunk_size=4)
+        state = self.db_state()
+        sequential.pop("workers")
+        sequential.pop("data_version")
+        for key in TIMING_KEYS:
+            sequential.pop(key)
+        for workers in (1, 2):
+            with self.subTest(workers=workers):
+                StockRecord.objects.all().delete()
+                SalesRecord.objects.all().delete()
+                pipelined = self.load(path, chunk_size=4, workers=workers)
+                self.assertEqual(self.db_state(), state)
+                self.assertEqual(pipelined.pop("workers"), workers)
+                self.assertGreater(pipelined.pop("data_version"), 0)
+                for key in TIMING_KEYS:
+                    pipelined.pop(key)
+                self.assertEqual(pipelined, sequential)
+
+    def test_invalid_write_mode(self):
+        path = self.write_xlsx("x.xlsx", self.make_rows(1))
+        with self.assertRaises(ValueError):
+            self.load(path, write_mode="replace-all")
+
+
+class NavidadLoaderCheckpointTests(NavidadLoaderTestMixin, TestCase):
+    def db_state(self):
+        stock = sorted(StockRecord.objects.values_list("store__code", "date", "stock_units"))
+        sales = sorted(SalesRecord.objects.values_list("store__code", "date", "units_sold"))
+        return stock, sales
+
+    def test_resume_continues_from_last_committed_chunk(self):
+        path = self.write_xlsx("big.xlsx", self.make_rows(5))  # 15 filas de datos
+        self.load(path, write_mode="upsert")
+        expected = self.db_state()
+        StockRecord.objects.all().delete()
+        SalesRecord.objects.all().delete()
+
+        # Chunks de 4 filas; cada chunk hace 2 upserts (stock + ventas): falla el 3er chunk.
+        real_upsert = navidad_loader._upsert_records
+        calls = []
+
+        def failing_upsert(*args, **kwargs):
+            calls.append(1)
+            if len(calls) == 5:
+                raise RuntimeError("corte simulado")
+            return real_upsert(*args, **kwargs)
+
+        with mock.patch.object(navidad_loader, "_upsert_records", failing_upsert):
+            with self.assertRaises(RuntimeError):
+                self.load(path, chunk_size=4, write_mode="upsert", commit="chunk")
+
+        run = ImportRun.objects.get(commit="chunk")
+        self.assertEqual(run.status, ImportRun.Status.FAILED)
+        self.assertEqual(run.last_committed_row, 8)
+        # Quedaron los 2 chunks commiteados (filas 1-8: días 1-2 completos + 021 y 900 del día 3).
+        self.assertEqual((StockRecord.objects.count(), SalesRecord.objects.count()), (6, 3))
+
+        summary = self.load(path, chunk_size=4, write_mode="upsert", commit="chunk", resume=True)
+        self.assertEqual(summary["rows_skipped_checkpoint"], 8)
+        self.assertEqual(summary["rows"], 7)
+        self.assertEqual(self.db_state(), expected)
+        latest = ImportRun.objects.order_by("-pk").first()
+        self.assertEqual((latest.status, latest.resumed_from, latest.last_committed_row), ("done", 8, 15))
+
+        # La última corrida terminó: no hay nada que retomar, se importa completo.
+        again = self.load(path, chunk_size=4, write_mode="upsert", commit="chunk", resume=True)
+        self.assertEqual(again["rows_skipped_checkpoint"], 0)
+        self.assertEqual(again["rows"], 15)
+
+    def test_resume_requires_chunk_commit(self):
+        path = self.write_xlsx("x.xlsx", self.make_rows(1))
+        with self.assertRaises(ValueError):
+            self.load(path, resume=True)
+
+
+class NavidadMultiImportTests(NavidadLoaderTestMixin, TestCase):
+    def write_sheets(self, name, sheets: dict):
+        wb = Workbook()
+        wb.remove(wb.active)
+        for title, rows in sheets.items():
+            ws = wb.create_sheet(title)
+            ws.append(["Venta para Curvas"])
+            ws.append(HEADERS)
+            for row in rows:
+                ws.append(row)
+        path = self.tmp / name
+        wb.save(path)
+        return path
+
+    def import_many(self, targets, **kwargs):
+        with contextlib.redirect_stdout(io.StringIO()):
+            return import_targets(targets, parse_workers=2, chunk_size=4, **kwargs)
+
+    def test_expand_globs_and_sheets(self):
+        a = self.write_xlsx("a.xlsx", self.make_rows(1))
+        b = self.write_sheets("b.xlsx", {"Norte": self.make_rows(1), "Sur": self.make_rows(1)})
+        self.assertEqual(expand_targets([self.tmp / "*.xlsx", a]), [ImportTarget(a, None), ImportTarget(b, None)])
+        self.assertEqual(
+            expand_targets([self.tmp / "*.xlsx"], all_sheets=True),
+            [ImportTarget(a, "Sheet"), ImportTarget(b, "Norte"), ImportTarget(b, "Sur")],
+        )
+        with self.assertRaises(FileNotFoundError):
+            expand_targets([self.tmp / "nada*.xlsx"])
+
+    def test_parallel_targets_match_sequential_imports(self):
+        first = self.make_rows(3)
+        second = self.make_rows(2, start=date(2025, 11, 1), sold=5)
+        a = self.write_xlsx("a.xlsx", first)
+        b = self.write_sheets("b.xlsx", {"Norte": second, "Sur": second})
+        broken = self.tmp / "roto.csv"
+        broken.write_text("a;b\n1;2\n")
+
+        expected = [self.load(a, chunk_size=4), self.load(b, sheet="Norte", chunk_size=4)]
+        state = sorted(StockRecord.objects.values_list("store_id", "family_id", "date", "stock_units"))
+        StockRecord.objects.all().delete()
+        SalesRecord.objects.all().delete()
+
+        targets = [ImportTarget(a, None), ImportTarget(b, "Norte"), ImportTarget(broken, None)]
+        results = self.import_many(targets)
+        self.assertEqual([r.target for r in results], targets)
+        self.assertIsInstance(results[2].error, ValueError)  # sin encabezados: no corta los demás
+        for result, single in zip(results, expected):
+            self.assertIsNone(result.error)
+            for key in ("rows", "stock_created", "stock_skipped", "sales_created", "sales_skipped"):
+                self.assertEqual(result.summary[key], single[key], key)
+        self.assertEqual(sorted(StockRecord.objects.values_list("store_id", "family_id", "date", "stock_units")), state)
+
+        total = combined_summary(results)
+        self.assertEqual((total["targets"], total["failed"], total["rows"]), (3, 1, 15))
+        self.assertEqual(ImportRun.objects.filter(status="done").count(), 4)  # 2 sueltas + 2 del multi
+
+    def test_last_target_wins_on_shared_keys(self):
+        # El primero es más grande (termina de parsear último) y comparte claves con el segundo.
+        big = self.write_xlsx("big.xlsx", self.make_rows(20, sold=2))
+        small = self.write_xlsx("small.xlsx", self.make_rows(3, sold=9))
+        key = {"store__code": "21", "date": date(2025, 10, 2)}
+        for targets, sold in (([big, small], 9), ([small, big], 2)):
+            for write_mode in ("merge", "upsert"):
+                results = self.import_many([ImportTarget(p, None) for p in targets], write_mode=write_mode)
+                self.assertEqual([r.error for r in results], [None, None])
+                self.assertEqual(SalesRecord.objects.get(**key).units_sold, sold, (targets, write_mode))
+        a, b = (navidad_prefetch.PrefetchedSource(
+            self.tmp / "x", canon_cols=[], data_start_row=0, fmt="csv", reader=None, rows=0, chunks=0,
+            header_seconds=0, codes={"021"}, dates=dates,
+        ) for dates in ((date(2025, 10, 1), date(2025, 10, 3)), (date(2025, 10, 4), date(2025, 10, 9))))
+        self.assertFalse(a.overlaps(b))
+        self.assertTrue(a.overlaps(a))
+
+    def test_sqlite_allows_a_single_writer(self):
+        a = self.write_xlsx("a.xlsx", self.make_rows(1))
+        with self.assertRaises(ValueError):
+            self.import_many([ImportTarget(a, None)], writers=2)
+
+
+class ImportRunLedgerTests(NavidadLoaderTestMixin, TestCase):
+    def test_atomic_run_is_recorded_with_metrics(self):
+        path = self.write_xlsx("base.xlsx", self.make_rows(3))
+        summary = self.load(path, chunk_size=4)
+
+        run = ImportRun.objects.get()
+        self.assertEqual((run.status, run.commit, run.write_mode, run.backend), ("done", "atomic", "merge", "orm"))
+        self.assertEqual(run.file_size, path.stat().st_size)
+        self.assertEqual((run.rows_read, run.last_committed_row), (9, 9))
+        self.assertEqual((run.stock_created, run.sales_created), (6, 3))
+        self.assertEqual((run.stock_skipped, run.sales_skipped), (3, 6))
+        self.assertEqual(run.rows_written, 9)
+        for field in ("header_seconds", "read_seconds", "parse_seconds", "lookup_seconds",
+                      "write_seconds", "elapsed_seconds", "rows_per_sec"):
+            self.assertGreaterEqual(getattr(run, field), 0, field)
+        self.assertEqual(run.rows_per_sec, summary["rows_per_sec"])
+        self.assertGreaterEqual(run.finished_at, run.started_at)
+        if summary["peak_memory_bytes"] is not None:
+            self.assertGreater(run.peak_memory_bytes, 0)
+
+    def test_queries_are_counted_per_phase(self):
+        path = self.write_xlsx("base.xlsx", self.make_rows(3))  # 9 filas: 3 chunks de 4
+        self.load(path)
+        with CaptureQueriesContext(connection) as ctx:
+            summary = self.load(path, chunk_size=4, commit="chunk")
+        queries = summary["queries"]
+        self.assertEqual(queries["dims"], 2)
+        self.assertEqual(queries["checkpoint"], 3)
+        self.assertGreater(queries["lookup"], 0)
+        self.assertGreater(queries["write"], 0)
+        # Todo lo de la importación (savepoints incluidos) queda en alguna fase; solo
+        # el cierre de la corrida en ImportRun va después del conteo.
+        self.assertEqual(sum(queries.values()), len(ctx.captured_queries) - 1)
+        self.assertEqual(ImportRun.objects.filter(commit="chunk").get().summary["queries"], queries)
+
+    def test_failed_atomic_run_survives_rollback(self):
+        path = self.write_xlsx("base.xlsx", self.make_rows(3))
+        with mock.patch.object(navidad_loader, "fetch_existing", side_effect=RuntimeError("corte simulado")):
+            with self.assertRaises(RuntimeError):
+                self.load(path)
+        self.assertEqual(StockRecord.objects.count(), 0)
+        run = ImportRun.objects.get()
+        self.assertEqual((run.status, run.commit), ("failed", "atomic"))
+        self.assertIn("corte simulado", run.error)
+
+    def test_atomic_runs_do_not_count_as_checkpoints(self):
+        path = self.write_xlsx("base.xlsx", self.make_rows(3))
+        with mock.patch.object(navidad_loader, "fetch_existing", side_effect=RuntimeError("corte simulado")):
+            with self.assertRaises(RuntimeError):
+                self.load(path)
+        summary = self.load(path, commit="chunk", resume=True)
+        self.assertEqual(summary["rows_skipped_checkpoint"], 0)
+        self.assertEqual(StockRecord.objects.count(), 6)
+
+
+class NavidadLoaderIncrementalTests(NavidadLoaderTestMixin, TestCase):
+    def db_state(self):
+        stock = sorted(StockRecord.objects.values_list("store__code", "date", "stock_units"))
+        sales = sorted(SalesRecord.objects.values_list("store__code", "date", "units_sold"))
+        return stock, sales
+
+    def test_unchanged_partitions_are_skipped(self):
+        base = self.write_xlsx("dia1.xlsx", self.make_rows(3))
+        first = self.load(base, incremental=True)
+        self.assertEqual((first["partitions_changed"], first["partitions_skipped"]), (9, 0))
+
+        again = self.load(base, incremental=True)
+        # 21 y 900 x 3 días sin cambios; la sucursal 999 no existe y se reprocesa siempre.
+        self.assertEqual((again["partitions_changed"], again["partitions_skipped"]), (3, 6))
+        self.assertEqual(again["rows_unchanged"], 6)
+        self.assertEqual(again["stock_created"] + again["stock_updated"], 0)
+
+        # Día siguiente: archivo acumulado con un día más y un valor corregido del día 2.
+        rows = self.make_rows(4)
+        rows[3] = rows[3][:5] + (77, rows[3][6])  # sucursal 021, día 2
+        nxt = self.write_xlsx("dia2.xlsx", rows)
+        summary = self.load(nxt, incremental=True)
+        self.assertEqual(summary["partitions_skipped"], 5)
+        self.assertEqual(summary["stock_updated"], 1)
+        self.assertEqual(summary["stock_created"], 2)
+        incremental_state = self.db_state()
+
+        StockRecord.objects.all().delete()
+        SalesRecord.objects.all().delete()
+        self.load(base)
+        self.load(nxt)
+        self.assertEqual(incremental_state, self.db_state())
+
+    def test_partitions_are_not_split_across_chunks(self):
+        Family.objects.create(origen="LUZ", sector="Navidad", familia_std="Luces", subfamilia_std="Luces")
+        Family.objects.create(origen="NAV", sector="Navidad", familia_std="Adornos", subfamilia_std="Adornos")
+        rows = [
+            (date(2025, 10, 1) + timedelta(days=d), "Patagonia", "Sur", code, origen, 10 + d, 2)
+            for d in range(3) for code in ("021", "900") for origen in ("ARB", "LUZ", "NAV")
+        ]
+        path = self.write_xlsx("familias.xlsx", rows)  # 6 particiones de 3 filas; chunks de 2 las partirían
+        first = self.load(path, incremental=True, chunk_size=2)
+        self.assertEqual((first["partitions_changed"], first["chunks_written"]), (6, 6))
+
+        again = self.load(path, incremental=True, chunk_size=2)
+        self.assertEqual((again["partitions_changed"], again["partitions_skipped"]), (0, 6))
+        self.assertEqual(again["rows_unchanged"], 18)
+        self.assertEqual(again["stock_created"] + again["stock_updated"], 0)
+
+    def test_partition_with_unresolved_rows_is_retried_after_master_fix(self):
+        path = self.write_xlsx("x.xlsx", self.make_rows(2))
+        self.load(path, incremental=True)
+        self.assertFalse(StockRecord.objects.filter(store__code="999").exists())
+
+        Store.objects.create(code="999", name="Sucursal 999", region=self.region, zone=self.zone)
+        summary = self.load(path, incremental=True)
+        self.assertEqual(summary["partitions_changed"], 2)
+        self.assertEqual(StockRecord.objects.filter(store__code="999").count(), 2)
+
+    def test_full_import_refreshes_digests(self):
+        original = self.write_xlsx("a.xlsx", self.make_rows(2, sold=3))
+        corrected = self.write_xlsx("b.xlsx", self.make_rows(2, sold=5))
+        self.load(original, incremental=True)
+        self.load(corrected)  # no incremental: reescribe todo y actualiza los hashes
+
+        summary = self.load(original, incremental=True)
+        # Solo cambian las ventas de 021; el CDR 900 es igual en ambos archivos.
+        self.assertEqual(summary["partitions_skipped"], 2)
+        self.assertEqual(
+            sorted(SalesRecord.objects.values_list("units_sold", flat=True)), [3, 3]
+        )
+
+
+class NavidadLoaderReplaceTests(NavidadLoaderTestMixin, TestCase):
+    def db_state(self):
+        stock = sorted(StockRecord.objects.values_list("store__code", "family__origen", "date", "stock_units"))
+        sales = sorted(SalesRecord.objects.values_list("store__code", "family__origen", "date", "units_sold"))
+        return stock, sales
+
+    def test_replace_rewrites_date_range_for_file_stores(self):
+        self.load(self.write_xlsx("base.xlsx", self.make_rows(4)))
+        luces = Family.objects.create(origen="LUZ", sector="Navidad", familia_std="Luces", subfamilia_std="Luces")
+        StockRecord.objects.create(store=self.store, family=luces, date=date(2025, 10, 2), stock_units=9)
+        StockRecord.objects.create(store=self.store, family=luces, date=date(2025, 11, 1), stock_units=9)
+
+        # Recarga de días 1-3 sin la fila de 021 del día 2.
+        rows = [r for r in self.make_rows(3, sold=5) if not (r[0] == date(2025, 10, 2) and r[3] == "021")]
+        path = self.write_xlsx("reload.xlsx", rows)
+
+        states = {}
+        for chunk_size in (10_000, 2):  # con chunks de 2 las particiones quedan partidas
+            summary = self.load(path, write_mode="replace", chunk_size=chunk_size)
+            states[chunk_size] = self.db_state()
+        self.assertEqual(states[2], states[10_000])
+        self.assertEqual(summary["stock_updated"], 0)
+        self.assertEqual(summary["stock_created"], 5)
+
+        stock, sales = states[2]
+        # En rango para 021/900: solo lo del archivo (LUZ del día 2 y 021 del día 2 se borraron).
+        self.assertNotIn(("21", "LUZ", date(2025, 10, 2), 9), stock)
+        self.assertFalse([r for r in stock if r[0] == "21" and r[2] == date(2025, 10, 2)])
+        # Fuera de rango: queda como estaba (día 4 del archivo base y LUZ de noviembre).
+        self.assertIn(("21", "ARB", date(2025, 10, 4), 13), stock)
+        self.assertIn(("21", "LUZ", date(2025, 11, 1), 9), stock)
+        self.assertEqual([r[3] for r in sales if r[2] < date(2025, 10, 4)], [5, 5])
+
+    def test_incremental_reloads_partitions_deleted_by_replace(self):
+        original = self.write_xlsx("base.xlsx", self.make_rows(3))
+        self.load(original, incremental=True)
+        before = self.db_state()
+
+        # El replace achica el archivo: 021 y 900 del día 2 se borran.
+        rows = [r for r in self.make_rows(3) if r[0] != date(2025, 10, 2)]
+        summary = self.load(self.write_xlsx("small.xlsx", rows), write_mode="replace")
+        self.assertEqual(summary["stock_deleted"], 6)
+        self.assertFalse(StockRecord.objects.filter(date=date(2025, 10, 2)).exists())
+        self.assertFalse(PartitionDigest.objects.filter(date=date(2025, 10, 2)).exists())
+
+        again = self.load(original, incremental=True)
+        self.assertEqual((again["partitions_changed"], again["partitions_skipped"]), (5, 4))
+        self.assertEqual(self.db_state(), before)
+
+    def test_replace_requires_atomic_commit(self):
+        path = self.write_xlsx("x.xlsx", self.make_rows(1))
+        with self.assertRaises(ValueError):
+            self.load(path, write_mode="replace", commit="chunk")
+        with self.assertRaises(ValueError):
+            self.load(path, write_mode="replace", incremental=True)
+
+
+class DatasetCatalogTests(NavidadLoaderTestMixin, TestCase):
+    def catalog_state(self):
+        return sorted(DatasetCatalog.objects.values_list("kind", "store__code", "year", "min_date", "max_date", "rows"))
+
+    def rebuilt_state(self):
+        with contextlib.redirect_stdout(io.StringIO()):
+            call_command("rebuild_catalog")
+        return self.catalog_state()
+
+    def test_import_keeps_catalog_in_sync(self):
+        summary = self.load(self.write_xlsx("base.xlsx", self.make_rows(3)))
+        self.assertEqual(summary["catalog_entries"], 3)
+        self.assertGreater(summary["queries"]["catalog"], 0)
+        self.assertEqual(self.catalog_state(), [
+            ("sales", "21", 2025, date(2025, 10, 1), date(2025, 10, 3), 3),
+            ("stock", "21", 2025, date(2025, 10, 1), date(2025, 10, 3), 3),
+            ("stock", "900", 2025, date(2025, 10, 1), date(2025, 10, 3), 3),
+        ])
+
+        # Otro año y un replace que achica el rango de 2025 solo para 900.
+        self.load(self.write_xlsx("2024.xlsx", self.make_rows(2, start=date(2024, 12, 30))))
+        rows = [r for r in self.make_rows(3) if not (r[3] == "900" and r[0] == date(2025, 10, 3))]
+        self.load(self.write_xlsx("reload.xlsx", rows), write_mode="replace")
+        state = self.catalog_state()
+        self.assertIn(("stock", "900", 2025, date(2025, 10, 1), date(2025, 10, 2), 2), state)
+        self.assertEqual(state, self.rebuilt_state())
+        self.assertEqual(dataset_catalog.available_years(), [2024, 2025])
+        self.assertEqual(dataset_catalog.latest_year(dataset_catalog.SALES), 2025)
+
+    def test_dry_run_does_not_touch_catalog(self):
+        summary = self.load(self.write_xlsx("base.xlsx", self.make_rows(3)), dry_run=True)
+        self.assertNotIn("catalog_entries", summary)
+        self.assertFalse(DatasetCatalog.objects.exists())
+
+    def test_rebuild_command_drops_deleted_data(self):
+        self.load(self.write_xlsx("base.xlsx", self.make_rows(3)))
+        SalesRecord.objects.all().delete()
+        self.assertEqual([k for k, *_ in self.rebuilt_state()], ["stock", "stock"])
+
+    def test_last_date_falls_back_when_range_cuts_a_year(self):
+        self.load(self.write_xlsx("base.xlsx", self.make_rows(5)))
+        last_date = dataset_catalog.last_date
+        sales, stock = dataset_catalog.SALES, dataset_catalog.STOCK
+        self.assertEqual(last_date(sales, date(2025, 10, 1), date(2025, 12, 31)), date(2025, 10, 5))
+        self.assertEqual(last_date(stock, date(2025, 10, 1), date(2025, 10, 3)), date(2025, 10, 3))
+        self.assertIsNone(last_date(sales, date(2025, 11, 1), date(2025, 12, 31)))
+        self.assertIsNone(last_date(sales, date(2025, 1, 1), date(2025, 12, 31), store__is_distribution_center=True))
+        self.assertEqual(
+            last_date(stock, date(2025, 1, 1), date(2025, 12, 31), store__is_distribution_center=True, store__zone_id=self.zone.id),
+            date(2025, 10, 5),
+        )
+
+    def test_views_read_years_from_catalog(self):
+        self.load(self.write_xlsx("base.xlsx", self.make_rows(3)))
+        self.load(self.write_xlsx("2024.xlsx", self.make_rows(1, start=date(2024, 10, 1))))
+        self.client.force_login(User.objects.create_user("analista"))
+
+        meta = self.client.get(reverse("stock_curves_data")).json()["meta"]
+        self.assertEqual(meta["available_years"], [2024, 2025])
+        meta = self.client.get(reverse("sales:sales_by_zone_data"), {"zone_id": self.zone.id}).json()["meta"]
+        self.assertEqual((meta["pivot_year"], meta["end_date"]), (2025, "2025-10-03"))
+
+        # Borrado por fuera del loader: las vistas ven el catálogo hasta que se reconstruye.
+        StockRecord.objects.filter(date__year=2024).delete()
+        SalesRecord.objects.filter(date__year=2024).delete()
+        meta = self.client.get(reverse("sales:sales_curves_data")).json()["meta"]
+        self.assertEqual(meta["available_years"], [2024, 2025])
+        self.rebuilt_state()
+        meta = self.client.get(reverse("sales:sales_curves_data")).json()["meta"]
+        self.assertEqual(meta["available_years"], [2025])
+
+
+class DailyRollupTests(NavidadLoaderTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        cuyo = Region.objects.create(name="Cuyo")
+        self.centro = Zone.objects.create(region=cuyo, name="Centro")
+        Store.objects.create(code="35", name="Sucursal 35", region=cuyo, zone=self.centro)
+        Family.objects.create(origen="LUZ", sector="Navidad", familia_std="Luces", subfamilia_std="Luces")
+        self.client.force_login(User.objects.create_user("analista"))
+
+    def rows(self, year, days=4, sold=3):
+        rows = []
+        for d in range(days):
+            dt = date(year, 10, 1) + timedelta(days=d)
+            rows += [
+                (dt, "Patagonia", "Sur", "021", "ARB", 10 + d, sold + d),
+                (dt, "Patagonia", "Sur", "021", "LUZ", 5, 1.5),
+                (dt, "Cuyo", "Centro", "035", "ARB", 20 - d, sold * 2),
+                (dt, "Patagonia", "Sur", "900", "ARB", 100 + d, 0),
+            ]
+        return rows
+
+    def rollup_state(self):
+        return sorted(DailyRollup.objects.values_list(
+            "level", "region_id", "zone_id", "is_cdr", "family_id", "date", "units_sold", "stock_units",
+        ))
+
+    def test_incremental_refresh_matches_rebuild(self):
+        self.load(self.write_xlsx("2024.xlsx", self.rows(2024)))
+        summary = self.load(self.write_xlsx("2025.xlsx", self.rows(2025)))
+        self.assertGreater(summary["rollup_rows"], 0)
+        self.assertGreater(summary["queries"]["rollups"], 0)
+        # Reemplazo de un día solo para 021 (sin LUZ) y merge de la otra región en otro día.
+        self.load(
+            self.write_xlsx("021.xlsx", [r for r in self.rows(2025, days=1, sold=7) if r[3] == "021" and r[4] == "ARB"]),
+            write_mode="replace",
+        )
+        self.load(self.write_xlsx("035.xlsx", [r for r in self.rows(2025, days=6) if r[3] == "035"][-1:]))
+        incremental = self.rollup_state()
+        with contextlib.redirect_stdout(io.StringIO()):
+            call_command("rebuild_rollups")
+        self.assertEqual(incremental, self.rollup_state())
+        # El replace borró LUZ de 021 el día 1: no queda en ningún nivel.
+        self.assertFalse(DailyRollup.objects.filter(family__origen="LUZ", date=date(2025, 10, 1)).exists())
+        self.assertEqual(
+            DailyRollup.objects.get(level="all", is_cdr=False, family__origen="ARB", date=date(2025, 10, 1)).units_sold, 13,
+        )
+
+    def test_overlapping_refreshes_leave_one_row_per_cell(self):
+        self.load(self.write_xlsx("2025.xlsx", self.rows(2025)))
+        sur = Store.objects.filter(zone=self.zone).values_list("pk", flat=True)
+        centro = Store.objects.filter(zone=self.centro).values_list("pk", flat=True)
+        write = rollups._write
+        nested = []
+
+        def interleaved(level, cells, scope):
+            # El segundo refresco corre entre que el primero sumó y escribió el nivel all.
+            if level == DailyRollup.Level.ALL and not nested:
+                nested.append(level)
+                rollups.refresh_rollups(list(centro), date(2025, 10, 2), date(2025, 10, 4))
+            return write(level, cells, scope)
+
+        with mock.patch.object(rollups, "_write", interleaved):
+            rollups.refresh_rollups(list(sur), date(2025, 10, 1), date(2025, 10, 3))
+        self.assertTrue(nested)
+        per_day = DailyRollup.objects.filter(level="all").values("is_cdr", "family_id", "date").annotate(n=Count("pk"))
+        self.assertEqual({row["n"] for row in per_day}, {1})
+        self.assertEqual(len(per_day), 12)  # 4 días x (ARB, LUZ, ARB CDR)
+        refreshed = self.rollup_state()
+        with contextlib.redirect_stdout(io.StringIO()):
+            call_command("rebuild_rollups")
+        self.assertEqual(refreshed, self.rollup_state())
+
+    def test_load_stores_moves_rebuild_area_rollups_and_cube(self):
+        overrides = self.settings(SEASON_CUBE_ENABLED=True, SEASON_CUBE_DIR=self.tmp / "cube")
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        self.load(self.write_xlsx("2025.xlsx", self.rows(2025)))
+        # 035 pasa de Cuyo/Centro a Patagonia/Sur y 900 deja de ser CDR.
+        stores = [
+            {"region": "Patagonia", "zona": "Sur", "sucursal_id": "21", "CDR": "FALSE"},
+            {"region": "Patagonia", "zona": "Sur", "sucursal_id": "35", "CDR": "FALSE"},
+            {"region": "Patagonia", "zona": "Sur", "sucursal_id": "900", "CDR": "FALSE"},
+        ]
+        path = self.tmp / "stores.json"
+        path.write_text(json.dumps(stores), encoding="utf-8")
+        out = io.StringIO()
+        call_command("load_stores", str(path), stdout=out)
+        self.assertIn("cambios de área/CDR=2", out.getvalue())
+
+        moved = self.rollup_state()
+        self.assertFalse(DailyRollup.objects.filter(zone=self.centro).exists())
+        with contextlib.redirect_stdout(io.StringIO()):
+            call_command("rebuild_rollups")
+        self.assertEqual(moved, self.rollup_state())
+
+        cube = season_cube.current()
+        sur = cube.daily_totals(season_cube.SALES, 2025, {"store__zone_id": self.zone.id})
+        self.assertEqual(sur[0], 3 + 1.5 + 6)
+        self.assertEqual(cube.daily_totals(season_cube.STOCK, 2025, {"store__is_distribution_center": True}), [0.0] * 92)
+
+    def test_endpoints_match_raw_tables(self):
+        self.load(self.write_xlsx("2024.xlsx", self.rows(2024, days=5)))
+        self.load(self.write_xlsx("2025.xlsx", self.rows(2025)))
+        region, zone = str(self.region.id), str(self.zone.id)
+        family = str(Family.objects.get(origen="LUZ").id)
+        scopes = [{}, {"region_id": region}, {"zone_id": zone}, {"region_id": region, "zone_id": str(self.centro.id)},
+                  {"store_code": "21"}, {"family_id": family}, {"zone_id": zone, "family_id": family}]
+        requests = [("sales:sales_curves_data", dict(scope, year=2025)) for scope in scopes]
+        requests += [
+            ("stock_curves_data", dict(scope, source=source)) for scope in scopes for source in ("all", "stores", "cdr")
+        ]
+        requests += [
+            ("sales:status_overview_data", {"region_id": region}),
+            ("sales:status_overview_data", {"region_id": region, "zone_id": zone}),
+        ]
+
+        def responses():
+            return [self.client.get(reverse(name), params).json() for name, params in requests]
+
+        with self.settings(ROLLUPS_ENABLED=False):
+            raw = responses()
+        with self.settings(ROLLUPS_ENABLED=True):
+            rolled = responses()
+        for (name, params), expected, actual in zip(requests, raw, rolled):
+            self.assertEqual(actual, expected, (name, params))
+        self.assertTrue(any(r.get("datasets") for r in raw))
+
+    def test_area_scopes_do_not_read_fact_tables(self):
+        self.load(self.write_xlsx("2025.xlsx", self.rows(2025)))
+        for name, params in (
+            ("sales:sales_curves_data", {"zone_id": self.zone.id}),
+            ("stock_curves_data", {"region_id": self.region.id, "source": "cdr"}),
+            ("sales:status_overview_data", {"region_id": self.region.id}),
+        ):
+            with CaptureQueriesContext(connection) as ctx:
+                self.assertEqual(self.client.get(reverse(name), params).status_code, 200)
+            sql = " ".join(q["sql"] for q in ctx.captured_queries)
+            self.assertNotIn("sales_salesrecord", sql, name)
+            self.assertNotIn("stock_stockrecord", sql, name)
+
+
+class SalesSeasonCumulativeTests(NavidadLoaderTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        cuyo = Region.objects.create(name="Cuyo")
+        self.centro = Zone.objects.create(region=cuyo, name="Centro")
+        Store.objects.create(code="35", name="Sucursal 35", region=cuyo, zone=self.centro)
+        Family.objects.create(origen="LUZ", sector="Navidad", familia_std="Luces", subfamilia_std="Luces")
+        self.client.force_login(User.objects.create_user("analista"))
+
+    def rows(self, year, days=4, sold=3, first=0):
+        rows = []
+        for d in range(first, first + days):
+            dt = date(year, 10, 1) + timedelta(days=d)
+            rows += [
+                (dt, "Patagonia", "Sur", "021", "ARB", 10, sold + d),
+                (dt, "Patagonia", "Sur", "021", "LUZ", 5, 1.5),
+                (dt, "Cuyo", "Centro", "035", "ARB", 20, sold * 2),
+            ]
+        return rows
+
+    def table_state(self):
+        return sorted(SalesSeasonCumulative.objects.values_list("store_id", "family_id", "season", "day", "units_sold"))
+
+    def test_incremental_refresh_matches_rebuild(self):
+        self.load(self.write_xlsx("2024.xlsx", self.rows(2024)))
+        summary = self.load(self.write_xlsx("2025.xlsx", self.rows(2025)))
+        self.assertGreater(summary["cumulative_rows"], 0)
+        # Reemplazo de un día de 021 (sin LUZ), día nuevo solo para 035 (crece el horizonte)
+        # y días viejos de 021 re-importados con otros valores.
+        self.load(
+            self.write_xlsx("021.xlsx", [r for r in self.rows(2025, days=1, sold=7) if r[3] == "021" and r[4] == "ARB"]),
+            write_mode="replace",
+        )
+        self.load(self.write_xlsx("035.xlsx", [r for r in self.rows(2025, days=3, first=6) if r[3] == "035"]))
+        self.load(self.write_xlsx("021b.xlsx", [r for r in self.rows(2025, days=2, sold=9, first=2) if r[3] == "021"]))
+        incremental = self.table_state()
+        with contextlib.redirect_stdout(io.StringIO()):
+            call_command("rebuild_season_cumulative")
+        self.assertEqual(incremental, self.table_state())
+        # 021 no tiene ventas después del día 3: su acumulado se repite hasta el horizonte (día 8).
+        arb = SalesSeasonCumulative.objects.filter(store=self.store, family=self.family, season=2025)
+        self.assertEqual(arb.aggregate(d=Max("day"))["d"], 8)
+        self.assertEqual(arb.get(day=8).units_sold, arb.get(day=3).units_sold)
+        self.assertEqual(arb.get(day=3).units_sold, 7 + 4 + 11 + 12)
+
+    def test_endpoints_match_raw_tables(self):
+        self.load(self.write_xlsx("2024.xlsx", self.rows(2024, days=6)))
+        self.load(self.write_xlsx("2025.xlsx", self.rows(2025)))
+        self.load(self.write_xlsx("035.xlsx", [r for r in self.rows(2025, days=2, first=4) if r[3] == "035"]))
+        region, zone = str(self.region.id), str(self.zone.id)
+        family = str(Family.objects.get(origen="LUZ").id)
+        requests = [
+            ("sales:sales_curves_data", {"store_code": "21", "year": 2025}),
+            ("sales:sales_curves_data", {"store_code": "21", "family_id": family, "year": 2024}),
+            ("sales:sales_by_zone_data", {"zone_id": zone}),
+            ("sales:sales_by_zone_data", {"zone_id": zone, "family_id": family}),
+            ("sales:status_overview_data", {"region_id": region, "zone_id": zone}),
+            ("sales:status_overview_data", {"region_id": str(self.centro.region_id), "zone_id": str(self.centro.id)}),
+        ]
+        for scope in ({}, {"zone_id": zone}, {"store_code": "35"}):
+            for source in ("all", "stores"):
+                requests.append(("insights:overview_data", dict(scope, source=source)))
+                requests.append(("insights:overview_data", dict(scope, source=source, cut_date="2025-10-02")))
+
+        def responses():
+            return [self.client.get(reverse(name), params).json() for name, params in requests]
+
+        with self.settings(SEASON_CUMULATIVE_ENABLED=False):
+            raw = responses()
+        with self.settings(SEASON_CUMULATIVE_ENABLED=True):
+            cumulative = responses()
+        for (name, params), expected, actual in zip(requests, raw, cumulative):
+            self.assertEqual(actual, expected, (name, params))
+        self.assertTrue(any(r.get("datasets") for r in raw))
+
+    def test_season_to_date_does_not_read_sales_facts(self):
+        self.load(self.write_xlsx("2024.xlsx", self.rows(2024)))
+        self.load(self.write_xlsx("2025.xlsx", self.rows(2025)))
+        for name, params in (
+            ("sales:sales_curves_data", {"store_code": "21"}),
+            ("sales:sales_by_zone_data", {"zone_id": self.zone.id}),
+            ("sales:status_overview_data", {"region_id": self.region.id, "zone_id": self.zone.id}),
+        ):
+            with CaptureQueriesContext(connection) as ctx:
+                self.assertEqual(self.client.get(reverse(name), params).status_code, 200)
+            sql = " ".join(q["sql"] for q in ctx.captured_queries)
+            self.assertNotIn("sales_salesrecord", sql, name)
+
+
+class SeasonCubeTests(NavidadLoaderTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        cuyo = Region.objects.create(name="Cuyo")
+        self.centro = Zone.objects.create(region=cuyo, name="Centro")
+        Store.objects.create(code="35", name="Sucursal 35", region=cuyo, zone=self.centro)
+        Family.objects.create(origen="LUZ", sector="Navidad", familia_std="Luces", subfamilia_std="Luces")
+        self.client.force_login(User.objects.create_user("analista"))
+        overrides = self.settings(SEASON_CUBE_ENABLED=True, SEASON_CUBE_DIR=self.tmp / "cube")
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+
+    def rows(self, year, days=4, sold=3):
+        rows = []
+        for d in range(days):
+            dt = date(year, 10, 1) + timedelta(days=d)
+            rows += [
+                (dt, "Patagonia", "Sur", "021", "ARB", 10 + d, sold + d),
+                (dt, "Patagonia", "Sur", "021", "LUZ", 5, 1.5),
+                (dt, "Cuyo", "Centro", "035", "ARB", 20 - d, sold * 2),
+                (dt, "Patagonia", "Sur", "900", "ARB", 100 + d, 0),
+            ]
+        return rows
+
+    def test_loader_publishes_versions_and_readers_remap(self):
+        first = self.load(self.write_xlsx("2024.xlsx", self.rows(2024)))["cube_version"]
+        cube = season_cube.current()
+        self.assertEqual(cube.version, first)
+        self.assertIs(season_cube.current(), cube)
+        self.assertEqual(cube.daily_totals(season_cube.SALES, 2024, {"store__code": "21"})[:4], [4.5, 5.5, 6.5, 7.5])
+
+        self.load(self.write_xlsx("2025.xlsx", self.rows(2025)))
+        last = self.load(self.write_xlsx("2025b.xlsx", self.rows(2025, days=2, sold=5)))["cube_version"]
+        cube = season_cube.current()
+        self.assertEqual(cube.version, last)
+        self.assertEqual(
+            cube.totals(season_cube.STOCK, date(2025, 10, 2), date(2025, 10, 2), {}, ("store__zone_id",)),
+            {(self.zone.id,): 117.0, (self.centro.id,): 19.0},
+        )
+        # Quedan la versión publicada y la anterior.
+        versions = [p.name for p in (self.tmp / "cube").iterdir() if p.is_dir()]
+        self.assertEqual(len(versions), 2)
+        self.assertIn(last, versions)
+        self.assertNotIn(first, versions)
+
+    def test_import_rereads_only_its_seasons(self):
+        self.load(self.write_xlsx("2024.xlsx", self.rows(2024)))
+        self.load(self.write_xlsx("2025.xlsx", self.rows(2025)))
+        # Cambios por fuera del loader (y una sucursal nueva) no se ven en la temporada copiada.
+        SalesRecord.objects.filter(store__code="21", date__year=2024).update(units_sold=50)
+        Store.objects.create(code="40", name="Sucursal 40", region=self.region, zone=self.zone)
+        with CaptureQueriesContext(connection) as ctx:
+            summary = self.load(self.write_xlsx("2025b.xlsx", self.rows(2025, days=2, sold=5)))
+        self.assertEqual(summary["seasons"], [2025])
+        publish = [q["sql"] for q in ctx.captured_queries if "sales_salesrecord" in q["sql"]]
+        self.assertFalse(any("2024-10-01" in sql for sql in publish))
+        cube = season_cube.current()
+        self.assertEqual(cube.daily_totals(season_cube.SALES, 2024, {"store__code": "21"})[:2], [4.5, 5.5])
+        self.assertEqual(cube.daily_totals(season_cube.SALES, 2025, {"store__code": "21"})[:2], [6.5, 7.5])
+        self.assertEqual(cube.daily_totals(season_cube.SALES, 2024, {"store__code": "40"}), [0.0] * 92)
+        # Sin temporada, ceros sin armar el bloque.
+        self.assertEqual(cube.daily_totals(season_cube.STOCK, 2019, {}), [0.0] * 92)
+        self.assertEqual(
+            cube.totals(season_cube.SALES, date(2019, 10, 1), date(2019, 10, 5), {"store__zone_id": self.centro.id},
+                        ("store__zone_id",)),
+            {(self.centro.id,): 0.0},
+        )
+        with contextlib.redirect_stdout(io.StringIO()):
+            call_command("build_season_cube")
+        cube = season_cube.current()
+        self.assertEqual(cube.daily_totals(season_cube.SALES, 2024, {"store__code": "21"})[:2], [100.0, 100.0])
+
+    def test_failed_publish_is_reread_by_next_build(self):
+        self.load(self.write_xlsx("2024.xlsx", self.rows(2024)))
+        self.load(self.write_xlsx("2025.xlsx", self.rows(2025)))
+        with mock.patch.object(season_cube, "_add_facts", side_effect=OSError("disco lleno")), \
+                self.assertLogs("core.services.season_cube", "ERROR"):
+            summary = self.load(self.write_xlsx("2024b.xlsx", self.rows(2024, days=2, sold=5)))
+        self.assertIsNone(summary["cube_version"])
+        self.assertEqual(json.loads((self.tmp / "cube" / season_cube.DIRTY).read_text()), [2024])
+        cube = season_cube.current()
+        self.assertEqual(cube.daily_totals(season_cube.SALES, 2024, {"store__code": "21"})[:2], [4.5, 5.5])
+
+        # Una importación de otra temporada vuelve a leer también la que quedó marcada.
+        self.load(self.write_xlsx("2025b.xlsx", self.rows(2025, days=1, sold=5)))
+        cube = season_cube.current()
+        self.assertEqual(cube.daily_totals(season_cube.SALES, 2024, {"store__code": "21"})[:2], [6.5, 7.5])
+        self.assertFalse((self.tmp / "cube" / season_cube.DIRTY).exists())
+
+    def test_facts_are_streamed_in_batches(self):
+        self.load(self.write_xlsx("2025.xlsx", self.rows(2025)))
+        expected = season_cube.current().daily_totals(season_cube.STOCK, 2025, {})
+        with mock.patch.object(season_cube, "FETCH_ROWS", 3):
+            season_cube.build_cube()
+        self.assertEqual(season_cube.current().daily_totals(season_cube.STOCK, 2025, {}), expected)
+
+    @skipIf(season_cube.fcntl is None, "lock de archivo solo con fcntl")
+    def test_builds_are_serialized_across_processes(self):
+        root = self.tmp / "cube"
+        root.mkdir()
+        entered = threading.Event()
+
+        def build():
+            with season_cube._publish_lock(root):
+                entered.set()
+
+        with open(root / season_cube.LOCK_FILE, "ab") as held:
+            season_cube.fcntl.flock(held, season_cube.fcntl.LOCK_EX)  # otro proceso armando el cubo
+            thread = threading.Thread(target=build)
+            thread.start()
+            self.assertFalse(entered.wait(0.2))
+        thread.join(5)
+        self.assertTrue(entered.is_set())
+
+    def test_dry_run_and_disabled_cube_publish_nothing(self):
+        self.load(self.write_xlsx("2025.xlsx", self.rows(2025)), dry_run=True)
+        self.assertIsNone(season_cube.current())
+        with self.settings(SEASON_CUBE_ENABLED=False):
+            self.assertIsNone(self.load(self.write_xlsx("2025.xlsx", self.rows(2025)))["cube_version"])
+        self.assertIsNone(season_cube.current())
+
+    def test_endpoints_match_sql(self):
+        self.load(self.write_xlsx("2024.xlsx", self.rows(2024, days=6)))
+        self.load(self.write_xlsx("2025.xlsx", self.rows(2025)))
+        region, zone = str(self.region.id), str(self.zone.id)
+        family = str(Family.objects.get(origen="LUZ").id)
+        scopes = [{}, {"region_id": region}, {"zone_id": zone}, {"store_code": "21"}, {"family_id": family}]
+        requests = [("sales:sales_curves_data", dict(scope, year=year)) for scope in scopes for year in (2024, 2025)]
+        for scope in scopes:
+            for source in ("all", "stores", "cdr"):
+                requests.append(("stock_curves_data", dict(scope, source=source)))
+                requests.append(("insights:overview_data", dict(scope, source=source)))
+                requests.append(("insights:overview_data", dict(scope, source=source, cut_date="2025-10-02")))
+        requests += [
+            ("sales:sales_by_zone_data", {"zone_id": zone}),
+            ("sales:sales_by_zone_data", {"zone_id": zone, "family_id": family}),
+            ("sales:status_overview_data", {"region_id": region}),
+            ("sales:status_overview_data", {"region_id": region, "zone_id": zone}),
+        ]
+
+        def responses():
+            return [self.client.get(reverse(name), params).json() for name, params in requests]
+
+        with self.settings(SEASON_CUBE_ENABLED=False, ROLLUPS_ENABLED=False, SEASON_CUMULATIVE_ENABLED=False):
+            raw = responses()
+        cube = responses()
+        for (name, params), expected, actual in zip(requests, raw, cube):
+            self.assertEqual(actual, expected, (name, params))
+        self.assertTrue(any(r.get("datasets") for r in raw))
+
+    def test_curves_do_not_query_facts_or_derived_tables(self):
+        self.load(self.write_xlsx("2025.xlsx", self.rows(2025)))
+        for name, params in (
+            ("sales:sales_curves_data", {"store_code": "21"}),
+            ("stock_curves_data", {"zone_id": self.zone.id, "source": "cdr"}),
+            ("sales:status_overview_data", {"region_id": self.region.id}),
+        ):
+            with CaptureQueriesContext(connection) as ctx:
+                self.assertEqual(self.client.get(reverse(name), params).status_code, 200)
+            sql = " ".join(q["sql"] for q in ctx.captured_queries)
+            for table in ("sales_salesrecord", "stock_stockrecord", "core_dailyrollup", "sales_salesseasoncumulative"):
+                self.assertNotIn(table, sql, name)
+
+
+class ResponseCacheTests(NavidadLoaderTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        overrides = self.settings(RESPONSE_CACHE_ENABLED=True)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        # La base se revierte entre tests y la versión se repite: sin esto quedarían
+        # entradas de otro test con la misma clave.
+        caches[response_cache.ALIAS].clear()
+        response_cache.bump_version()
+        response_cache.reset_stats()
+        self.client.force_login(User.objects.create_user("analista"))
+
+    def get(self, name, params):
+        response = self.client.get(reverse(name), params)
+        self.assertEqual(response.status_code, 200)
+        return response["X-Cache"], response.json()
+
+    def test_hits_by_normalized_scope_until_an_import(self):
+        self.load(self.write_xlsx("2025.xlsx", self.make_rows(3)))
+        zone = self.zone.id
+        state, first = self.get("sales:sales_curves_data", {"store_code": "21", "year": 2025})
+        self.assertEqual(state, "miss")
+        # Con sucursal, región/zona (y vacíos) no cambian la clave.
+        state, again = self.get("sales:sales_curves_data", {"store_code": "21", "zone_id": zone, "family_id": ""})
+        self.assertEqual((state, again), ("hit", first))
+        self.assertEqual(self.get("sales:sales_curves_data", {"zone_id": zone})[0], "miss")
+        self.assertEqual(self.get("stock_curves_data", {"store_code": "21", "source": "all"})[0], "miss")
+        self.assertEqual(self.get("stock_curves_data", {"store_code": "21"})[0], "hit")
+
+        version = response_cache.current_version()
+        summary = self.load(self.write_xlsx("2025b.xlsx", self.make_rows(5, sold=4)))
+        self.assertEqual(summary["data_version"], version + 1)
+        state, fresh = self.get("sales:sales_curves_data", {"store_code": "21", "year": 2025})
+        self.assertEqual(state, "miss")
+        self.assertNotEqual(fresh, first)
+
+        stats = self.client.get(reverse("core:response_cache_stats")).json()
+        self.assertEqual(stats["views"]["curves_data"], {"hits": 1, "misses": 3, "hit_rate": 0.25})
+        self.assertEqual((stats["hits"], stats["misses"]), (2, 4))
+        self.assertEqual(stats["data_version"], version + 1)
+
+    def test_bump_version_turns_hits_into_misses(self):
+        self.load(self.write_xlsx("2025.xlsx", self.make_rows(2)))
+        params = {"zone_id": self.zone.id, "source": "stores"}
+        self.assertEqual(self.get("stock_curves_data", params)[0], "miss")
+        self.assertEqual(self.get("stock_curves_data", params)[0], "hit")
+        response_cache.bump_version()
+        self.assertEqual(self.get("stock_curves_data", params)[0], "miss")
+        self.assertEqual(self.get("stock_curves_data", params)[0], "hit")
+
+    def test_meta_scope_comes_from_the_normalized_scope(self):
+        self.load(self.write_xlsx("2025.xlsx", self.make_rows(2)))
+        expected = {"region_id": str(self.region.id), "zone_id": str(self.zone.id), "store_code": "21", "family_id": None}
+        state, first = self.get("sales:sales_curves_data", {"store_code": "21", "zone_id": "999"})
+        self.assertEqual((state, first["meta"]["scope"]), ("miss", expected))
+        state, again = self.get("sales:sales_curves_data", {"store_code": " 21 ", "region_id": "5"})
+        self.assertEqual((state, again["meta"]["scope"]), ("hit", expected))
+
+    def test_dry_run_keeps_the_version(self):
+        version = response_cache.current_version()
+        self.load(self.write_xlsx("2025.xlsx", self.make_rows(2)), dry_run=True)
+        self.assertEqual(response_cache.current_version(), version)
+        with contextlib.redirect_stdout(io.StringIO()):
+            call_command("rebuild_rollups")
+        self.assertEqual(response_cache.current_version(), version + 1)
+
+    def test_file_backend(self):
+        location = self.tmp / "responses"
+        with self.settings(CACHES={
+            "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+            response_cache.ALIAS: {
+                "BACKEND": "django.core.cache.backends.filebased.FileBasedCache", "LOCATION": str(location),
+            },
+        }):
+            self.load(self.write_xlsx("2025.xlsx", self.make_rows(2)))
+            params = {"region_id": self.region.id}
+            self.assertEqual(self.get("sales:status_overview_data", params)[0], "miss")
+            self.assertEqual(self.get("sales:status_overview_data", params)[0], "hit")
+            # Solo la respuesta: los contadores no se escriben en el backend.
+            self.assertEqual(len([p for p in location.iterdir() if p.suffix == ".djcache"]), 1)
+
+
+class NavidadLoaderDimensionTests(NavidadLoaderTestMixin, TestCase):
+    def count_queries(self, path, **kwargs):
+        with CaptureQueriesContext(connection) as ctx:
+            summary = self.load(path, **kwargs)
+        return len(ctx.captured_queries), summary
+
+    def test_strict_area_queries_do_not_grow_with_rows(self):
+        short = self.write_xlsx("short.xlsx", self.make_rows(2))
+        long = self.write_xlsx("long.xlsx", self.make_rows(10))
+        counts = {}
+        for name, path in (("short", short), ("long", long)):
+            StockRecord.objects.all().delete()
+            SalesRecord.objects.all().delete()
+            SalesSeasonCumulative.objects.all().delete()
+            counts[name], summary = self.count_queries(path, strict_area=True, write_mode="upsert", chunk_size=100)
+        self.assertEqual(counts["short"], counts["long"])
+        self.assertEqual(summary["dim_store_hits"], 20)
+        self.assertEqual(summary["dim_store_misses"], 10)
+        self.assertEqual(summary["dim_family_hits"], 20)
+        self.assertEqual(StockRecord.objects.count(), 20)
+
+    def test_strict_area_skips_rows_from_other_zone(self):
+        rows = [(d, r, "Norte" if c == "021" else z, c, f, s, v) for d, r, z, c, f, s, v in self.make_rows(2)]
+        path = self.write_xlsx("zona.xlsx", rows)
+        summary = self.load(path, strict_area=True)
+        self.assertEqual(summary["stock_skipped"], 4)  # 2 de la 021 por zona + 2 de la 999
+        self.assertEqual(set(StockRecord.objects.values_list("store__code", flat=True)), {"900"})
+
+
+class NavidadLoaderKeyLookupTests(NavidadLoaderTestMixin, TestCase):
+    def test_merge_fetches_only_existing_chunk_keys(self):
+        self.load(self.write_xlsx("base.xlsx", self.make_rows(3)))
+        summary = self.load(self.write_xlsx("reimport.xlsx", self.make_rows(4, sold=5)))
+        # stock: 4 días × (021, 900); sales: 4 días de la 021 (el CDR no vende)
+        self.assertEqual(summary["lookup_keys"], 12)
+        self.assertEqual(summary["lookup_rows_fetched"], 9)
+        self.assertEqual(summary["stock_updated"], 6)
+        self.assertEqual(summary["sales_updated"], 3)
+
+    def test_exact_lookup_with_and_without_json(self):
+        self.load(self.write_xlsx("base.xlsx", self.make_rows(3)))
+        missing = (self.store.id, self.family.id, date(2030, 1, 1))
+        keys = set(StockRecord.objects.values_list("store_id", "family_id", "date")) | {missing}
+
+        with CaptureQueriesContext(connection) as ctx:
+            found = fetch_existing(StockRecord, keys)
+        self.assertEqual(set(found), keys - {missing})
+        self.assertEqual(len(ctx.captured_queries), 1)
+
+        # Sin JSON: VALUES en tandas que respetan el límite de parámetros (2 claves por query).
+        with mock.patch.object(connection.features, "supports_json_field", False), \
+                mock.patch.object(connection.features, "max_query_params", 6):
+            with CaptureQueriesContext(connection) as ctx:
+                found = fetch_existing(StockRecord, keys)
+            self.assertEqual(count_existing(StockRecord, keys), 6)
+        self.assertEqual(set(found), keys - {missing})
+        self.assertEqual(len(ctx.captured_queries), 4)
+
+
+class NavidadLoaderDryRunTests(NavidadLoaderTestMixin, TestCase):
+    def rows_with_rejects(self):
+        rows = self.make_rows(3)
+        rows.insert(1, (date(2025, 10, 1), "Patagonia", "Sur", "021", "XYZ", 5, 1))  # subfamilia sin familia
+        rows.append((None, "Patagonia", "Sur", "021", "ARB", 5, 1))  # sin fecha: la descarta el parseo
+        return rows
+
+    def test_dry_run_writes_nothing_and_reports_unmatched(self):
+        path = self.write_xlsx("dry.xlsx", self.rows_with_rejects())
+        with CaptureQueriesContext(connection) as ctx:
+            summary = self.load(path, dry_run=True, commit="chunk", chunk_size=4)
+        self.assertFalse(any(
+            q["sql"].lstrip().upper().startswith(("INSERT", "UPDATE", "DELETE")) for q in ctx.captured_queries
+        ))
+        self.assertEqual(StockRecord.objects.count(), 0)
+        self.assertEqual(SalesRecord.objects.count(), 0)
+        self.assertEqual(ImportRun.objects.count(), 0)
+
+        self.assertTrue(summary["dry_run"])
+        self.assertEqual(summary["stock_valid"], 6)  # 3 días × (021, 900)
+        self.assertEqual(summary["sales_valid"], 3)
+        self.assertEqual(summary["rejected_rows"], 4)
+        self.assertEqual(summary["rejected_by_reason"], {"sucursal_inexistente": 3, "subfamilia_sin_familia_activa": 1})
+        self.assertEqual(summary["rows_unparsed"], 1)
+        self.assertEqual(summary["unmatched_codes"], [{"code": "999", "rows": 3}])
+        self.assertEqual(summary["unmatched_subfamilies"], [{"subfam": "XYZ", "rows": 1}])
+
+        # Mismos contadores de validación que una importación real.
+        real = self.load(path)
+        self.assertEqual(summary["stock_skipped"], real["stock_skipped"])
+        self.assertEqual(summary["sales_skipped"], real["sales_skipped"])
+        self.assertEqual(StockRecord.objects.count(), summary["stock_valid"])
+
+    def test_rejects_csv_has_file_row_numbers(self):
+        path = self.write_xlsx("dry.xlsx", self.rows_with_rejects())
+        out = self.tmp / "rechazos.csv"
+        summary = self.load(path, dry_run=True, rejects_csv=out, chunk_size=4)
+        self.assertEqual(summary["rejects_csv"], str(out))
+
+        lines = out.read_text(encoding="utf-8-sig").splitlines()
+        self.assertEqual(lines[0].split(";")[:3], ["fila", "motivo", "fecha"])
+        rejected = [line.split(";") for line in lines[1:]]
+        # Fila 1 del archivo es el título, 2 los encabezados: la primera fila de datos es la 3.
+        self.assertEqual(
+            [(r[0], r[1], r[3], r[4]) for r in rejected],
+            [
+                ("4", "subfamilia_sin_familia_activa", "21", "XYZ"),
+                ("6", "sucursal_inexistente", "999", "ARB"),
+                ("9", "sucursal_inexistente", "999", "ARB"),
+                ("12", "sucursal_inexistente", "999", "ARB"),
+            ],
+        )
+
+    def test_dry_run_rejects_incompatible_options(self):
+        path = self.write_xlsx("dry.xlsx", self.make_rows(1))
+        with self.assertRaises(ValueError):
+            self.load(path, dry_run=True, commit="chunk", resume=True)
+        with self.assertRaises(ValueError):
+            self.load(path, rejects_csv=self.tmp / "rechazos.csv")
+
+
+class ChunkSizerTests(SimpleTestCase):
+    def test_fixed_size_only_records(self):
+        sizer = ChunkSizer(10_000, max_flush_seconds=1.0)
+        sizer.record(10_000, 5.0)
+        self.assertEqual(sizer.size, 10_000)
+        self.assertEqual(sizer.stats()["chunk_sizes"], [10_000])
+        self.assertEqual(sizer.stats()["flush_seconds"], [5.0])
+
+    def test_shrinks_to_latency_and_grows_when_fast(self):
+        sizer = ChunkSizer(10_000, adaptive=True, max_flush_seconds=1.0)
+        sizer.record(10_000, 4.0)  # 2500 filas/s: entra 2500 en 1s, con margen 2000
+        self.assertEqual(sizer.size, 2_000)
+        sizer.record(2_000, 0.2)  # rápido: crece x1.5 (la latencia permitiría más)
+        self.assertEqual(sizer.size, 3_000)
+        sizer.record(500, 0.01)  # chunk incompleto (fin de archivo): no decide
+        self.assertEqual(sizer.size, 3_000)
+
+    def test_goes_back_when_growing_hurts_throughput(self):
+        sizer = ChunkSizer(10_000, adaptive=True, max_flush_seconds=10.0)
+        sizer.record(10_000, 1.0)
+        self.assertEqual(sizer.size, 15_000)
+        sizer.record(15_000, 2.0)  # 7500 filas/s < 90% de 10000
+        self.assertEqual(sizer.size, 10_000)
+        sizer.record(10_000, 1.0)
+        self.assertEqual(sizer.size, 10_000)  # ya no vuelve a crecer
+
+    def test_holds_size_once_target_rate_is_met(self):
+        sizer = ChunkSizer(10_000, adaptive=True, max_flush_seconds=10.0, target_rows_per_sec=5_000)
+        sizer.record(10_000, 1.0)
+        self.assertEqual(sizer.size, 10_000)
+        sizer.record(10_000, 4.0)  # 2500 filas/s: por debajo del objetivo, crece
+        self.assertEqual(sizer.size, 15_000)
+
+    def test_bounds(self):
+        sizer = ChunkSizer(10_000, adaptive=True, max_flush_seconds=0.001, min_size=1_000, max_size=12_000)
+        sizer.record(10_000, 5.0)
+        self.assertEqual(sizer.size, 1_000)
+        sizer = ChunkSizer(10_000, adaptive=True, max_flush_seconds=100.0, max_size=12_000)
+        sizer.record(10_000, 0.1)
+        self.assertEqual(sizer.size, 12_000)
+
+
+    def test_bulk_batch_size_respects_bind_limit(self):
+        self.assertIsNone(bulk_batch_size(StockRecord))  # SQLite: Django ya parte por max_query_params
+        with mock.patch.object(connection.features, "max_query_params", None), \
+                mock.patch.object(connection, "vendor", "postgresql"):
+            self.assertEqual(bulk_batch_size(StockRecord), 65_535 // 6)  # 6 columnas por fila
+
+
+class NavidadLoaderAdaptiveChunkTests(NavidadLoaderTestMixin, TestCase):
+    class SteppedSizer(ChunkSizer):
+        """Determinístico para el test: cada escritura agranda el próximo chunk en 1."""
+
+        def record(self, rows, seconds):
+            self.sizes.append(rows)
+            self.seconds.append(seconds)
+            self.size += 1
+
+    def db_state(self):
+        stock = sorted(StockRecord.objects.values_list("store__code", "date", "stock_units"))
+        sales = sorted(SalesRecord.objects.values_list("store__code", "date", "units_sold"))
+        return stock, sales
+
+    def test_next_chunk_uses_the_sizer_decision(self):
+        path = self.write_xlsx("x.xlsx", self.make_rows(5))  # 15 filas
+        fixed = self.load(path, chunk_size=2)
+        expected = self.db_state()
+        StockRecord.objects.all().delete()
+        SalesRecord.objects.all().delete()
+
+        with mock.patch.object(navidad_loader, "ChunkSizer", self.SteppedSizer):
+            summary = self.load(path, chunk_size=2, adaptive=True)
+        self.assertEqual(summary["chunk_sizes"], [2, 3, 4, 5, 1])
+        self.assertEqual(len(summary["flush_seconds"]), 5)
+        self.assertTrue(summary["chunk_adaptive"])
+        self.assertEqual(self.db_state(), expected)
+        for key in ("stock_created", "stock_skipped", "sales_created", "sales_skipped"):
+            self.assertEqual(summary[key], fixed[key], key)
+
+    def test_pipelined_reader_follows_the_sizer(self):
+        path = self.write_xlsx("x.xlsx", self.make_rows(10))  # 30 filas
+        with mock.patch.object(navidad_loader, "ChunkSizer", self.SteppedSizer):
+            summary = self.load(path, chunk_size=2, adaptive=True, workers=1)
+        sizes = summary["chunk_sizes"]
+        self.assertEqual(sum(sizes), 30)
+        self.assertEqual(sizes[0], 2)
+        self.assertGreater(max(sizes), 2)  # los chunks que arma el lector después crecen
+
+
+class NavidadLoaderDelimitedTests(NavidadLoaderTestMixin, TestCase):
+    def db_state(self):
+        stock = sorted(StockRecord.objects.values_list("store__code", "date", "stock_units"))
+        sales = sorted(SalesRecord.objects.values_list("store__code", "date", "units_sold"))
+        return stock, sales
+
+    def assertSameAsXlsx(self, path):
+        rows = [r[:5] + (r[5] + 0.5, r[6]) for r in self.make_rows(3)]
+        self.load(self.write_xlsx("ref.xlsx", rows))
+        expected = self.db_state()
+        StockRecord.objects.all().delete()
+        SalesRecord.objects.all().delete()
+
+        summary = self.load(path)
+        self.assertEqual(summary["format"], "csv")
+        self.assertEqual(self.db_state(), expected)
+        self.assertEqual(summary["stock_created"], 6)
+        self.assertEqual(summary["stock_skipped"], 3)
+
+    def test_semicolon_csv_with_comma_decimals(self):
+        rows = [r[:5] + (r[5] + 0.5, r[6]) for r in self.make_rows(3)]
+        self.assertSameAsXlsx(self.write_delimited("ventas.csv", rows))
+
+    def test_tsv_utf8_without_extension(self):
+        rows = [r[:5] + (r[5] + 0.5, r[6]) for r in self.make_rows(3)]
+        self.assertSameAsXlsx(
+            self.write_delimited("ventas", rows, delimiter="\t", encoding="utf-8", decimal=".")
+        )
+
+
+class RawXlsxReaderTests(SimpleTestCase):
+    """El lector raw tiene que producir las mismas filas que openpyxl read_only."""
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.tmp = Path(tmp.name)
+
+    def rows(self, path, reader, sheet=None):
+        with open_row_source(path, sheet, reader=reader) as source:
+            rows = [tuple(r) for r in source.rows]
+            used = source.meta["reader"]
+        # openpyxl rellena hasta el ancho de la hoja; comparamos sin los None finales
+        trimmed = []
+        for r in rows:
+            r = list(r)
+            while r and r[-1] is None:
+                r.pop()
+            trimmed.append(tuple(r))
+        while trimmed and not trimmed[-1]:
+            trimmed.pop()
+        return used, trimmed
+
+    def assertSameRows(self, path, sheet=None):
+        used, raw = self.rows(path, "raw", sheet)
+        self.assertEqual(used, "raw")
+        self.assertEqual(raw, self.rows(path, "openpyxl", sheet)[1])
+        return raw
+
+    def test_shared_strings_dates_and_gaps(self):
+        wb = Workbook()
+        ws = wb.active
+        ws.title = "Otra"
+        ws.append(["no", "es", "esta"])
+        ws = wb.create_sheet("Datos")
+        ws.append(["Venta para Curvas"])
+        ws.append(HEADERS)
+        ws.append([datetime(2025, 10, 1), "Patagonia", "Sur", 21, "ARB", 10.5, 3])
+        ws.append([date(2025, 10, 2), "Patagonia", None, "021", "ARB", "1.234,5", True])
+        ws.cell(row=8, column=2, value="fila con hueco")
+        ws.cell(row=8, column=7, value=-2)
+        wb.active = 1
+        path = self.tmp / "shared.xlsx"
+        wb.save(path)
+
+        rows = self.assertSameRows(path)
+        self.assertEqual(rows[2][0], datetime(2025, 10, 1))
+        self.assertEqual(rows[4:7], [(), (), ()])
+        self.assertSameRows(path, sheet="Otra")
+        self.assertSameRows(path, sheet=0)
+
+    def test_inline_strings_write_only(self):
+        wb = Workbook(write_only=True)
+        ws = wb.create_sheet("Datos")
+        ws.append(HEADERS)
+        for d in range(5):
+            ws.append([date(2025, 10, 1 + d), "Región Ñ", "Zona", str(d), "ARB", d * 1.5, d])
+        path = self.tmp / "inline.xlsx"
+        wb.save(path)
+        self.assertSameRows(path)
+
+    def test_falls_back_to_openpyxl_for_unknown_sheet(self):
+        path = self.tmp / "x.xlsx"
+        Workbook().save(path)
+        with self.assertRaises(KeyError), contextlib.redirect_stdout(io.StringIO()) as out:
+            open_row_source(path, "NoExiste", reader="raw")
+        self.assertIn("uso openpyxl", out.getvalue())
+
+
+class ColumnarParseParityTests(SimpleTestCase):
+    """Las versiones *_column tienen que dar exactamente lo mismo que las escalares."""
+
+    DATES = [
+        None, "", "  ", "abc", "05/10/2025", " 05/10/2025 ", "5-10-2025", "5.10.2025",
+        "2025-10-05", "2025/10/05", "13/10/2025 00:00:00", "10/13/2025", "05/10/25",
+        "20251005", "2025", "45931", "45931.0", 45931, 45931.0, 45931.5, 1, 1.0, True, 0,
+        datetime(2025, 10, 5, 13, 30), date(2025, 10, 5), pd.Timestamp("2025-12-24"),
+        "05/10/2025", 45931, date(2025, 10, 5),
+    ]
+    NUMBERS = [
+        None, "", " ", "abc", 0, 1, -3, 2.5, float("nan"), True, "12", " 1 234 ",
+        "1.234,56", "1,234.56", "1,5", "1.5", "1.234", "12,", "-7,25", "1e3",
+        "3", 3, 3.0, "1.234,56", datetime(2025, 10, 5),
+    ]
+    CODES = [
+        "21", "021", " 021 ", "21.0", 21, 21.0, "0", "00", "000", "CDR01", " cdr01",
+        "", None, True, 1, 1.0, "1", "21",
+    ]
+
+    def assertSameValues(self, got, expected):
+        self.assertEqual(len(got), len(expected))
+        for i, (g, e) in enumerate(zip(got, expected)):
+            if isinstance(e, float) and pd.isna(e):
+                self.assertTrue(isinstance(g, float) and pd.isna(g), (i, g, e))
+            else:
+                self.assertEqual((type(g), g), (type(e), e), i)
+
+    def test_parse_date_column(self):
+        self.assertSameValues(list(parse_date_column(self.DATES)), [parse_date(v) for v in self.DATES])
+
+    def test_parse_number_column(self):
+        self.assertSameValues(list(parse_number_column(self.NUMBERS)), [parse_number(v) for v in self.NUMBERS])
+
+    def test_zfill_code_column(self):
+        for pad in (0, 3):
+            self.assertSameValues(
+                list(zfill_code_column(self.CODES, pad)), [zfill_code(v, pad) for v in self.CODES]
+            )
+
+    def test_parse_chunk_matches_scalar_rows(self):
+        col_indices = {"Dia": 0, "Region": 1, "Zona": 2, "Sucursal": 3, "SubFamilia": 4,
+                       "Unidades Stock Final": 5, "Unidades Vendidas": 6}
+        raw = [
+            ("05/10/2025", " Patagonia ", "Sur", "021", " ARB ", "1.234,5", 3),
+            (45931, "Patagonia", None, 21.0, "ARB", 10, "2,5"),
+            (None, "Patagonia", "Sur", "21", "ARB", 1, 1),          # sin fecha
+            (date(2025, 10, 2), "Patagonia", "Sur", "21", "  ", 1, 1),  # sin subfamilia
+            (datetime(2025, 10, 3), "Patagonia", "Sur", "CDR01", "ARB", None, ""),
+            (date(2025, 10, 4), "Patagonia", "Sur", "22"),              # fila corta
+        ]
+
+        expected = []
+        for row in raw:
+            cell = lambda i: row[i] if i < len(row) else None
+            dt = parse_date(cell(0))
+            subfam = str(cell(4) or "").strip()
+            if not dt or not subfam:
+                continue
+            expected.append({
+                "date": dt,
+                "code": zfill_code(cell(3), 0),
+                "subfam": subfam,
+                "stock_units": parse_number(cell(5)),
+                "units_sold": parse_number(cell(6)),
+                "region": str(cell(1) or "").strip(),
+                "zona": str(cell(2) or "").strip(),
+            })
+
+        chunk = parse_chunk(raw, col_indices, pad=0)
+        self.assertEqual(chunk.to_dicts(), expected)
+        # "021" y 21.0 normalizan igual: comparten entrada en el diccionario del chunk.
+        self.assertEqual(chunk.values["code"], ["21", "CDR01"])
+        self.assertEqual(chunk.ids["code"].tolist(), [0, 0, 1])
+        self.assertEqual(chunk.take(chunk.ids["code"] == 1).to_dicts(), expected[2:])
@@ -1,5 +1,5 @@
 from django.urls import path
-from .views import api_zones_by_region, api_stores_by_zone, api_store_info
+from .views import api_zones_by_region, api_stores_by_zone, api_store_info, api_response_cache_stats
 
 app_name = "core"
 
@@ -7,4 +7,5 @@ urlpatterns = [
     path("api/zones/", api_zones_by_region, name="zones_by_region"),
     path("api/stores/", api_stores_by_zone, name="stores_by_zone"),
     path("api/store/", api_store_info, name="store_info"),
+    path("api/cache-stats/", api_response_cache_stats, name="response_cache_stats"),
 ]
\ No newline at end of file
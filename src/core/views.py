@@ -4,6 +4,7 @@ from django.shortcuts import render
 from django.views.generic import TemplateView
 from django.http import JsonResponse
 from core.models import Region, Zone, Store
+from core.services import response_cache
 
 class HomeView(LoginRequiredMixin, TemplateView):
     template_name = 'home.html'
@@ -39,3 +40,8 @@ def api_store_info(request):
         })
     except Store.DoesNotExist:
         return JsonResponse({"ok": False})
+
+@login_required
+def api_response_cache_stats(request):
+    # Hits/misses del cache de los endpoints *_data del worker que atiende (stats()["pid"])
+    return JsonResponse(response_cache.stats())
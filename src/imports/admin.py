@@ -1,3 +1,9 @@
 from django.contrib import admin
+from .models import ImportJob
 
-# Register your models here.
+@admin.register(ImportJob)
+class ImportJobAdmin(admin.ModelAdmin):
+    list_display = ("id", "original_name", "status", "rows_processed", "total_rows", "created_by", "created_at", "finished_at")
+    list_filter = ("status",)
+    search_fields = ("original_name",)
+    readonly_fields = ("created_at", "started_at", "finished_at", "progress_at", "heartbeat_at", "summary", "error", "worker")
@@ -5,6 +5,9 @@ class NavidadUploadForm(forms.Form):
     sheet = forms.CharField(label="Nombre de hoja (si es Excel)", required=False)
     pad = forms.IntegerField(label="Zero-padding del código de sucursal (si aplica)", min_value=0, initial=0, required=False)
     strict_area = forms.BooleanField(label="Validar Región/Zona contra maestro", required=False, initial=False)
+    incremental = forms.BooleanField(
+        label="Solo cambios (saltear sucursal/día sin cambios desde la última carga)", required=False, initial=False
+    )
 
     def clean_sheet(self):
         s = self.cleaned_data.get("sheet", "")
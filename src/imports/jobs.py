@@ -0,0 +1,194 @@
+"""
+Cola de importaciones sobre la BD (sin broker).
+
+- enqueue_job(): la vista guarda el archivo subido en el storage por defecto
+  (ImportJob.upload, por chunks: no pasa entero por memoria). Con el web y el
+  worker en máquinas distintas (Procfile), STORAGES["default"] tiene que ser
+  compartido; si el storage no tiene path local, el worker copia el archivo a
+  un directorio temporal, también por chunks.
+- claim_next_job(): el worker toma el job `queued` más viejo con un UPDATE
+  condicional (status=queued -> running); si otro worker lo tomó antes, el UPDATE
+  no afecta filas y se prueba el siguiente. Funciona igual en SQLite y PostgreSQL.
+- run_job(): corre process_navidad_file y guarda summary / error.
+
+El avance no se puede escribir desde la conexión del loader: process_navidad_file
+corre en una única transacción y lo que escribe no es visible hasta el commit.
+Un hilo aparte (con su propia conexión, en autocommit) marca heartbeat_at cada
+tantos segundos, haya avance o no (el cierre del loader, con rollups, acumulados
+y cubo, no reporta filas), y de paso vuelca el último avance reportado si
+cambió. fail_stale_jobs mira heartbeat_at, no progress_at. En SQLite un segundo
+escritor queda bloqueado mientras dure la transacción del loader, así que ahí no
+se arranca el hilo y el avance se ve al empezar y al terminar; por eso tampoco
+se marcan jobs colgados (fail_stale_jobs), uno vivo parecería caído.
+"""
+import os
+import shutil
+import socket
+import tempfile
+import threading
+import traceback
+from contextlib import contextmanager
+from datetime import timedelta
+from pathlib import Path
+
+from django.db import DatabaseError, connection, connections
+from django.utils import timezone
+
+from core.services.navidad_loader import process_navidad_file
+from .models import ImportJob
+
+HEARTBEAT_SECONDS = 2.0
+
+
+def worker_name() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def enqueue_job(
+    up_file, *, sheet: str = "", pad: int = 0, strict_area: bool = False, incremental: bool = False, user=None,
+) -> ImportJob:
+    """Guarda el archivo subido en el storage (al grabar el job) y lo encola."""
+    return ImportJob.objects.create(
+        upload=up_file,
+        original_name=Path(up_file.name).name,
+        sheet=sheet,
+        pad=pad,
+        strict_area=strict_area,
+        incremental=incremental,
+        created_by=user if user is not None and user.is_authenticated else None,
+    )
+
+
+def claim_next_job(worker: str) -> ImportJob | None:
+    while True:
+        job = (
+            ImportJob.objects.filter(status=ImportJob.Status.QUEUED).order_by("created_at", "pk").first()
+        )
+        if job is None:
+            return None
+        now = timezone.now()
+        claimed = ImportJob.objects.filter(pk=job.pk, status=ImportJob.Status.QUEUED).update(
+            status=ImportJob.Status.RUNNING, worker=worker, started_at=now, progress_at=now, heartbeat_at=now,
+        )
+        if claimed:
+            job.refresh_from_db()
+            return job
+
+
+def heartbeats_enabled(heartbeat: float | None = HEARTBEAT_SECONDS) -> bool:
+    """Si run_job actualiza el avance mientras corre (no en SQLite, ver el docstring del módulo)."""
+    return bool(heartbeat) and connection.vendor != "sqlite"
+
+
+def fail_stale_jobs(older_than: timedelta) -> int:
+    """
+    Marca como fallidos los jobs `running` sin heartbeat reciente (worker caído).
+    Sin heartbeats (SQLite) no hay forma de distinguirlos de uno vivo: ValueError.
+    """
+    if not heartbeats_enabled():
+        raise ValueError("Sin heartbeats (SQLite) no se pueden detectar jobs interrumpidos.")
+    cutoff = timezone.now() - older_than
+    return ImportJob.objects.filter(status=ImportJob.Status.RUNNING, heartbeat_at__lt=cutoff).update(
+        status=ImportJob.Status.FAILED,
+        finished_at=timezone.now(),
+        error="El worker dejó de dar señales de vida (interrumpido).",
+    )
+
+
+class _ProgressReporter:
+    """Callback progress() del loader + hilo que marca el heartbeat y vuelca el avance a la BD."""
+
+    def __init__(self, job_id: int, interval: float | None):
+        self.job_id = job_id
+        self.interval = interval
+        self.rows = 0
+        self.total = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def __call__(self, rows: int, total: int | None):
+        with self._lock:
+            self.rows, self.total = rows, total
+
+    def start(self):
+        if self.interval:
+            self._thread = threading.Thread(target=self._run, name=f"import-job-{self.job_id}", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self):
+        last = None
+        try:
+            while not self._stop.wait(self.interval):
+                with self._lock:
+                    current = (self.rows, self.total)
+                now = timezone.now()
+                fields = {"heartbeat_at": now}
+                if current != last:
+                    fields.update(rows_processed=current[0], total_rows=current[1], progress_at=now)
+                try:
+                    ImportJob.objects.filter(pk=self.job_id).update(**fields)
+                    last = current
+                except DatabaseError as e:
+                    print(f"[import_jobs] no se pudo guardar el heartbeat del job {self.job_id}: {e}", flush=True)
+        finally:
+            connections.close_all()  # solo las conexiones de este hilo
+
+
+@contextmanager
+def _local_file(job: ImportJob):
+    """Path local del archivo del job: el del storage si lo tiene, si no una copia temporal."""
+    if not job.upload:
+        raise FileNotFoundError(f"El job #{job.pk} no tiene el archivo subido.")
+    try:
+        local = Path(job.upload.path)
+    except NotImplementedError:  # storage remoto (S3, etc.)
+        local = None
+    if local is not None:
+        yield local
+        return
+    with tempfile.TemporaryDirectory(prefix="import_job_") as tmp:
+        path = Path(tmp) / job.original_name
+        with job.upload.open("rb") as src, open(path, "wb") as dst:
+            shutil.copyfileobj(src, dst)
+        yield path
+
+
+def run_job(job: ImportJob, *, heartbeat: float | None = HEARTBEAT_SECONDS) -> ImportJob:
+    reporter = _ProgressReporter(job.pk, heartbeat if heartbeats_enabled(heartbeat) else None)
+    reporter.start()
+    try:
+        # El loader elige el lector por el contenido (detect_format), no por la extensión.
+        with _local_file(job) as path:
+            summary = process_navidad_file(
+                path, sheet=job.sheet, pad=job.pad, strict_area=job.strict_area,
+                incremental=job.incremental, progress=reporter,
+            )
+    except Exception as e:
+        reporter.stop()
+        job.status = ImportJob.Status.FAILED
+        job.error = f"{e}\n\n{traceback.format_exc()}"
+        print(f"[import_jobs] job {job.pk} falló: {e}", flush=True)
+    else:
+        reporter.stop()
+        job.status = ImportJob.Status.DONE
+        job.summary = summary
+
+    now = timezone.now()
+    job.rows_processed = reporter.rows
+    job.total_rows = reporter.total
+    job.progress_at = now
+    job.finished_at = now
+    job.heartbeat_at = now
+    if job.upload:
+        job.upload.delete(save=False)
+    job.save(update_fields=[
+        "status", "summary", "error", "rows_processed", "total_rows", "progress_at", "heartbeat_at", "finished_at",
+        "upload",
+    ])
+    return job
@@ -0,0 +1,80 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from imports.jobs import (
+    HEARTBEAT_SECONDS,
+    claim_next_job,
+    fail_stale_jobs,
+    heartbeats_enabled,
+    run_job,
+    worker_name,
+)
+
+
+class Command(BaseCommand):
+    help = "Worker de importaciones: toma los ImportJob en cola (la BD es la cola) y los procesa de a uno."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Procesar los jobs en cola y salir (no quedarse esperando nuevos).",
+        )
+        parser.add_argument(
+            "--poll",
+            type=float,
+            default=2.0,
+            help="Segundos entre consultas a la cola cuando está vacía.",
+        )
+        parser.add_argument(
+            "--heartbeat",
+            type=float,
+            default=HEARTBEAT_SECONDS,
+            help="Segundos entre heartbeats del job en la BD, con el avance si cambió (no aplica en SQLite).",
+        )
+        parser.add_argument(
+            "--fail-stale-minutes",
+            type=int,
+            default=0,
+            help=(
+                "Al arrancar, marcar como fallidos los jobs 'running' sin heartbeat hace N minutos. 0 = no. "
+                "Se ignora en SQLite (sin heartbeats, un job vivo largo parecería interrumpido)."
+            ),
+        )
+
+    def handle(self, *args, **opts):
+        worker = worker_name()
+        if opts["fail_stale_minutes"] and not heartbeats_enabled():
+            self.stdout.write(self.style.WARNING(
+                "--fail-stale-minutes ignorado: sin heartbeats (SQLite) no se distinguen jobs vivos de interrumpidos."
+            ))
+        elif opts["fail_stale_minutes"]:
+            n = fail_stale_jobs(timedelta(minutes=opts["fail_stale_minutes"]))
+            if n:
+                self.stdout.write(self.style.WARNING(f"{n} job(s) interrumpidos marcados como fallidos."))
+
+        self.stdout.write(f"[run_import_jobs] worker {worker} esperando jobs...")
+        processed = 0
+        while True:
+            job = claim_next_job(worker)
+            if job is None:
+                if opts["once"]:
+                    break
+                time.sleep(opts["poll"])
+                continue
+
+            self.stdout.write(f"[run_import_jobs] job #{job.pk}: {job.original_name}")
+            job = run_job(job, heartbeat=opts["heartbeat"])
+            processed += 1
+            if job.status == job.Status.DONE:
+                self.stdout.write(self.style.SUCCESS(
+                    f"[run_import_jobs] job #{job.pk} terminado: {job.rows_processed} filas"
+                ))
+            else:
+                self.stdout.write(self.style.ERROR(
+                    f"[run_import_jobs] job #{job.pk} falló: {job.error.splitlines()[0] if job.error else ''}"
+                ))
+
+        self.stdout.write(self.style.SUCCESS(f"[run_import_jobs] {processed} job(s) procesados."))
@@ -1,3 +1,104 @@
+from django.conf import settings
 from django.db import models
+from django.utils import timezone
 
-# Create your models here.
+
+class ImportJob(models.Model):
+    """
+    Importación encolada desde la vista de upload. La BD es la cola: el worker
+    (`manage.py run_import_jobs`) toma el job `queued` más viejo, va dejando el
+    avance en rows_processed / progress_at y marca heartbeat_at mientras vive.
+    """
+
+    class Status(models.TextChoices):
+        QUEUED = "queued", "En cola"
+        RUNNING = "running", "Procesando"
+        DONE = "done", "Terminado"
+        FAILED = "failed", "Error"
+
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.QUEUED)
+
+    # Archivo subido (en el storage por defecto, compartido entre el web y el
+    # worker; se borra al terminar) y opciones del loader
+    upload = models.FileField(upload_to="imports/%Y/%m/", max_length=255, blank=True)
+    original_name = models.CharField(max_length=255)
+    sheet = models.CharField(max_length=100, blank=True, default="")
+    pad = models.PositiveSmallIntegerField(default=0)
+    strict_area = models.BooleanField(default=False)
+    incremental = models.BooleanField(default=False)
+
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL, null=True, blank=True, on_delete=models.SET_NULL, related_name="import_jobs"
+    )
+    worker = models.CharField(max_length=100, blank=True, default="")  # host:pid que lo tomó
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    # Avance (lo actualiza el worker en los puntos de progreso del loader)
+    rows_processed = models.PositiveIntegerField(default=0)
+    total_rows = models.PositiveIntegerField(null=True, blank=True)  # aproximado; None si no se conoce
+    progress_at = models.DateTimeField(null=True, blank=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True)  # el worker sigue vivo (aunque no avance)
+
+    summary = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True, default="")
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "created_at"]),  # claim del worker
+        ]
+        ordering = ["-created_at"]
+
+    def __str__(self):
+        return f"#{self.pk} {self.original_name} ({self.status})"
+
+    @property
+    def is_finished(self) -> bool:
+        return self.status in (self.Status.DONE, self.Status.FAILED)
+
+    def rows_per_sec(self) -> float | None:
+        """Velocidad medida hasta el último reporte de avance."""
+        if not self.started_at or not self.rows_processed:
+            return None
+        until = self.finished_at or self.progress_at
+        if not until:
+            return None
+        elapsed = (until - self.started_at).total_seconds()
+        return self.rows_processed / elapsed if elapsed > 0 else None
+
+    def eta_seconds(self) -> float | None:
+        if self.status != self.Status.RUNNING or not self.total_rows:
+            return None
+        rate = self.rows_per_sec()
+        if not rate:
+            return None
+        remaining = max(0, self.total_rows - self.rows_processed)
+        # Descontar lo que pasó desde el último reporte (el worker reporta cada tantos segundos).
+        since = (timezone.now() - self.progress_at).total_seconds() if self.progress_at else 0
+        return max(0.0, remaining / rate - since)
+
+    def progress_payload(self) -> dict:
+        rate = self.rows_per_sec()
+        eta = self.eta_seconds()
+        percent = None
+        if self.status == self.Status.DONE:
+            percent = 100.0
+        elif self.total_rows:
+            percent = min(100.0, self.rows_processed * 100 / self.total_rows)
+        return {
+            "id": self.pk,
+            "status": self.status,
+            "file": self.original_name,
+            "rows_processed": self.rows_processed,
+            "total_rows": self.total_rows,
+            "percent": round(percent, 1) if percent is not None else None,
+            "rows_per_sec": round(rate, 1) if rate is not None else None,
+            "eta_seconds": round(eta) if eta is not None else None,
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+            "summary": self.summary,
+            "error": self.error,
+        }
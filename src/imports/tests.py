@@ -1,3 +1,118 @@
-from django.test import TestCase
+import contextlib
+import io
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from core.tests import NavidadLoaderTestMixin
+from stock.models import StockRecord
+
+from . import jobs
+from .jobs import claim_next_job, enqueue_job, fail_stale_jobs, run_job
+from .models import ImportJob
+
+
+class ImportJobTests(NavidadLoaderTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        media = override_settings(MEDIA_ROOT=self.tmp / "media")
+        media.enable()
+        self.addCleanup(media.disable)
+        self.user = User.objects.create_user(username="test@laanonima.com.ar", email="test@laanonima.com.ar")
+        self.client.force_login(self.user)
+
+    def upload(self, name="navidad.xlsx", days=3):
+        path = self.write_xlsx(name, self.make_rows(days))
+        return SimpleUploadedFile(name, path.read_bytes())
+
+    def test_upload_enqueues_and_worker_runs_job(self):
+        response = self.client.post(reverse("navidad_upload"), {"file": self.upload(), "pad": 0})
+
+        job = ImportJob.objects.get()
+        self.assertRedirects(response, f"{reverse('navidad_upload')}?job={job.pk}")
+        self.assertEqual(job.status, ImportJob.Status.QUEUED)
+        self.assertEqual(job.created_by, self.user)
+        self.assertEqual(StockRecord.objects.count(), 0)  # nada se procesa en el request
+        stored = self.tmp / "media" / job.upload.name
+        self.assertTrue(job.upload.name.startswith("imports/"))
+        self.assertEqual(stored.read_bytes()[:2], b"PK")  # en el storage, no en la fila del job
+
+        progress_url = reverse("import_job_progress", args=[job.pk])
+        self.assertEqual(self.client.get(progress_url).json()["status"], "queued")
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            call_command("run_import_jobs", "--once", stdout=io.StringIO())
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, ImportJob.Status.DONE)
+        self.assertEqual(job.rows_processed, 9)
+        self.assertEqual(job.summary["stock_created"], 6)
+        self.assertFalse(job.upload)
+        self.assertFalse(stored.exists())
+
+        data = self.client.get(progress_url).json()
+        self.assertEqual(data["status"], "done")
+        self.assertEqual(data["rows_processed"], 9)
+        self.assertEqual(data["percent"], 100.0)
+        self.assertIsNone(data["eta_seconds"])
+        self.assertEqual(data["summary"]["sales_created"], 3)
+
+    def test_claim_takes_oldest_and_never_twice(self):
+        first = enqueue_job(self.upload("a.xlsx"))
+        second = enqueue_job(self.upload("b.xlsx"))
+
+        self.assertEqual(claim_next_job("w1").pk, first.pk)
+        self.assertEqual(claim_next_job("w2").pk, second.pk)
+        self.assertIsNone(claim_next_job("w3"))
+        self.assertEqual(ImportJob.objects.get(pk=first.pk).worker, "w1")
+
+    def test_failed_job_keeps_error(self):
+        job = enqueue_job(SimpleUploadedFile("roto.xlsx", b"no es un excel"))
+        job = claim_next_job("w1")
+        with contextlib.redirect_stdout(io.StringIO()):
+            run_job(job, heartbeat=None)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, ImportJob.Status.FAILED)
+        self.assertTrue(job.error)
+        self.assertIsNotNone(job.finished_at)
+
+    def test_stale_jobs_are_kept_without_heartbeats(self):
+        job = enqueue_job(self.upload())
+        ImportJob.objects.filter(pk=job.pk).update(
+            status=ImportJob.Status.RUNNING, progress_at=timezone.now() - timedelta(hours=2),
+        )
+        out = io.StringIO()
+        call_command("run_import_jobs", "--once", "--fail-stale-minutes", "30", stdout=out)
+        self.assertIn("--fail-stale-minutes ignorado", out.getvalue())
+        self.assertEqual(ImportJob.objects.get(pk=job.pk).status, ImportJob.Status.RUNNING)
+        with self.assertRaises(ValueError):
+            fail_stale_jobs(timedelta(minutes=30))
+
+    def test_stale_jobs_are_detected_by_heartbeat_not_progress(self):
+        old = timezone.now() - timedelta(hours=2)
+        alive = enqueue_job(self.upload("vivo.xlsx"))
+        dead = enqueue_job(self.upload("caido.xlsx"))
+        # El vivo lleva rato sin avance (cierre del loader) pero sigue marcando heartbeat.
+        ImportJob.objects.filter(pk=alive.pk).update(
+            status=ImportJob.Status.RUNNING, progress_at=old, heartbeat_at=timezone.now(),
+        )
+        ImportJob.objects.filter(pk=dead.pk).update(status=ImportJob.Status.RUNNING, progress_at=old, heartbeat_at=old)
+        with mock.patch.object(jobs, "heartbeats_enabled", return_value=True):
+            self.assertEqual(fail_stale_jobs(timedelta(minutes=30)), 1)
+        self.assertEqual(ImportJob.objects.get(pk=alive.pk).status, ImportJob.Status.RUNNING)
+        self.assertEqual(ImportJob.objects.get(pk=dead.pk).status, ImportJob.Status.FAILED)
+
+    def test_loader_reports_progress(self):
+        path = self.write_xlsx("p.xlsx", self.make_rows(4))
+        calls = []
+        self.load(path, chunk_size=5, progress=lambda rows, total: calls.append((rows, total)))
+
+        self.assertEqual(calls[-1], (12, 12))
+        self.assertEqual([rows for rows, _ in calls], sorted(rows for rows, _ in calls))
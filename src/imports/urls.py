@@ -1,6 +1,7 @@
 from django.urls import path
-from .views import navidad_upload_view
+from .views import import_job_progress, navidad_upload_view
 
 urlpatterns = [
     path("upload/", navidad_upload_view, name="navidad_upload"),
+    path("jobs/<int:job_id>/progress/", import_job_progress, name="import_job_progress"),
 ]
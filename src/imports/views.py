@@ -1,48 +1,44 @@
-import os
-from pathlib import Path
-from django.conf import settings
-from django.shortcuts import render, redirect
-from django.views.decorators.http import require_http_methods
+from django.http import JsonResponse
+from django.shortcuts import get_object_or_404, redirect, render
+from django.urls import reverse
+from django.views.decorators.http import require_GET, require_http_methods
 from django.contrib import messages
 from .forms import NavidadUploadForm
-from core.services.navidad_loader import process_navidad_file
+from .jobs import enqueue_job
+from .models import ImportJob
 
 @require_http_methods(["GET", "POST"])
 def navidad_upload_view(request):
-    context = {"result": None}
     if request.method == "POST":
         form = NavidadUploadForm(request.POST, request.FILES)
         if form.is_valid():
             up_file = form.cleaned_data["file"]
             sheet = form.cleaned_data.get("sheet") or ""
             # Usar 0 por defecto si no viene `pad`. Si el usuario envía 0, se respeta.
-            pad = form.cleaned_data.get("pad", 0)
+            pad = form.cleaned_data.get("pad") or 0
             strict_area = form.cleaned_data.get("strict_area") or False
+            incremental = form.cleaned_data.get("incremental") or False
 
-            # guardar temporal
-            uploads_dir = Path(settings.MEDIA_ROOT) / "uploads"
-            uploads_dir.mkdir(parents=True, exist_ok=True)
-            tmp_path = uploads_dir / up_file.name
+            # El archivo se guarda y se encola: lo procesa `manage.py run_import_jobs`
+            # fuera del request (un archivo grande no bloquea al worker de gunicorn).
+            job = enqueue_job(
+                up_file, sheet=sheet, pad=pad, strict_area=strict_area, incremental=incremental, user=request.user,
+            )
+            messages.success(request, f"Archivo encolado (importación #{job.pk}).")
+            return redirect(f"{reverse('navidad_upload')}?job={job.pk}")
 
-            with open(tmp_path, "wb+") as dest:
-                for chunk in up_file.chunks():
-                    dest.write(chunk)
+        messages.error(request, "Revisá los datos del formulario.")
+        return render(request, "imports/upload.html", {"form": form, "job": None})
 
-            try:
-                summary = process_navidad_file(tmp_path, sheet=sheet, pad=pad, strict_area=strict_area)
-                context["result"] = summary
-                messages.success(request, "Archivo procesado correctamente.")
-            except Exception as e:
-                messages.error(request, f"Error procesando el archivo: {e}")
-            finally:
-                # limpia archivo temporal
-                try:
-                    tmp_path.unlink(missing_ok=True)
-                except Exception:
-                    pass
-        else:
-            messages.error(request, "Revisá los datos del formulario.")
-        return render(request, "imports/upload.html", {"form": form, **context})
+    # GET (?job=<id> muestra el avance de esa importación)
+    job = None
+    job_id = request.GET.get("job")
+    if job_id and job_id.isdigit():
+        job = ImportJob.objects.filter(pk=job_id).first()
+    return render(request, "imports/upload.html", {"form": NavidadUploadForm(), "job": job})
 
-    # GET
-    return render(request, "imports/upload.html", {"form": NavidadUploadForm(), **context})
+
+@require_GET
+def import_job_progress(request, job_id: int):
+    job = get_object_or_404(ImportJob, pk=job_id)
+    return JsonResponse(job.progress_payload())
@@ -1,10 +1,12 @@
 from datetime import date, timedelta
 from django.shortcuts import render
 from django.http import JsonResponse
-from django.db.models import Sum, Max
-from django.db.models.functions import ExtractYear
+from django.db.models import Sum
 
 from core.models import Region, Zone, Store, Family
+from core.services import dataset_catalog as catalog
+from core.services import season_cube, season_cumulative
+from core.services.response_cache import cached_json
 from core.utils.periods import christmas_period
 from sales.models import SalesRecord
 from stock.models import StockRecord
@@ -19,6 +21,33 @@ def overview_view(request):
         "families": families,
     })
 
+def _cube_by_family(kind, base, start, end):
+    """{family_id: total} de start a end desde el cubo de temporada; None si no está."""
+    cube = season_cube.current()
+    totals = cube.totals(kind, start, end, base, ("family_id",)) if cube is not None else None
+    if totals is None:
+        return None
+    return {fid: units for (fid,), units in totals.items()}
+
+
+def _season_sales_by_family(base, start, cut):
+    """{family_id: unidades vendidas} del 1/oct (start) a cut; del cubo o de la tabla de acumulados si están."""
+    from_cube = _cube_by_family(season_cube.SALES, base, start, cut)
+    if from_cube is not None:
+        return from_cube
+    cumulative = season_cumulative.cumulative_at(cut, base, ("family_id",))
+    if cumulative is not None:
+        return {fid: units for (fid,), units in cumulative.items()}
+    qs = (
+        SalesRecord.objects
+        .filter(date__range=(start, cut), **base)
+        .values("family__id")
+        .annotate(units=Sum("units_sold"))
+    )
+    return {r["family__id"]: float(r["units"] or 0) for r in qs}
+
+
+@cached_json({"source": "all", "cut_date": None, "region_id": None, "zone_id": None, "store_code": None})
 def overview_data(request):
     """
     Devuelve una tabla a nivel de FAMILIA:
@@ -34,9 +63,7 @@ def overview_data(request):
     cut_str   = request.GET.get("cut_date") or None  # YYYY-MM-DD
 
     # ---------- Año pivot y períodos ----------
-    y_sales = SalesRecord.objects.annotate(y=ExtractYear("date")).values_list("y", flat=True)
-    y_stock = StockRecord.objects.annotate(y=ExtractYear("date")).values_list("y", flat=True)
-    avail_years = sorted({int(y) for y in list(y_sales) + list(y_stock) if y is not None})
+    avail_years = catalog.available_years()
     pivot = avail_years[-1] if avail_years else date.today().year
     prev_year = pivot - 1
 
@@ -67,12 +94,7 @@ def overview_data(request):
         base["store__is_distribution_center"] = True
 
     # ---------- Fecha de corte real del año pivot ----------
-    latest_sales_date = (
-        SalesRecord.objects
-        .filter(date__range=(s_act, e_act), **base)
-        .aggregate(Max("date"))
-        .get("date__max")
-    )
+    latest_sales_date = catalog.last_date(catalog.SALES, s_act, e_act, **base)
 
     if cut_str:
         try:
@@ -96,35 +118,19 @@ def overview_data(request):
 
     # ---------- 1) UV Act Acum (año pivot, 1/oct -> target) ----------
     s_act_start, _ = christmas_period(pivot)
-    sales_act_qs = (
-        SalesRecord.objects
-        .filter(date__range=(s_act_start, target), **base)
-        .values("family__id", "family__origen")
-        .annotate(units=Sum("units_sold"))
-    )
-
-    sales_act_map = {}
-    for r in sales_act_qs:
-        fid = r["family__id"]
-        sales_act_map[fid] = float(r["units"] or 0)
+    sales_act_map = _season_sales_by_family(base, s_act_start, target)
 
     # ---------- 2) Stock Actual (último stock disponible hasta la fecha de corte, año pivot) ----------
-    stock_filters = {"date__range": (s_act_start, target)}
-    stock_filters.update(base)
-    if source == "stores":
-        stock_filters["store__is_distribution_center"] = False
-    elif source == "cdr":
-        stock_filters["store__is_distribution_center"] = True
-
-    last_stock_date = (
-        StockRecord.objects
-        .filter(**stock_filters)
-        .aggregate(Max("date"))
-        .get("date__max")
-    )
+    last_stock_date = catalog.last_date(catalog.STOCK, s_act_start, target, **base)
 
     stock_act_qs = []
+    stock_act_map = {}
+    from_cube = None
     if last_stock_date:
+        from_cube = _cube_by_family(season_cube.STOCK, base, last_stock_date, last_stock_date)
+    if from_cube is not None:
+        stock_act_map = from_cube
+    elif last_stock_date:
         stock_day_filters = {"date": last_stock_date}
         stock_day_filters.update(base)
         if source == "stores":
@@ -138,23 +144,12 @@ def overview_data(request):
             .annotate(units=Sum("stock_units"))
         )
 
-    stock_act_map = {}
     for r in stock_act_qs:
         fid = r["family__id"]
         stock_act_map[fid] = float(r["units"] or 0)
 
     # ---------- 3) UV Totales Año Anterior (1/oct -> 31/dic) ----------
-    sales_prev_qs = (
-        SalesRecord.objects
-        .filter(date__range=(s_prev, e_prev), **base)
-        .values("family__id", "family__origen")
-        .annotate(units=Sum("units_sold"))
-    )
-
-    sales_prev_map = {}
-    for r in sales_prev_qs:
-        fid = r["family__id"]
-        sales_prev_map[fid] = float(r["units"] or 0)
+    sales_prev_map = _season_sales_by_family(base, s_prev, e_prev)
 
     # ---------- 4) Siempre mostramos TODAS las familias activas ----------
     families = Family.objects.filter(is_active=True).order_by("origen")
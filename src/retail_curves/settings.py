@@ -147,6 +147,43 @@ STATICFILES_STORAGE = os.environ.get(
     'whitenoise.storage.CompressedManifestStaticFilesStorage'
 )
 
+# Curvas y estado de ventas desde los rollups diarios por zona/región (ver
+# core.services.rollups). En False las vistas vuelven a sumar SalesRecord/StockRecord.
+ROLLUPS_ENABLED = os.environ.get('ROLLUPS_ENABLED', 'True').lower() in ('1', 'true', 'yes')
+# Acumulados 1/oct -> corte desde la tabla de acumulados de la temporada (ver
+# core.services.season_cumulative). En False se suman las ventas diarias.
+SEASON_CUMULATIVE_ENABLED = os.environ.get('SEASON_CUMULATIVE_ENABLED', 'True').lower() in ('1', 'true', 'yes')
+# Cubo de temporada en .npy que los workers mapean en memoria (ver
+# core.services.season_cube). El directorio tiene que ser compartido por la web
+# y el proceso que importa; por eso viene apagado.
+SEASON_CUBE_ENABLED = os.environ.get('SEASON_CUBE_ENABLED', 'False').lower() in ('1', 'true', 'yes')
+SEASON_CUBE_DIR = Path(os.environ.get('SEASON_CUBE_DIR', BASE_DIR / 'season_cube'))
+
+# Cache de respuestas de los endpoints *_data, invalidado por la versión de los
+# datos (ver core.services.response_cache). RESPONSE_CACHE_BACKEND: locmem (por
+# proceso), file (compartido por los workers, en RESPONSE_CACHE_LOCATION) o db
+# (tabla RESPONSE_CACHE_LOCATION, se crea con `manage.py createcachetable`).
+# Los tests lo prenden o apagan con override_settings (ver core.tests).
+RESPONSE_CACHE_ENABLED = os.environ.get('RESPONSE_CACHE_ENABLED', 'True').lower() in ('1', 'true', 'yes')
+RESPONSE_CACHE_BACKEND = os.environ.get('RESPONSE_CACHE_BACKEND', 'locmem').lower()
+RESPONSE_CACHE_BACKENDS = {
+    'locmem': ('django.core.cache.backends.locmem.LocMemCache', 'responses'),
+    'file': ('django.core.cache.backends.filebased.FileBasedCache', str(BASE_DIR / 'response_cache')),
+    'db': ('django.core.cache.backends.db.DatabaseCache', 'response_cache'),
+}
+_response_backend, _response_location = RESPONSE_CACHE_BACKENDS[RESPONSE_CACHE_BACKEND]
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'responses': {
+        'BACKEND': _response_backend,
+        'LOCATION': os.environ.get('RESPONSE_CACHE_LOCATION', _response_location),
+        'TIMEOUT': int(os.environ.get('RESPONSE_CACHE_TIMEOUT', 24 * 3600)),
+        'OPTIONS': {'MAX_ENTRIES': 5000},
+    },
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
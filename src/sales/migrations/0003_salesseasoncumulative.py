@@ -0,0 +1,58 @@
+# Generated by Django 5.2.8 on 2026-10-17 01:56
+
+import django.db.models.deletion
+from collections import defaultdict
+from datetime import date
+
+from django.db import migrations, models
+
+
+def build_cumulative(apps, schema_editor):
+    """Carga inicial con las ventas que ya hay (igual que rebuild_season_cumulative)."""
+    SalesRecord = apps.get_model("sales", "SalesRecord")
+    SalesSeasonCumulative = apps.get_model("sales", "SalesSeasonCumulative")
+    for season in sorted({dt.year for dt in SalesRecord.objects.dates("date", "year")}):
+        start = date(season, 10, 1)
+        daily = defaultdict(dict)
+        facts = SalesRecord.objects.filter(date__range=(start, date(season, 12, 31)))
+        for store_id, family_id, dt, units in facts.values_list("store_id", "family_id", "date", "units_sold").order_by():
+            daily[(store_id, family_id)][(dt - start).days] = units
+        if not daily:
+            continue
+        horizon = max(max(by_day) for by_day in daily.values())
+        rows = []
+        for (store_id, family_id), by_day in daily.items():
+            acc = 0
+            for day in range(horizon + 1):
+                acc += by_day.get(day, 0)
+                rows.append(SalesSeasonCumulative(
+                    store_id=store_id, family_id=family_id, season=season, day=day, units_sold=acc,
+                ))
+        SalesSeasonCumulative.objects.bulk_create(rows, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_dailyrollup'),
+        ('sales', '0002_salesrecord_sales_sales_store_i_4f43c4_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SalesSeasonCumulative',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('season', models.PositiveSmallIntegerField()),
+                ('day', models.PositiveSmallIntegerField()),
+                ('units_sold', models.DecimalField(decimal_places=2, max_digits=16)),
+                ('family', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.family')),
+                ('store', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.store')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['season', 'day'], name='sales_sales_season_6dbc81_idx')],
+                'unique_together': {('store', 'family', 'season', 'day')},
+            },
+        ),
+        migrations.RunPython(build_cumulative, migrations.RunPython.noop),
+    ]
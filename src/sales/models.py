@@ -20,3 +20,30 @@ class SalesRecord(models.Model):
 
     def __str__(self):
         return f"{self.store.code} | {self.family} | {self.date}"
+
+
+class SalesSeasonCumulative(models.Model):
+    """
+    Ventas acumuladas de la temporada (1/oct -> 31/dic, ver christmas_period)
+    por sucursal, familia y día: units_sold del día `day` es la suma desde el
+    1/oct hasta ese día inclusive (day 0 = 1/oct). Densa desde el día 0 hasta
+    el último día con ventas de la temporada en todo el dataset, así que
+    "acumulado al día de corte" es una lectura directa y cualquier rango
+    [a, b] de la temporada es cum[b] - cum[a - 1]. La mantiene el navidad
+    loader (ver core.services.season_cumulative) y se reconstruye con
+    `manage.py rebuild_season_cumulative`.
+    """
+    store = models.ForeignKey(Store, on_delete=models.CASCADE, related_name="+")
+    family = models.ForeignKey(Family, on_delete=models.CASCADE, related_name="+")
+    season = models.PositiveSmallIntegerField()  # año de la temporada
+    day = models.PositiveSmallIntegerField()  # días desde el 1/oct
+    units_sold = models.DecimalField(max_digits=16, decimal_places=2)
+
+    class Meta:
+        unique_together = (("store", "family", "season", "day"),)
+        indexes = [
+            models.Index(fields=["season", "day"]),
+        ]
+
+    def __str__(self):
+        return f"{self.store_id} | {self.family_id} | {self.season}+{self.day}: {self.units_sold}"
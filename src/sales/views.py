@@ -1,13 +1,16 @@
 from datetime import date, timedelta
+from itertools import accumulate
 
-from django.db.models import Max, Sum
-from django.db.models.functions import ExtractYear, TruncDay
+from django.db.models import F, Sum
+from django.db.models.functions import TruncDay
 from django.http import JsonResponse
 from django.shortcuts import render
 
 from core.models import Family, Region, Store, Zone
+from core.services import dataset_catalog as catalog
+from core.services import rollups, season_cube, season_cumulative
+from core.services.response_cache import cached_json
 from core.utils.periods import christmas_period
-from stock.models import StockRecord
 
 from .models import SalesRecord
 
@@ -57,6 +60,7 @@ def sales_by_zone_view(request):
     })
 
 
+@cached_json({"zone_id": None, "family_id": None})
 def sales_by_zone_data(request):
     zone_id = request.GET.get("zone_id")
     family_id = request.GET.get("family_id") or None
@@ -74,30 +78,18 @@ def sales_by_zone_data(request):
 
     start, end = christmas_period(pivot_year)
     # limitar el fin al ultimo dia con datos en el ano pivot
-    max_date = (
-        SalesRecord.objects
-        .filter(store__zone_id=zone_id, date__year=pivot_year)
-        .aggregate(Max("date"))
-        .get("date__max")
+    max_date = catalog.last_date(
+        catalog.SALES, date(pivot_year, 1, 1), date(pivot_year, 12, 31), store__zone_id=zone_id,
     )
     end_date = max_date if max_date and max_date >= start else end
 
     filters = {
         "store__zone_id": zone_id,
         "store__is_distribution_center": False,
-        "date__range": (start, end_date),
     }
     if family_id:
         filters["family_id"] = family_id
 
-    # ventas diarias por sucursal
-    daily = (
-        SalesRecord.objects
-        .filter(**filters)
-        .values("store_id", "store__code", "store__name", "date")
-        .annotate(units=Sum("units_sold"))
-    )
-
     # eje X (MM-DD)
     labels = []
     cur = start
@@ -105,26 +97,54 @@ def sales_by_zone_data(request):
         labels.append(cur.strftime("%m-%d"))
         cur += timedelta(days=1)
 
-    # agrupar por store
+    # acumulado por store: del cubo o de la tabla de acumulados si estan cargados
     store_data = {}
-    for row in daily:
-        sid = row["store_id"]
-        info = store_data.setdefault(sid, {
-            "label": f"{row['store__code']} - {row['store__name']}".strip(" -"),
-            "map": {},
-        })
-        info["map"][row["date"]] = float(row["units"] or 0)
+    cube = season_cube.current()
+    by_store = cube.daily_by_store(season_cube.SALES, pivot_year, filters) if cube is not None else None
+    cumulative = None
+    if by_store is None:
+        cumulative = season_cumulative.cumulative_series(
+            pivot_year, end_date, filters, ("store_id", "store__code", "store__name"),
+        )
+    if by_store is not None:
+        last = (end_date - start).days
+        stores = Store.objects.in_bulk([sid for sid, daily in by_store.items() if any(daily[:last + 1])])
+        for sid, daily in by_store.items():
+            if sid in stores:
+                store_data[sid] = {
+                    "label": f"{stores[sid].code} - {stores[sid].name}".strip(" -"),
+                    "series": list(accumulate(daily[:last + 1])),
+                }
+    elif cumulative is not None:
+        for (sid, code, name), series in cumulative.items():
+            store_data[sid] = {"label": f"{code} - {name}".strip(" -"), "series": series}
+    else:
+        # ventas diarias por sucursal
+        daily = (
+            SalesRecord.objects
+            .filter(**filters, date__range=(start, end_date))
+            .values("store_id", "store__code", "store__name", "date")
+            .annotate(units=Sum("units_sold"))
+        )
+        day_maps = {}
+        for row in daily:
+            sid = row["store_id"]
+            store_data.setdefault(sid, {"label": f"{row['store__code']} - {row['store__name']}".strip(" -")})
+            day_maps.setdefault(sid, {})[row["date"]] = float(row["units"] or 0)
+        for sid, info in store_data.items():
+            series = []
+            acc = 0.0
+            cur = start
+            while cur <= end_date:
+                acc += day_maps[sid].get(cur, 0.0)
+                series.append(acc)
+                cur += timedelta(days=1)
+            info["series"] = series
 
     datasets = []
     total_units = 0.0
     for sid, info in store_data.items():
-        series = []
-        acc = 0.0
-        cur = start
-        while cur <= end_date:
-            acc += info["map"].get(cur, 0.0)
-            series.append(acc)
-            cur += timedelta(days=1)
+        series = info["series"]
         if sum(series) <= 0:
             continue
         total_units += series[-1] if series else 0.0
@@ -164,23 +184,20 @@ def _years_to_compare(pivot_year: int, available: list[int]) -> list[int]:
 
 
 def _available_years():
-    y1 = SalesRecord.objects.annotate(y=ExtractYear("date")).values_list("y", flat=True)
-    y2 = StockRecord.objects.annotate(y=ExtractYear("date")).values_list("y", flat=True)
-    return sorted({int(y) for y in list(y1) + list(y2) if y is not None})
+    return catalog.available_years()
 
 
 def _latest_sales_year():
-    vals = SalesRecord.objects.annotate(y=ExtractYear("date")).values_list("y", flat=True)
-    years = [int(v) for v in vals if v is not None]
-    return max(years) if years else None
+    return catalog.latest_year(catalog.SALES)
 
 
 def _coherent_scope_from_request(request):
     """Devuelve un dict con filtros coherentes. Si hay sucursal, fuerza region/zone a las de la sucursal."""
-    region_id = request.GET.get("region_id") or None
-    zone_id = request.GET.get("zone_id") or None
-    store_code = request.GET.get("store_code") or None
-    family_id = request.GET.get("family_id") or None
+    # Sin espacios, igual que la clave del cache de respuestas (response_cache.request_scope).
+    region_id = request.GET.get("region_id", "").strip() or None
+    zone_id = request.GET.get("zone_id", "").strip() or None
+    store_code = request.GET.get("store_code", "").strip() or None
+    family_id = request.GET.get("family_id", "").strip() or None
 
     scope = {}
     if store_code:
@@ -204,6 +221,23 @@ def _coherent_scope_from_request(request):
     return scope
 
 
+def _scope_meta(scope):
+    """
+    meta.scope de la respuesta desde el ámbito ya resuelto (no desde request.GET):
+    las consultas que comparten entrada en el cache reciben el mismo.
+    """
+    def param(value):
+        return str(value) if value is not None else None
+
+    return {
+        "region_id": param(scope.get("store__region_id")),
+        "zone_id": param(scope.get("store__zone_id")),
+        "store_code": scope.get("store__code"),
+        "family_id": param(scope.get("family_id")),
+    }
+
+
+@cached_json({"year": "2025", "region_id": None, "zone_id": None, "store_code": None, "family_id": None})
 def curves_data(request):
     """
     Ventas diarias acumuladas (1/oct-31/dic) comparando 3 anos:
@@ -226,29 +260,25 @@ def curves_data(request):
         cur += timedelta(days=1)
 
     datasets = []
+    cube = season_cube.current()
+    rollup = rollups.rollup_for(scope)  # zona/region/todas; None si hay sucursal
     for y in years:
         s, e = christmas_period(y)
-        filters = {"date__range": (s, e), "store__is_distribution_center": False}
-        filters.update(scope)
-
-        daily = (SalesRecord.objects
-                 .filter(**filters)
-                 .annotate(d=TruncDay("date"))
-                 .values("d")
-                 .annotate(units=Sum("units_sold"))
-                 .order_by("d"))
-
-        # mapa fecha->unidades
-        m = {row["d"]: float(row["units"] or 0) for row in daily}
-
-        # construir serie diaria en orden y acumular
-        cur = s
-        series = []
-        acc = 0.0
-        while cur <= e:
-            acc += m.get(cur, 0.0)
-            series.append(acc)
-            cur += timedelta(days=1)
+        daily = None
+        if cube is not None:
+            daily = cube.daily_totals(season_cube.SALES, y, {**scope, "store__is_distribution_center": False})
+        cumulative = None
+        if daily is None and rollup is None:
+            # Sucursal: la curva acumulada se lee directo de la tabla de acumulados.
+            cumulative = season_cumulative.cumulative_series(
+                y, e, {**scope, "store__is_distribution_center": False},
+            )
+        if daily is not None:
+            series = list(accumulate(daily))
+        elif cumulative is not None:
+            series = cumulative.get((), [])
+        else:
+            series = _accumulated_series(rollup, scope, s, e)
 
         # nuevo: no enviar series sin datos reales
         if sum(series) <= 0:
@@ -266,17 +296,45 @@ def curves_data(request):
             "pivot_year": pivot_year,
             "years_compared": years,
             "available_years": available,
-            "scope": {
-                "region_id": request.GET.get("region_id"),
-                "zone_id": request.GET.get("zone_id"),
-                "store_code": request.GET.get("store_code"),
-                "family_id": request.GET.get("family_id"),
-            },
+            "scope": _scope_meta(scope),
             "note": "Si se elige sucursal, region/zona se fuerzan a la de esa sucursal."
         }
     })
 
 
+def _accumulated_series(rollup, scope, s, e):
+    """Ventas diarias (del rollup o de SalesRecord) acumuladas en Python, un valor por dia de s a e."""
+    if rollup is not None:
+        daily = (rollup
+                 .filter(date__range=(s, e), is_cdr=False)
+                 .values(d=F("date"))
+                 .annotate(units=Sum("units_sold"))
+                 .order_by("d"))
+    else:
+        filters = {"date__range": (s, e), "store__is_distribution_center": False}
+        filters.update(scope)
+
+        daily = (SalesRecord.objects
+                 .filter(**filters)
+                 .annotate(d=TruncDay("date"))
+                 .values("d")
+                 .annotate(units=Sum("units_sold"))
+                 .order_by("d"))
+
+    # mapa fecha->unidades
+    m = {row["d"]: float(row["units"] or 0) for row in daily}
+
+    # construir serie diaria en orden y acumular
+    cur = s
+    series = []
+    acc = 0.0
+    while cur <= e:
+        acc += m.get(cur, 0.0)
+        series.append(acc)
+        cur += timedelta(days=1)
+    return series
+
+
 # ---------------------------
 # Estado de ventas 2025 (pivot = ultimo dia cargado 2025)
 # ---------------------------
@@ -306,13 +364,10 @@ def _store_sort_key(st):
 def _pivot_range_2025(region_id: int | str | None):
     pivot_year = 2025
     start = date(pivot_year, 10, 1)
-    qs = SalesRecord.objects.filter(
-        store__is_distribution_center=False,
-        date__year=pivot_year,
-    )
+    filters = {"store__is_distribution_center": False}
     if region_id:
-        qs = qs.filter(store__region_id=region_id)
-    end = qs.aggregate(Max("date")).get("date__max")
+        filters["store__region_id"] = region_id
+    end = catalog.last_date(catalog.SALES, date(pivot_year, 1, 1), date(pivot_year, 12, 31), **filters)
     if not end or end < start:
         return None, None
     length = (end - start).days + 1
@@ -324,6 +379,28 @@ def _pivot_range_2025(region_id: int | str | None):
 def _collect_units_by(scope_filters, date_range):
     """Devuelve mapa {(family_id, entity_id): units}."""
     group_field = scope_filters.pop("_group_field")
+    cube = season_cube.current()
+    if cube is not None:
+        totals = cube.totals(season_cube.SALES, *date_range, scope_filters, ("family_id", group_field))
+        if totals is not None:
+            return totals
+    # Por zona dentro de una region (sin CDR): sale del rollup de zonas.
+    rollup = None
+    if group_field == "store__zone_id" and scope_filters.get("store__is_distribution_center") is False:
+        rollup = rollups.rollup_for({"store__region_id": scope_filters["store__region_id"]}, by_zone=True)
+    if rollup is not None:
+        qs = (rollup
+              .filter(is_cdr=False, date__range=date_range)
+              .values("family_id", "zone_id")
+              .annotate(units=Sum("units_sold")))
+        return {(row["family_id"], row["zone_id"]): float(row["units"] or 0) for row in qs}
+
+    # Rango 1/oct -> corte: acumulado al corte desde la tabla de acumulados.
+    if date_range[0] == christmas_period(date_range[0].year)[0]:
+        cumulative = season_cumulative.cumulative_at(date_range[1], scope_filters, ("family_id", group_field))
+        if cumulative is not None:
+            return cumulative
+
     qs = (SalesRecord.objects
           .filter(**scope_filters, date__range=date_range)
           .values("family_id", group_field)
@@ -336,6 +413,7 @@ def _collect_units_by(scope_filters, date_range):
     return data
 
 
+@cached_json({"region_id": None, "zone_id": None})
 def status_overview_data(request):
     region_id = request.GET.get("region_id") or _default_region_id()
     zone_id = request.GET.get("zone_id") or None
@@ -0,0 +1,90 @@
+"""
+Benchmark: memoria por chunk parseado y latencia de escritura por chunk.
+
+Uso:
+  cd src
+  python scripts/bench_chunk_memory.py [--stores 60] [--families 40] [--days 42] [--chunk-size 10000]
+
+Usa una BD de test descartable (no toca db.sqlite3).
+1. Memoria (tracemalloc) que retiene un chunk de `--chunk-size` filas parseado:
+   ParsedChunk (columnas) vs el formato anterior (un dict por fila, to_dicts()).
+2. Pico de memoria de una importación de un solo chunk: carga inicial y
+   re-importación con merge/upsert.
+3. Latencia de escritura por chunk (summary["write_seconds"] / chunks) para la
+   carga completa de `--days` días y su re-importación con merge y upsert.
+   Sin tracemalloc (lo hace varias veces más lento).
+"""
+import argparse
+import tempfile
+import tracemalloc
+from itertools import islice
+from pathlib import Path
+
+import navidad_synth as synth
+
+COL_INDICES = {
+    "Dia": 0, "Region": 1, "Zona": 2, "Sucursal": 3, "SubFamilia": 4,
+    "Unidades Stock Final": 5, "Unidades Vendidas": 6,
+}
+
+
+def retained(fn):
+    tracemalloc.start()
+    try:
+        result = fn()
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, current, peak
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--stores', type=int, default=60)
+    parser.add_argument('--families', type=int, default=40)
+    parser.add_argument('--days', type=int, default=42)
+    parser.add_argument('--chunk-size', type=int, default=10_000)
+    args = parser.parse_args()
+
+    synth.setup_django()
+
+    from core.services.navidad_loader import parse_chunk, process_navidad_file
+    from sales.models import SalesRecord
+    from stock.models import StockRecord
+
+    rows = lambda days: synth.iter_rows(args.stores, args.families, days)  # noqa: E731
+    per = 10_000 / args.chunk_size
+
+    with synth.test_database(), tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        synth.seed_dimensions(args.stores, args.families)
+
+        raw = list(islice(rows(args.days), args.chunk_size))
+        chunk, columnar, _ = retained(lambda: parse_chunk(raw, COL_INDICES, 0))
+        _, dicts, _ = retained(chunk.to_dicts)
+        print(f"chunk parseado ({len(chunk)} filas), MB cada 10k filas:")
+        print(f"  columnas (ParsedChunk) {columnar * per / 1e6:8.2f}")
+        print(f"  dict por fila          {dicts * per / 1e6:8.2f}")
+
+        one_chunk = synth.write_workbook(tmp / "one.xlsx", islice(rows(args.days), args.chunk_size))
+        print("pico de memoria importando un chunk, MB cada 10k filas:")
+        for label, mode in (("carga", "merge"), ("re-import", "merge"), ("re-import", "upsert")):
+            _, _, peak = retained(lambda: synth.quiet_call(
+                process_navidad_file, one_chunk, sheet=None, write_mode=mode, chunk_size=args.chunk_size,
+            ))
+            print(f"  {label:9} {mode:6} {peak * per / 1e6:8.1f}")
+
+        StockRecord.objects.all().delete()
+        SalesRecord.objects.all().delete()
+        path = synth.write_workbook(tmp / "season.xlsx", rows(args.days))
+        print(f"escritura por chunk ({args.days} días):")
+        for label, mode in (("carga", "merge"), ("re-import", "merge"), ("re-import", "upsert")):
+            s = synth.quiet_call(
+                process_navidad_file, path, sheet=None, write_mode=mode, chunk_size=args.chunk_size,
+            )
+            ms = s["write_seconds"] * 1000 / max(1, s["chunks_written"])
+            print(f"  {label:9} {mode:6} {ms:8.0f} ms/chunk  ({s['chunks_written']} chunks, {s['rows']} filas)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+"""
+Benchmark: detección de encabezados con pre-lectura pandas (antes) vs. sobre el
+mismo iterador read_only de openpyxl (después).
+
+Uso:
+  cd src
+  python scripts/bench_header.py [--rows 300000] [--file ruta.xlsx]
+
+Genera un workbook sintético grande (o usa --file) y mide cada variante en un
+proceso aparte para que el pico de RSS (ru_maxrss) sea comparable:
+- antes:   pd.read_excel(header=None, nrows=100) + load_workbook + recorrido completo
+- despues: load_workbook + primeras filas del iterador + recorrido completo
+No toca la BD: solo mide lectura/encabezados.
+"""
+import argparse
+import json
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from itertools import chain, islice
+from pathlib import Path
+
+import navidad_synth as synth
+
+
+def _peak_rss_mb() -> float:
+    # Linux reporta KiB, macOS bytes.
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+def measure(mode: str, path: Path) -> dict:
+    import pandas as pd
+    from openpyxl import load_workbook
+
+    from core.services.navidad_loader import HEADER_SCAN_ROWS, _header_from_rows
+
+    t0 = time.perf_counter()
+    if mode == "antes":
+        raw = pd.read_excel(path, sheet_name=0, header=None, nrows=100)
+        head = [tuple(None if pd.isna(v) else v for v in r) for r in raw.itertuples(index=False)]
+        _, data_start = _header_from_rows(head)
+        t_header = time.perf_counter() - t0
+        wb = load_workbook(path, read_only=True, data_only=True)
+        rows = wb.active.iter_rows(min_row=data_start + 1, values_only=True)
+    else:
+        wb = load_workbook(path, read_only=True, data_only=True)
+        rows_iter = wb.active.iter_rows(values_only=True)
+        head = list(islice(rows_iter, HEADER_SCAN_ROWS))
+        _, data_start = _header_from_rows(head)
+        t_header = time.perf_counter() - t0
+        rows = chain(head[data_start:], rows_iter)
+
+    n = sum(1 for _ in rows)
+    wb.close()
+    return {
+        "mode": mode,
+        "rows": n,
+        "header_seconds": t_header,
+        "total_seconds": time.perf_counter() - t0,
+        "peak_rss_mb": _peak_rss_mb(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=300_000, help='Filas aproximadas del workbook sintético')
+    parser.add_argument('--file', default=None, help='Usar un xlsx existente en vez de generar uno')
+    parser.add_argument('--measure', default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    synth.setup_django()
+
+    if args.measure:
+        print(json.dumps(measure(args.measure, Path(args.file))))
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(args.file) if args.file else None
+        if path is None:
+            stores, families = 100, 50
+            days = max(1, args.rows // (stores * families))
+            path = synth.write_workbook(Path(tmp) / "big.xlsx", synth.iter_rows(stores, families, days))
+        print(f"archivo={path.name} tamaño={path.stat().st_size / 1e6:.1f} MB")
+
+        for mode in ("antes", "despues"):
+            out = subprocess.run(
+                [sys.executable, __file__, "--measure", mode, "--file", str(path)],
+                check=True, capture_output=True, text=True,
+            )
+            r = json.loads(out.stdout.strip().splitlines()[-1])
+            print(
+                f"  {r['mode']:8} filas={r['rows']}  encabezado={r['header_seconds']:.2f}s  "
+                f"total={r['total_seconds']:.2f}s  pico_rss={r['peak_rss_mb']:.0f} MB"
+            )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,205 @@
+"""
+Benchmark de throughput del navidad loader (process_navidad_file de punta a punta).
+
+Uso:
+  cd src
+  python scripts/bench_import.py [--stores 60] [--families 40] [--days 30] [--density 1.0]
+      [--formats xlsx,csv] [--clean] [--modes merge,upsert] [--scenarios load,reimport]
+      [--chunk-size 10000] [--reader openpyxl] [--workers 0] [--repeat 1]
+      [--output resultados.json] [--compare anterior.json]
+
+Genera un archivo sintético por formato (sucursales × subfamilias × días; por
+default desprolijo: filas arriba del encabezado, encabezados con alias, coma
+decimal; ver navidad_synth) y, para cada formato × modo × escenario, importa en
+una BD SQLite nueva (archivo temporal con las migraciones aplicadas, nunca
+db.sqlite3):
+- load: BD vacía (solo el maestro), todo se crea;
+- reimport: BD que ya tiene el mismo archivo cargado, todo se actualiza.
+
+Cada importación medida corre en un proceso nuevo, así la memoria pico
+(ru_maxrss, incluye Django) es la de esa corrida y no la del benchmark entero.
+Por caso se reporta filas/s, memoria pico, tiempo y queries por fase (los
+mismos del summary / ImportRun) y los contadores.
+
+--output escribe el resultado en JSON (meta del entorno + un registro por
+corrida); --compare toma un JSON anterior y muestra la variación de filas/s
+por caso (mediana de las repeticiones).
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import navidad_synth as synth
+
+SUMMARY_KEYS = (
+    "rows", "stock_created", "stock_updated", "stock_skipped", "sales_created", "sales_updated", "sales_skipped",
+    "elapsed_seconds", "rows_per_sec", "peak_memory_bytes", "chunks_written", "queries",
+)
+PHASE_KEYS = (
+    "header_seconds", "read_seconds", "parse_seconds", "lookup_seconds", "write_seconds", "finish_seconds",
+)
+
+
+def _use_database(db_path: str):
+    """En el proceso hijo: apunta Django a la BD SQLite del caso antes del setup."""
+    os.environ["DATABASE_URL"] = f"sqlite:///{db_path}"
+    synth.setup_django()
+
+
+def prepare_database(db_path: str, stores: int, families: int, preload: str | None, options: dict):
+    """Proceso hijo: migra, carga el maestro y, para reimport, importa el archivo una vez."""
+    _use_database(db_path)
+    from django.core.management import call_command
+
+    call_command("migrate", verbosity=0)
+    synth.seed_dimensions(stores, families)
+    if preload:
+        from core.services.navidad_loader import process_navidad_file
+
+        synth.quiet_call(process_navidad_file, Path(preload), sheet=None, **options)
+
+
+def measure_import(db_path: str, path: str, options: dict) -> dict:
+    """Proceso hijo: la importación medida. Retorna las claves del summary que interesan."""
+    _use_database(db_path)
+    from core.services.navidad_loader import process_navidad_file
+
+    summary = synth.quiet_call(process_navidad_file, Path(path), sheet=None, **options)
+    result = {key: summary.get(key) for key in SUMMARY_KEYS}
+    result["phases"] = {key.removesuffix("_seconds"): round(summary[key], 4) for key in PHASE_KEYS}
+    return result
+
+
+def in_child(fn, *args):
+    """Corre fn en un proceso spawn nuevo (memoria pico y conexiones propias)."""
+    ctx = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=1, mp_context=ctx) as pool:
+        return pool.submit(fn, *args).result()
+
+
+def environment() -> dict:
+    import sqlite3
+
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except Exception:
+        commit = None
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "git_commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "sqlite": sqlite3.sqlite_version,
+    }
+
+
+def case_key(result: dict) -> tuple:
+    return (result["format"], result["scenario"], result["write_mode"])
+
+
+def median_rates(results: list[dict]) -> dict[tuple, float]:
+    by_case: dict[tuple, list[float]] = {}
+    for r in results:
+        by_case.setdefault(case_key(r), []).append(r["rows_per_sec"])
+    return {k: statistics.median(v) for k, v in by_case.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--stores', type=int, default=60)
+    parser.add_argument('--families', type=int, default=40)
+    parser.add_argument('--days', type=int, default=30)
+    parser.add_argument('--density', type=float, default=1.0,
+                        help='Fracción de pares (sucursal, subfamilia) presentes en el archivo')
+    parser.add_argument('--formats', default='xlsx,csv')
+    parser.add_argument('--clean', action='store_true', help='Archivo prolijo (sin encabezados ni números desprolijos)')
+    parser.add_argument('--modes', default='merge,upsert')
+    parser.add_argument('--scenarios', default='load,reimport')
+    parser.add_argument('--chunk-size', type=int, default=10_000)
+    parser.add_argument('--reader', default='openpyxl', choices=['openpyxl', 'raw'])
+    parser.add_argument('--workers', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=1)
+    parser.add_argument('--output', default=None, help='Archivo JSON de resultados')
+    parser.add_argument('--compare', default=None, help='JSON de una corrida anterior para comparar filas/s')
+    args = parser.parse_args()
+
+    formats = [f for f in args.formats.split(',') if f]
+    modes = [m for m in args.modes.split(',') if m]
+    scenarios = [s for s in args.scenarios.split(',') if s]
+    writers = {"xlsx": synth.write_workbook, "csv": synth.write_delimited}
+    for fmt in formats:
+        if fmt not in writers:
+            parser.error(f"formato desconocido: {fmt}")
+
+    results = []
+    with tempfile.TemporaryDirectory(prefix="bench_import_") as tmp:
+        tmp = Path(tmp)
+        files = {}
+        for fmt in formats:
+            rows = synth.iter_rows(args.stores, args.families, args.days, density=args.density)
+            files[fmt] = writers[fmt](tmp / f"navidad.{fmt}", rows, messy=not args.clean)
+
+        for fmt in formats:
+            for mode in modes:
+                options = {
+                    "write_mode": mode, "chunk_size": args.chunk_size, "reader": args.reader,
+                    "workers": args.workers, "backend": "orm",
+                }
+                for scenario in scenarios:
+                    for rep in range(args.repeat):
+                        db = tmp / f"bench_{fmt}_{mode}_{scenario}_{rep}.sqlite3"
+                        preload = str(files[fmt]) if scenario == "reimport" else None
+                        in_child(prepare_database, str(db), args.stores, args.families, preload, options)
+                        result = in_child(measure_import, str(db), str(files[fmt]), options)
+                        db.unlink()
+                        result.update(
+                            format=fmt, scenario=scenario, write_mode=mode, repeat=rep,
+                            file_bytes=files[fmt].stat().st_size,
+                        )
+                        results.append(result)
+                        print(
+                            f"{fmt:4} {mode:6} {scenario:8} #{rep}: {result['rows']} filas "
+                            f"{result['rows_per_sec']:9.0f} filas/s  "
+                            f"pico={result['peak_memory_bytes'] / 2**20:6.1f} MB  "
+                            f"fases={result['phases']}  queries={result['queries']}",
+                            file=sys.stderr, flush=True,
+                        )
+
+    report = {
+        "meta": environment(),
+        "params": {
+            "stores": args.stores, "families": args.families, "days": args.days, "density": args.density,
+            "messy": not args.clean, "chunk_size": args.chunk_size, "reader": args.reader,
+            "workers": args.workers, "repeat": args.repeat,
+        },
+        "results": results,
+    }
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        Path(args.output).write_text(text, encoding="utf-8")
+    else:
+        print(text)
+
+    if args.compare:
+        previous = median_rates(json.loads(Path(args.compare).read_text(encoding="utf-8"))["results"])
+        print("\nfilas/s vs anterior (mediana):", file=sys.stderr)
+        for key, rate in median_rates(results).items():
+            before = previous.get(key)
+            delta = f"{(rate / before - 1) * 100:+6.1f}%" if before else "   (nuevo)"
+            print(f"  {' '.join(key):28} {rate:9.0f}  {delta}", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+"""
+Benchmark: búsqueda de existentes del merge, filtro cartesiano
+(store_id__in × family_id__in × date__in) vs claves exactas (navidad_keys).
+
+Uso:
+  cd src
+  python scripts/bench_lookup.py [--stores 60] [--families 40] [--days 30] [--density 0.3] [--chunk-size 10000]
+
+Usa una BD de test descartable (no toca db.sqlite3). Carga `--days` días con
+todas las sucursales × subfamilias; después arma un archivo de los mismos días
+con solo una fracción `--density` de los pares (sucursal, subfamilia) y, por
+cada chunk, mide ambas búsquedas sobre sus claves de stock: filas traídas y
+tiempo por chunk. Al final re-importa ese archivo con el loader (merge) y
+muestra sus contadores lookup_*.
+"""
+import argparse
+import tempfile
+import time
+from itertools import islice
+from pathlib import Path
+
+import navidad_synth as synth
+
+
+def chunk_keys(rows, dims, chunk_size: int):
+    """Claves (store_id, family_id, date) de stock de cada chunk, como las arma el loader."""
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return
+        keys = set()
+        for dt, _, _, code, origen, _, _ in chunk:
+            store = dims.stores.get(code)
+            family_id = dims.families.get(origen)
+            if store is not None and family_id is not None:
+                keys.add((store.id, family_id, dt))
+        yield keys
+
+
+def cartesian(model, keys):
+    return list(model.objects.filter(
+        store_id__in={k[0] for k in keys},
+        family_id__in={k[1] for k in keys},
+        date__in={k[2] for k in keys},
+    ))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--stores', type=int, default=60)
+    parser.add_argument('--families', type=int, default=40)
+    parser.add_argument('--days', type=int, default=30)
+    parser.add_argument('--density', type=float, default=0.3,
+                        help='Fracción de pares (sucursal, subfamilia) presentes en el archivo')
+    parser.add_argument('--chunk-size', type=int, default=10_000)
+    args = parser.parse_args()
+
+    synth.setup_django()
+
+    from core.services.navidad_dims import DimensionIndex
+    from core.services.navidad_keys import fetch_existing
+    from core.services.navidad_loader import process_navidad_file
+    from stock.models import StockRecord
+
+    rows = lambda: synth.iter_rows(args.stores, args.families, args.days, density=args.density)  # noqa: E731
+
+    with synth.test_database(), tempfile.TemporaryDirectory() as tmp:
+        synth.seed_dimensions(args.stores, args.families)
+        base = synth.write_workbook(
+            Path(tmp) / "base.xlsx", synth.iter_rows(args.stores, args.families, args.days)
+        )
+        synth.quiet_call(process_navidad_file, base, sheet=None, chunk_size=args.chunk_size)
+        path = synth.write_workbook(Path(tmp) / "sparse.xlsx", rows())
+        dims = DimensionIndex.load()
+
+        results = {"cartesiano": [0, 0.0], "exacto": [0, 0.0]}
+        n_chunks = n_keys = 0
+        for keys in chunk_keys(rows(), dims, args.chunk_size):
+            n_chunks += 1
+            n_keys += len(keys)
+            for name, fn in (("cartesiano", cartesian), ("exacto", fetch_existing)):
+                t0 = time.perf_counter()
+                fetched = fn(StockRecord, keys)
+                results[name][1] += time.perf_counter() - t0
+                results[name][0] += len(fetched)
+
+        summary = synth.quiet_call(process_navidad_file, path, sheet=None, chunk_size=args.chunk_size)
+
+    print(
+        f"stores={args.stores} families={args.families} days={args.days} density={args.density} "
+        f"chunks={n_chunks} claves_stock={n_keys}"
+    )
+    for name, (fetched, seconds) in results.items():
+        print(
+            f"  {name:10} filas_traidas={fetched:9d}  "
+            f"{seconds * 1000 / max(1, n_chunks):8.1f} ms/chunk"
+        )
+    print(
+        f"  loader merge: claves={summary['lookup_keys']} encontradas={summary['lookup_rows_fetched']} "
+        f"lookup={summary['lookup_seconds'] * 1000 / max(1, n_chunks):.1f} ms/chunk"
+    )
+
+
+if __name__ == '__main__':
+    main()
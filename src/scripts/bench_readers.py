@@ -0,0 +1,50 @@
+"""
+Benchmark: lectores de xlsx del navidad loader (openpyxl read_only vs raw).
+
+Uso:
+  cd src
+  python scripts/bench_readers.py [--rows 200000] [--file ruta.xlsx] [--sheet Hoja]
+
+Mide filas/s de cada lector recorriendo el mismo archivo completo (apertura
+incluida). No toca la BD.
+"""
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+import navidad_synth as synth
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=200_000, help='Filas aproximadas del workbook sintético')
+    parser.add_argument('--file', default=None, help='Usar un xlsx existente en vez de generar uno')
+    parser.add_argument('--sheet', default=None, help='Hoja (nombre)')
+    args = parser.parse_args()
+
+    synth.setup_django()
+    from core.services.navidad_readers import XLSX_READERS, open_row_source
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(args.file) if args.file else None
+        if path is None:
+            stores, families = 100, 50
+            days = max(1, args.rows // (stores * families))
+            path = synth.write_workbook(Path(tmp) / "big.xlsx", synth.iter_rows(stores, families, days))
+        print(f"archivo={path.name} tamaño={path.stat().st_size / 1e6:.1f} MB")
+
+        for reader in XLSX_READERS:
+            t0 = time.perf_counter()
+            with open_row_source(path, args.sheet, reader=reader) as source:
+                t_open = time.perf_counter() - t0
+                n = sum(1 for _ in source.rows)
+            elapsed = time.perf_counter() - t0
+            print(
+                f"  {reader:9} filas={n}  apertura={t_open:.2f}s  total={elapsed:.2f}s  "
+                f"{n / elapsed:10.0f} filas/s"
+            )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+"""
+Benchmark: write_mode="merge" vs "upsert" vs "replace" en una re-importación
+donde casi todas las filas ya existen.
+
+Uso:
+  cd src
+  python scripts/bench_upsert.py [--stores 60] [--families 40] [--days 30] [--new-days 2] [--modes merge,upsert,replace]
+
+Recarga de temporada completa (replace vs merge):
+  python scripts/bench_upsert.py --days 92 --new-days 0 --modes merge,replace
+
+Usa una BD de test descartable (no toca db.sqlite3). Para cada modo:
+1. carga el archivo base (`--days` días),
+2. re-importa el archivo con `--new-days` días extra (la mayoría ya existe) y mide ese paso.
+"""
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+import navidad_synth as synth
+
+
+def run_mode(mode: str, base_file: Path, reimport_file: Path, args) -> dict:
+    from core.models import Family, Region, Store, Zone
+    from core.services.navidad_loader import process_navidad_file
+    from sales.models import SalesRecord
+    from stock.models import StockRecord
+
+    SalesRecord.objects.all().delete()
+    StockRecord.objects.all().delete()
+    Store.objects.all().delete()
+    Zone.objects.all().delete()
+    Region.objects.all().delete()
+    Family.objects.all().delete()
+    synth.seed_dimensions(args.stores, args.families)
+
+    synth.quiet_call(process_navidad_file, base_file, sheet=None, chunk_size=args.chunk_size)
+
+    t0 = time.perf_counter()
+    summary = synth.quiet_call(
+        process_navidad_file,
+        reimport_file,
+        sheet=None,
+        chunk_size=args.chunk_size,
+        write_mode=mode,
+    )
+    elapsed = time.perf_counter() - t0
+    return {"mode": mode, "seconds": elapsed, "summary": summary}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--stores', type=int, default=60)
+    parser.add_argument('--families', type=int, default=40)
+    parser.add_argument('--days', type=int, default=30)
+    parser.add_argument('--new-days', type=int, default=2)
+    parser.add_argument('--chunk-size', type=int, default=10_000)
+    parser.add_argument('--modes', default='merge,upsert,replace',
+                        help='Modos a comparar, separados por coma')
+    args = parser.parse_args()
+
+    synth.setup_django()
+
+    with synth.test_database(), tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        synth.seed_dimensions(args.stores, args.families)
+        base_file = synth.write_workbook(
+            tmp / "base.xlsx", synth.iter_rows(args.stores, args.families, args.days)
+        )
+        reimport_file = synth.write_workbook(
+            tmp / "reimport.xlsx", synth.iter_rows(args.stores, args.families, args.days + args.new_days)
+        )
+
+        results = [run_mode(mode, base_file, reimport_file, args) for mode in args.modes.split(",")]
+
+    print(f"stores={args.stores} families={args.families} days={args.days}+{args.new_days}")
+    for r in results:
+        s = r["summary"]
+        rps = s["rows"] / r["seconds"] if r["seconds"] else 0.0
+        print(
+            f"  {r['mode']:7} {r['seconds']:8.2f}s  {rps:10.0f} filas/s  "
+            f"stock c/u/d={s['stock_created']}/{s['stock_updated']}/{s['stock_deleted']}  "
+            f"sales c/u/d={s['sales_created']}/{s['sales_updated']}/{s['sales_deleted']}"
+        )
+
+
+if __name__ == '__main__':
+    main()
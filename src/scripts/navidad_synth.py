@@ -0,0 +1,181 @@
+"""
+Generador de datos sintéticos para benchmarks del navidad loader.
+
+No se ejecuta solo: lo importan los scripts `bench_*.py` de esta carpeta.
+Arma un workbook con el mismo layout que el archivo real (una fila de título
+arriba de los encabezados) y carga el maestro (regiones, zonas, sucursales,
+familias) en la BD activa. Con messy=True (xlsx o csv) imita los exports
+desprolijos: varias filas arriba del encabezado, encabezados con alias,
+mayúsculas, acentos y saltos de línea, una columna extra, códigos con ceros a
+la izquierda, números como texto con coma decimal y separador de miles, y
+algunas fechas como texto dd/mm/aaaa.
+"""
+import contextlib
+import csv
+import io
+import os
+import sys
+from datetime import date, timedelta
+from pathlib import Path
+
+from openpyxl import Workbook
+
+HEADERS = [
+    "Día", "Región", "Zona", "Sucursal",
+    "SubFamilia", "Unidades Stock Final", "Unidades Vendidas",
+]
+
+MESSY_TITLE_ROWS = [["Venta para Curvas"], ["Generado por el ERP - uso interno"], []]
+MESSY_HEADERS = [
+    "  Fecha ", "REGIÓN", "zona", "Tienda", "Sub Familia", "Stock Final\nUnidades", "Ventas Unidades",
+    "Observaciones",
+]
+TEXT_DATE_EVERY = 7  # con messy, una de cada N fechas va como texto
+
+
+def setup_django():
+    project_root = Path(__file__).resolve().parent.parent
+    if str(project_root) not in sys.path:
+        sys.path.insert(0, str(project_root))
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'retail_curves.settings')
+    import django
+    django.setup()
+
+
+@contextlib.contextmanager
+def test_database():
+    """Crea una BD de test descartable (nunca toca db.sqlite3) y la destruye al salir."""
+    from django.db import connection
+
+    old_name = connection.settings_dict["NAME"]
+    connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        yield connection
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+def store_codes(n_stores: int) -> list[str]:
+    return [str(i) for i in range(1, n_stores + 1)]
+
+
+def family_origins(n_families: int) -> list[str]:
+    return [f"SF{i:03d}" for i in range(1, n_families + 1)]
+
+
+def zone_names(n_regions: int = 3, zones_per_region: int = 4) -> list[tuple[str, str]]:
+    return [
+        (f"Region {r + 1}", f"Zona {r + 1}.{z + 1}")
+        for r in range(n_regions)
+        for z in range(zones_per_region)
+    ]
+
+
+def seed_dimensions(n_stores: int, n_families: int, n_regions: int = 3, zones_per_region: int = 4):
+    """Crea regiones/zonas/sucursales/familias. Una de cada 25 sucursales es CDR."""
+    from core.models import Family, Region, Store, Zone
+
+    zones = []
+    regions = {}
+    for region_name, zone_name in zone_names(n_regions, zones_per_region):
+        if region_name not in regions:
+            regions[region_name] = Region.objects.create(name=region_name)
+        zones.append(Zone.objects.create(region=regions[region_name], name=zone_name))
+
+    stores = []
+    for i, code in enumerate(store_codes(n_stores)):
+        zone = zones[i % len(zones)]
+        stores.append(Store(
+            code=code,
+            name=f"Sucursal {code}",
+            region_id=zone.region_id,
+            zone=zone,
+            is_distribution_center=(i % 25 == 24),
+        ))
+    Store.objects.bulk_create(stores)
+
+    Family.objects.bulk_create([
+        Family(origen=o, sector="Sector", familia_std=f"Familia {o}", subfamilia_std=o)
+        for o in family_origins(n_families)
+    ])
+    return zones
+
+
+def iter_rows(n_stores: int, n_families: int, days: int, start: date = date(2025, 10, 1), density: float = 1.0):
+    """
+    Filas de datos (sin encabezado) en el orden del export del ERP: día > sucursal > subfamilia.
+    Región/zona coinciden con lo que crea seed_dimensions (no consulta la BD).
+    density < 1 deja solo esa fracción de pares (sucursal, subfamilia), siempre los
+    mismos (como el archivo real, donde no toda sucursal tiene toda subfamilia).
+    """
+    areas = zone_names()
+    codes = store_codes(n_stores)
+    origins = family_origins(n_families)
+    for d in range(days):
+        dt = start + timedelta(days=d)
+        for ci, code in enumerate(codes):
+            region, zona = areas[ci % len(areas)]
+            for fi, origen in enumerate(origins):
+                if (ci * 131 + fi * 17) % 100 >= density * 100:
+                    continue
+                seed = (d * 31 + ci * 7 + fi * 3) % 97
+                yield (dt, region, zona, code, origen, float(seed * 2), float(seed % 13))
+
+
+def comma_decimal(value: float) -> str:
+    """1234.5 -> '1.234,50' (formato es-AR)."""
+    return f"{value:,.2f}".translate(str.maketrans(",.", ".,"))
+
+
+def messy_rows(rows):
+    """Filas de iter_rows con los valores como los deja un export desprolijo (ver docstring)."""
+    for i, (dt, region, zona, code, origen, stock, sold) in enumerate(rows):
+        yield (
+            dt.strftime("%d/%m/%Y") if i % TEXT_DATE_EVERY == 0 else dt,
+            region, zona, code.zfill(3), origen, comma_decimal(stock), comma_decimal(sold), "",
+        )
+
+
+def write_workbook(path: Path, rows, title: str = "Venta para Curvas", messy: bool = False) -> Path:
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Datos")
+    if messy:
+        for row in MESSY_TITLE_ROWS:
+            ws.append(row)
+        ws.append(MESSY_HEADERS)
+        rows = messy_rows(rows)
+    else:
+        ws.append([title])
+        ws.append(HEADERS)
+    for row in rows:
+        ws.append(row)
+    wb.save(path)
+    return path
+
+
+def write_delimited(path: Path, rows, messy: bool = False, delimiter: str = ";", encoding: str = "cp1252") -> Path:
+    """csv como el export del ERP: ';', cp1252, fechas dd/mm/aaaa y coma decimal."""
+    def cell(v):
+        if isinstance(v, date):
+            return v.strftime("%d/%m/%Y")
+        if isinstance(v, float):
+            return comma_decimal(v) if messy else str(v).replace(".", ",")
+        return v
+
+    with open(path, "w", encoding=encoding, newline="") as f:
+        writer = csv.writer(f, delimiter=delimiter)
+        if messy:
+            writer.writerows(MESSY_TITLE_ROWS)
+            writer.writerow(MESSY_HEADERS)
+            rows = messy_rows(rows)
+        else:
+            writer.writerow(["Venta para Curvas"])
+            writer.writerow(HEADERS)
+        writer.writerows([cell(v) for v in row] for row in rows)
+    return path
+
+
+def quiet_call(fn, *args, **kwargs):
+    """Ejecuta fn silenciando los print() de progreso del loader."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        return fn(*args, **kwargs)
@@ -3,9 +3,50 @@ Script para ejecutar la importación completa usando `process_navidad_file`.
 
 Uso:
   cd src
-  python scripts/run_import.py "C:\ruta\a\archivo.xlsx" [--sheet "Hoja"] [--pad 0] [--strict-area] [--backup] [--yes]
+  python scripts/run_import.py "C:\ruta\a\archivo.xlsx" [más archivos o globs...] [--sheet "Hoja" | --all-sheets] [--parse-workers N] [--writers N] [--pad 0] [--strict-area] [--write-mode merge|upsert|replace] [--backend auto|orm|copy] [--reader openpyxl|raw] [--workers N] [--commit atomic|chunk] [--resume] [--incremental] [--chunk-size N] [--adaptive] [--max-flush-seconds S] [--target-rows-per-sec R] [--dry-run [--rejects-csv rechazos.csv]] [--backup] [--yes]
+
+El archivo puede ser xlsx o csv/tsv (se detecta por contenido; en csv/tsv se
+detectan delimitador y encoding, y --sheet se ignora).
+
+Varios archivos / hojas: se aceptan varios archivos y globs ("regiones/*.xlsx")
+y, con --all-sheets, cada worksheet de cada xlsx es un objetivo aparte. Con más
+de un objetivo se leen y parsean en paralelo (--parse-workers procesos, default
+uno por CPU) y se escriben con un escritor coordinado: en SQLite uno por vez
+(commits en serie), en PostgreSQL hasta --writers en paralelo (default hasta 4).
+Cada objetivo es su propia importación (transacción e ImportRun); al final se
+imprime un resumen por archivo/hoja y los totales. No admite --resume,
+--adaptive ni --workers.
 
 Opciones:
+  --write-mode : merge (default) busca existentes y hace bulk_create/bulk_update;
+                 upsert usa INSERT ... ON CONFLICT DO UPDATE sin lookup previo
+                 replace borra el rango de fechas del archivo (para sus sucursales) e
+                 inserta todo de nuevo; para recargar un período completo
+  --backend    : auto (default) usa COPY+staging en PostgreSQL y ORM en SQLite;
+                 orm / copy fuerzan uno u otro (copy solo en PostgreSQL)
+  --reader     : openpyxl (default) o raw (XML directo del xlsx, más rápido;
+                 si el workbook no es soportado cae a openpyxl)
+  --workers    : 0 (default) secuencial; N > 0 activa el pipeline con un proceso lector,
+                 N procesos de parseo y escritura en orden (mismos contadores)
+  --commit     : atomic (default) todo en una transacción; chunk commitea cada chunk
+                 y guarda un checkpoint (ImportRun) con la última fila commiteada
+                 (toda corrida, salvo --dry-run, queda en ImportRun con contadores,
+                 tiempos por fase, filas/s y memoria pico; ver el admin)
+  --resume     : retoma desde el checkpoint la última corrida cortada del mismo
+                 archivo/hoja (implica --commit chunk)
+  --incremental: saltea las particiones (sucursal, día) que no cambiaron desde la
+                 última importación (el archivo acumulado diario se procesa en
+                 proporción a lo nuevo)
+  --chunk-size : filas por chunk (default 10000; con --adaptive es el tamaño inicial)
+  --adaptive   : ajusta el tamaño de cada chunk según lo que tardó en escribirse el
+                 anterior (crece mientras mejore el throughput, achica si pasa
+                 --max-flush-seconds; default 1s en SQLite, 10s en PostgreSQL)
+  --target-rows-per-sec : con --adaptive, deja de crecer al alcanzar estas filas/s
+  --dry-run    : valida el archivo sin escribir nada: lee, parsea y resuelve sucursales/
+                 familias en memoria e informa las filas rechazadas por motivo y los
+                 códigos/subfamilias sin match (no pide confirmación ni hace backup)
+  --rejects-csv: con --dry-run, vuelca las filas rechazadas a este CSV (con su número
+                 de fila en el archivo y el motivo)
   --backup   : si encuentra `db.sqlite3` la copia a `db.sqlite3.YYYYMMDD_HHMMSS.bak` antes de importar
   --yes      : no pedir confirmación interactiva (útil en CI)
 
@@ -39,20 +80,93 @@ def backup_sqlite_if_requested(do_backup: bool):
     return target
 
 
+def run_many(args, targets, import_targets, combined_summary) -> int:
+    """Varios archivos/hojas: parseo en paralelo + escritor coordinado. Retorna el exit code."""
+    print(f"[run_import] Iniciando importación de {len(targets)} archivos/hojas: pad={args.pad} strict_area={args.strict_area} write_mode={args.write_mode} backend={args.backend} reader={args.reader} commit={args.commit} incremental={args.incremental} chunk_size={args.chunk_size} parse_workers={args.parse_workers} writers={args.writers} dry_run={args.dry_run}\n")
+    try:
+        results = import_targets(
+            targets,
+            parse_workers=args.parse_workers,
+            writers=args.writers,
+            reader=args.reader,
+            pad=args.pad,
+            chunk_size=args.chunk_size,
+            strict_area=args.strict_area,
+            write_mode=args.write_mode,
+            backend=args.backend,
+            commit=args.commit,
+            incremental=args.incremental,
+            dry_run=args.dry_run,
+            rejects_csv=args.rejects_csv,
+        )
+    except Exception as e:
+        print('Error durante la importación:', e)
+        return 1
+
+    print('\nResumen por archivo/hoja:')
+    for target, summary, error in results:
+        if error is not None:
+            print(f"  {target.label}: ERROR {error}")
+            continue
+        print(
+            f"  {target.label}: filas={summary['rows']} "
+            f"stock crear/act/saltear={summary['stock_created']}/{summary['stock_updated']}/{summary['stock_skipped']} "
+            f"ventas crear/act/saltear={summary['sales_created']}/{summary['sales_updated']}/{summary['sales_skipped']} "
+            f"en {summary['elapsed_seconds']:.1f}s"
+        )
+    print('\nTotales:')
+    for k, v in combined_summary(results).items():
+        print(f"  {k}: {v}")
+    return 1 if any(r.error is not None for r in results) else 0
+
+
 def main():
     parser = argparse.ArgumentParser()
-    parser.add_argument('file', help='Ruta al archivo xlsx/csv')
-    parser.add_argument('--sheet', default=None, help='Hoja (nombre o índice)')
+    parser.add_argument('files', nargs='+', help='Archivos xlsx/csv/tsv o globs')
+    parser.add_argument('--sheet', default=None, help='Hoja (nombre o índice, solo xlsx)')
+    parser.add_argument('--all-sheets', action='store_true', help='Importar todas las hojas de cada xlsx')
+    parser.add_argument('--parse-workers', type=int, default=None,
+                        help='Con varios archivos/hojas: procesos que leen y parsean en paralelo (default: uno por CPU)')
+    parser.add_argument('--writers', type=int, default=None,
+                        help='Con varios archivos/hojas: escritores en paralelo (solo PostgreSQL; default hasta 4)')
     parser.add_argument('--pad', type=int, default=0, help='Zero-padding (0=sin padding)')
     parser.add_argument('--strict-area', action='store_true', help='Validar region/zona contra maestro')
+    parser.add_argument('--write-mode', default='merge', choices=['merge', 'upsert', 'replace'],
+                        help='Estrategia de escritura (merge=select+bulk_update, upsert=ON CONFLICT, replace=borrar rango e insertar)')
+    parser.add_argument('--backend', default='auto', choices=['auto', 'orm', 'copy'],
+                        help='Backend de escritura (copy=COPY a staging, solo PostgreSQL)')
+    parser.add_argument('--reader', default='openpyxl', choices=['openpyxl', 'raw'],
+                        help='Lector de xlsx (raw=XML directo, más rápido)')
+    parser.add_argument('--workers', type=int, default=0,
+                        help='Procesos de parseo en modo pipeline (0=secuencial)')
+    parser.add_argument('--commit', default='atomic', choices=['atomic', 'chunk'],
+                        help='atomic=una transacción; chunk=commit por chunk con checkpoint')
+    parser.add_argument('--resume', action='store_true',
+                        help='Retomar desde el checkpoint de una corrida cortada (implica --commit chunk)')
+    parser.add_argument('--incremental', action='store_true',
+                        help='Saltear particiones (sucursal, día) sin cambios desde la última importación')
+    parser.add_argument('--chunk-size', type=int, default=10_000, help='Filas por chunk (inicial con --adaptive)')
+    parser.add_argument('--adaptive', action='store_true', help='Tamaño de chunk adaptativo según la latencia de escritura')
+    parser.add_argument('--max-flush-seconds', type=float, default=None,
+                        help='Con --adaptive: latencia máxima por chunk (default según backend)')
+    parser.add_argument('--target-rows-per-sec', type=float, default=None,
+                        help='Con --adaptive: no crecer más una vez alcanzadas estas filas/s')
+    parser.add_argument('--dry-run', action='store_true',
+                        help='Validar sin escribir: informe de filas rechazadas y códigos/subfamilias sin match')
+    parser.add_argument('--rejects-csv', default=None,
+                        help='Con --dry-run: CSV donde se vuelcan las filas rechazadas')
     parser.add_argument('--backup', action='store_true', help='Hacer backup de db.sqlite3 antes de importar')
     parser.add_argument('--yes', action='store_true', help='No pedir confirmación')
     args = parser.parse_args()
 
-    p = Path(args.file)
-    if not p.exists():
-        print('Archivo no encontrado:', p)
-        sys.exit(1)
+    if args.rejects_csv and not args.dry_run:
+        parser.error('--rejects-csv requiere --dry-run')
+    if args.resume and args.dry_run:
+        parser.error('--resume no se combina con --dry-run')
+    if args.sheet is not None and args.all_sheets:
+        parser.error('--sheet no se combina con --all-sheets')
+    if args.resume:
+        args.commit = 'chunk'
 
     ensure_project_path()
     os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'retail_curves.settings')
@@ -64,6 +178,16 @@ def main():
         sys.exit(1)
 
     from core.services.navidad_loader import process_navidad_file
+    from core.services.navidad_multi import combined_summary, expand_targets, import_targets
+
+    try:
+        targets = expand_targets(args.files, sheet=args.sheet, all_sheets=args.all_sheets)
+    except FileNotFoundError as e:
+        print('Archivo no encontrado:', e)
+        sys.exit(1)
+    if not targets:
+        print('No hay hojas para importar.')
+        sys.exit(1)
 
     print('\nResumen antes de importar:')
     try:
@@ -73,19 +197,43 @@ def main():
     except Exception:
         pass
 
-    if not args.yes:
-        ans = input(f"Confirma ejecutar importación sobre '{p.name}' contra la BD actual? [y/N]: ").strip().lower()
+    if not args.yes and not args.dry_run:
+        names = ', '.join(t.label for t in targets)
+        ans = input(f"Confirma ejecutar importación sobre '{names}' contra la BD actual? [y/N]: ").strip().lower()
         if ans not in ('y', 'yes'):
             print('Cancelado por el usuario.')
             sys.exit(0)
 
-    if args.backup:
+    if args.backup and not args.dry_run:
         backup_sqlite_if_requested(True)
 
-    print(f"[run_import] Iniciando importación: {p} sheet={args.sheet} pad={args.pad} strict_area={args.strict_area}\n")
+    if len(targets) > 1:
+        sys.exit(run_many(args, targets, import_targets, combined_summary))
+
+    p, sheet = targets[0]
+    print(f"[run_import] Iniciando importación: {p} sheet={sheet} pad={args.pad} strict_area={args.strict_area} write_mode={args.write_mode} backend={args.backend} reader={args.reader} workers={args.workers} commit={args.commit} resume={args.resume} incremental={args.incremental} chunk_size={args.chunk_size} adaptive={args.adaptive} dry_run={args.dry_run}\n")
     try:
-        summary = process_navidad_file(p, sheet=args.sheet, pad=args.pad, strict_area=args.strict_area)
-        print('\nImportación completada. Resumen:')
+        summary = process_navidad_file(
+            p,
+            sheet=sheet,
+            pad=args.pad,
+            strict_area=args.strict_area,
+            write_mode=args.write_mode,
+            backend=args.backend,
+            reader=args.reader,
+            workers=args.workers,
+            commit=args.commit,
+            resume=args.resume,
+            incremental=args.incremental,
+            chunk_size=args.chunk_size,
+            adaptive=args.adaptive,
+            max_flush_seconds=args.max_flush_seconds,
+            target_rows_per_sec=args.target_rows_per_sec,
+            dry_run=args.dry_run,
+            rejects_csv=args.rejects_csv,
+        )
+        print('\nValidación (dry-run) completada, no se escribió nada. Resumen:' if args.dry_run
+              else '\nImportación completada. Resumen:')
         for k, v in summary.items():
             print(f"  {k}: {v}")
     except Exception as e:
@@ -1,17 +1,17 @@
 from django.shortcuts import render
 from django.http import JsonResponse
 from django.db.models import Sum
-from django.db.models.functions import TruncDay, ExtractYear, TruncDate
+from django.db.models.functions import TruncDay, TruncDate
 from datetime import timedelta
 from core.models import Region, Zone, Store, Family
+from core.services import dataset_catalog as catalog
+from core.services import rollups, season_cube
+from core.services.response_cache import cached_json
 from core.utils.periods import christmas_period
 from .models import StockRecord
-from sales.models import SalesRecord  # para available years conjunto
 
 def _available_years():
-    y1 = StockRecord.objects.annotate(y=ExtractYear("date")).values_list("y", flat=True)
-    y2 = SalesRecord.objects.annotate(y=ExtractYear("date")).values_list("y", flat=True)
-    return sorted({int(y) for y in list(y1)+list(y2) if y is not None})
+    return catalog.available_years()  # ventas + stock, del catálogo del dataset
 
 def _years_to_compare(pivot, available):
     cand = [pivot-2, pivot-1, pivot]
@@ -53,6 +53,7 @@ def stock_curves_view(request):
         "default_source": request.GET.get("source") or "all",  # all|stores|cdr
     })
 
+@cached_json({"source": "all", "region_id": None, "zone_id": None, "store_code": None, "family_id": None})
 def stock_curves_data(request):
     # Pivote = último año con datos; NO hay selector de año en UI
     available = _available_years()
@@ -71,26 +72,16 @@ def stock_curves_data(request):
         cur += timedelta(days=1)
 
     datasets = []
+    cube = season_cube.current()
+    cube_scope = dict(scope)
+    if source in ("stores", "cdr"):
+        cube_scope["store__is_distribution_center"] = source == "cdr"
+    rollup = rollups.rollup_for(scope)  # zona/región/todas; None si hay sucursal
     for y in years:
         s, e = christmas_period(y)
-        filters = {"date__range": (s, e)}
-        filters.update(scope)
-        if source == "stores":
-            filters["store__is_distribution_center"] = False
-        elif source == "cdr":
-            filters["store__is_distribution_center"] = True
-
-        qs = (StockRecord.objects
-            .filter(**filters)
-            .values("date")                 # ⬅️ agrupa por la fecha directa
-            .annotate(units=Sum("stock_units"))
-            .order_by("date"))
-
-        day_map = {row["date"]: float(row["units"] or 0) for row in qs}
-        series, cur = [], s
-        while cur <= e:
-            series.append(day_map.get(cur, 0.0))  # stock diario (no acumulado)
-            cur += timedelta(days=1)
+        series = cube.daily_totals(season_cube.STOCK, y, cube_scope) if cube is not None else None
+        if series is None:
+            series = _daily_stock(rollup, scope, source, s, e)
 
         if sum(series) <= 0:  # oculta series planas
             continue
@@ -107,3 +98,34 @@ def stock_curves_data(request):
             "note": "Si se elige sucursal, región/zona se fuerzan a la de esa sucursal."
         }
     })
+
+
+def _daily_stock(rollup, scope, source, s, e):
+    """Stock diario (no acumulado) de s a e, del rollup o de StockRecord."""
+    if rollup is not None:
+        qs = rollup.filter(date__range=(s, e))
+        if source == "stores":
+            qs = qs.filter(is_cdr=False)
+        elif source == "cdr":
+            qs = qs.filter(is_cdr=True)
+        qs = qs.values("date").annotate(units=Sum("stock_units")).order_by("date")
+    else:
+        filters = {"date__range": (s, e)}
+        filters.update(scope)
+        if source == "stores":
+            filters["store__is_distribution_center"] = False
+        elif source == "cdr":
+            filters["store__is_distribution_center"] = True
+
+        qs = (StockRecord.objects
+            .filter(**filters)
+            .values("date")                 # ⬅️ agrupa por la fecha directa
+            .annotate(units=Sum("stock_units"))
+            .order_by("date"))
+
+    day_map = {row["date"]: float(row["units"] or 0) for row in qs}
+    series, cur = [], s
+    while cur <= e:
+        series.append(day_map.get(cur, 0.0))  # stock diario (no acumulado)
+        cur += timedelta(days=1)
+    return series